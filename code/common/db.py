@@ -0,0 +1,313 @@
+"""
+project3 和 project4 共用的 MySQL 访问层：线程安全的连接池 ConnectionPool、连接池指标接口 /db_pool_status，
+以及按版本号同步的工休日历缓存 HolidayCalendar。
+
+各服务在自己的文件中按 DB_CONFIG 创建全局连接池和工休日历，并注册 db_pool_blueprint(db_pool)。
+"""
+import time
+import pymysql
+import threading
+from array import array
+from datetime import date
+from pymysql.constants import ER
+from flask import Blueprint, jsonify
+from contextlib import contextmanager
+from collections import deque
+
+# 数据库连接池参数
+DB_POOL_SIZE = 8  # 最大连接数
+DB_POOL_TIMEOUT = 5  # 等待空闲连接的最长时间（秒）
+DB_POOL_RECYCLE = 3600  # 连接创建超过该时长（秒）后关闭重建
+DB_POOL_PING_INTERVAL = 30  # 空闲超过该时长（秒）的连接在取出前先 ping 检查
+
+# 工休日历缓存参数
+CALENDAR_VERSION_CHECK_INTERVAL = 30  # 每隔该时长（秒）比对一次数据库中的日历版本号
+SCHEDULE_VERSION_DDL = "CREATE TABLE IF NOT EXISTS schedule_version (id INT PRIMARY KEY, version BIGINT NOT NULL)"
+
+
+class ConnectionPool:
+    """
+    线程安全的 MySQL 连接池：最多 max_size 个连接，取出时对空闲较久的连接做健康检查，
+    数据库出错的连接和使用超过 recycle 秒的连接关闭后重建，并统计连接池指标。
+    """
+
+    def __init__(self, config, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, recycle=DB_POOL_RECYCLE,
+                 ping_interval=DB_POOL_PING_INTERVAL):
+        self.config = config
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self.idle = deque()  # (连接, 创建时间, 最后归还时间)
+        self.size = 0  # 已创建且未关闭的连接数（含借出的）
+        self.condition = threading.Condition()
+        self.stats = {"created": 0, "closed": 0, "checked_out": 0, "checkouts": 0, "waits": 0,
+                      "wait_time": 0.0, "max_wait_time": 0.0, "health_check_failures": 0, "errors": 0}
+
+    def acquire(self):
+        """取出一个可用连接，返回 (连接, 创建时间)；等待超时抛出 pymysql.OperationalError"""
+        start = time.monotonic()
+        with self.condition:
+            while not self.idle and self.size >= self.max_size:
+                remaining = start + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    raise pymysql.OperationalError(f"等待数据库连接超时（{self.timeout} 秒）")
+                self.condition.wait(remaining)
+            entry = self.idle.pop() if self.idle else None  # 后进先出，优先使用刚归还的连接
+            if entry is None:
+                self.size += 1
+            waited = time.monotonic() - start
+            self.stats["checkouts"] += 1
+            self.stats["waits"] += waited > 0.001
+            self.stats["wait_time"] += waited
+            self.stats["max_wait_time"] = max(self.stats["max_wait_time"], waited)
+
+        if entry is not None:
+            connection, created, last_used = entry
+            now = time.monotonic()
+            if now - created > self.recycle:
+                self.close(connection)
+            elif now - last_used > self.ping_interval and not self.ping(connection):
+                self.close(connection)
+            else:
+                return connection, created
+
+        # 新建连接（或替换已关闭的连接），失败时让出名额
+        try:
+            connection = pymysql.connect(**self.config)
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.stats["created"] += 1
+        return connection, time.monotonic()
+
+    def ping(self, connection):
+        """健康检查，失败时记录并返回 False"""
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception as e:
+            print(f"数据库连接健康检查失败: {e}")
+            with self.condition:
+                self.stats["health_check_failures"] += 1
+            return False
+
+    def close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self.condition:
+            self.stats["closed"] += 1
+
+    def release(self, connection, created, discard=False):
+        """归还连接：先回滚未提交的事务（下次取出时能读到最新数据），出错或超过 recycle 时关闭"""
+        if not discard:
+            try:
+                connection.rollback()
+            except Exception:
+                discard = True
+        if discard or time.monotonic() - created > self.recycle:
+            self.close(connection)
+            with self.condition:
+                self.size -= 1
+                self.stats["errors"] += discard
+                self.condition.notify()
+        else:
+            with self.condition:
+                self.idle.append((connection, created, time.monotonic()))
+                self.condition.notify()
+
+    @contextmanager
+    def connection(self):
+        """with db_pool.connection() as connection: ...，退出时归还连接，数据库出错时关闭该连接"""
+        connection, created = self.acquire()
+        with self.condition:
+            self.stats["checked_out"] += 1
+        try:
+            yield connection
+        except pymysql.Error:
+            self.release(connection, created, discard=True)
+            raise
+        except BaseException:
+            self.release(connection, created)
+            raise
+        else:
+            self.release(connection, created)
+        finally:
+            with self.condition:
+                self.stats["checked_out"] -= 1
+
+    def metrics(self):
+        """连接池指标：当前连接数、空闲数、借出数、累计创建/关闭数、等待次数与耗时等"""
+        with self.condition:
+            return dict(self.stats, size=self.size, idle=len(self.idle), max_size=self.max_size)
+
+
+def db_pool_blueprint(pool):
+    """连接池指标接口：GET /db_pool_status"""
+    blueprint = Blueprint("db_pool", __name__)
+
+    @blueprint.route("/db_pool_status", methods=['GET'])
+    def db_pool_status():
+        """连接池指标"""
+        return jsonify(pool.metrics()), 200
+
+    return blueprint
+
+
+def date_ordinal(value):
+    """日期（date/datetime 或 "YYYY-MM-DD[ HH:MM:SS]" 字符串）转换为日期序数，无法解析时返回 None"""
+    if isinstance(value, date):
+        return value.toordinal()
+    try:
+        year, month, day = (int(part) for part in str(value).split(" ")[0].split("-"))
+        return date(year, month, day).toordinal()
+    except ValueError:
+        return None
+
+
+def calendar_slice(table, first, last):
+    """从 (第一天的日期序数, 工休状态) 中取出 [first, last] 的工休状态，没有记录的日期为 -1"""
+    start, status = table
+    low, high = max(first, start), min(last + 1, start + len(status))
+    if low >= high:
+        return array('b', [-1]) * (last - first + 1)
+    return array('b', [-1]) * (low - first) + status[low - start:high - start] + array('b', [-1]) * (last + 1 - high)
+
+
+def scan_schedule(connection, first=None, last=None):
+    """
+    用服务端游标（SSCursor）按日期顺序逐行读取 schedule 表，不一次性 fetchall 到内存；
+    指定 [first, last]（日期序数）时按唯一索引 BETWEEN 范围扫描。
+    返回：(第一天的日期序数, 工休状态 array('b'))，没有记录的日期为 -1
+    """
+    query, args = "SELECT datetime, holiday FROM schedule", ()
+    if first is not None:
+        query += " WHERE datetime BETWEEN %s AND %s"
+        args = (f"{date.fromordinal(first)} 00:00:00", f"{date.fromordinal(last)} 23:59:59")
+    start, status = first, array('b')
+    with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute(query + " ORDER BY datetime", args)
+        for day, holiday in cursor:
+            ordinal = date_ordinal(day)
+            if start is None:
+                start = ordinal
+            index = ordinal - start
+            if index >= len(status):
+                status.extend(array('b', [-1]) * (index - len(status)))
+                status.append(holiday)
+            else:
+                status[index] = holiday  # 同一天有多条记录时取最后一条
+    return (start or 0), status
+
+
+def create_schedule_version_table(connection):
+    """写入方在开始事务之前创建日历版本号表（DDL 会隐式提交，不能放在事务中）"""
+    with connection.cursor() as cursor:
+        cursor.execute(SCHEDULE_VERSION_DDL)
+
+
+def read_schedule_version(cursor):
+    """读取日历版本号；版本号表或记录不存在（写入方尚未写入过）时视为 0"""
+    try:
+        cursor.execute("SELECT version FROM schedule_version WHERE id = 1")
+    except pymysql.ProgrammingError as e:
+        if e.args[0] != ER.NO_SUCH_TABLE:
+            raise
+        return 0
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def bump_schedule_version(cursor):
+    """在当前事务中递增日历版本号并返回新版本号（版本号表由 create_schedule_version_table 创建）"""
+    cursor.execute("INSERT INTO schedule_version (id, version) VALUES (1, 1) ON DUPLICATE KEY UPDATE version = version + 1")
+    return read_schedule_version(cursor)
+
+
+class HolidayCalendar:
+    """
+    工休日历缓存：整张 schedule 表按日期序数存入 array('b')（-1 表示没有记录），按日期查询为 O(1) 下标访问，不访问数据库。
+    写入方（project3）在同一事务中递增 schedule_version 表的版本号，并直接更新本进程的缓存（write-through）；
+    各进程每 check_interval 秒比对一次版本号，其他进程写入后重新加载。读取方不执行 DDL。
+    """
+
+    def __init__(self, pool, check_interval=CALENDAR_VERSION_CHECK_INTERVAL):
+        self.pool = pool
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.table = (0, array('b'))  # (第一天的日期序数, 工休状态)，整体替换，读取时无需加锁
+        self.version = None
+        self.checked = 0.0
+
+    def load(self):
+        """加载整张 schedule 表"""
+        with self.pool.connection() as connection:
+            with connection.cursor() as cursor:
+                version = read_schedule_version(cursor)
+            first, status = scan_schedule(connection)
+        with self.lock:
+            self.table, self.version, self.checked = (first, status), version, time.monotonic()
+        print(f"工休日历已加载：{len(status) - status.count(-1)} 天，版本 {version}")
+
+    def refresh(self):
+        """尚未加载时加载；超过检查间隔时比对版本号，变化时重新加载。数据库不可用时继续使用已加载的数据"""
+        if self.version is None:
+            self.load()
+            return
+        if time.monotonic() - self.checked < self.check_interval:
+            return
+        try:
+            with self.pool.connection() as connection, connection.cursor() as cursor:
+                version = read_schedule_version(cursor)
+            if version != self.version:
+                self.load()
+            else:
+                self.checked = time.monotonic()
+        except pymysql.Error as e:
+            print(f"工休日历版本检查失败，继续使用缓存: {e}")
+
+    def lookup(self, dates):
+        """返回 {日期: 工休状态}，键为传入的日期，没有记录的日期不包含在结果中"""
+        self.refresh()
+        first, status = self.table
+        result = {}
+        for value in dates:
+            ordinal = date_ordinal(value)
+            index = -1 if ordinal is None else ordinal - first
+            if 0 <= index < len(status) and status[index] != -1:
+                result[value] = status[index]
+        return result
+
+    def range(self, first, last):
+        """返回 [first, last]（日期序数）的工休状态 array('b')，没有记录的日期为 -1"""
+        self.refresh()
+        return calendar_slice(self.table, first, last)
+
+    def apply(self, dates, statuses, version):
+        """
+        write-through：本进程写入数据库（版本号递增为 version）后直接更新缓存。
+        版本号不连续说明期间有其他写入，此时放弃增量更新，下次查询时重新加载。
+        """
+        ordinals = [date_ordinal(value) for value in dates]
+        try:
+            statuses = array('b', [int(value) for value in statuses])
+        except (TypeError, ValueError, OverflowError):
+            statuses = None
+        with self.lock:
+            if self.version is None or version != self.version + 1 or None in ordinals or statuses is None:
+                self.checked = 0.0
+                return
+            first, status = self.table
+            if not status:
+                first = min(ordinals)
+            low = min(ordinals + [first])
+            high = max(ordinals + [first + len(status) - 1])
+            status = array('b', [-1]) * (first - low) + status + array('b', [-1]) * (high - first - len(status) + 1)
+            for ordinal, value in zip(ordinals, statuses):
+                status[ordinal - low] = value
+            self.table, self.version = (low, status), version
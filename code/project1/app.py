@@ -1,10 +1,13 @@
-from flask import Flask, request,jsonify
+from flask import Flask, request,jsonify, Response
 from pydantic import BaseModel, validator, ValidationError
 from typing import List
 from datetime import datetime, timedelta
 from flask_cors import CORS
 import json
 import os
+import heapq
+from itertools import groupby, repeat
+import numpy as np
 
 app = Flask(__name__)
 CORS(app, supports_credentials=True)
@@ -44,123 +47,236 @@ class SensorData(BaseModel):
                 raise ValueError(f"Time must be strictly increasing: {item.t} comes after {last_time}")
             last_time = current_time
         return v
-def update_data(existing_data, data, unit):
-    # 解析 new_data 中的时间，获取到根据 unit 对齐的时间
-    new_data = data['values']
-    for item in new_data:
-        # 解析时间
-        new_time = datetime.strptime(item['t'], "%Y-%m-%d %H:%M:%S")
-
-        # 计算根据 unit 对齐的时间
-        new_time_unit = new_time.replace(minute=0, second=0, microsecond=0)  # 设置为小时的开始时间
-        # 以 unit 为单位对齐时间
-        delta = (new_time - new_time_unit).total_seconds()
-        aligned_time = new_time_unit + timedelta(seconds=(delta // unit) * unit)
-
-        flag = 0
-        # 查找是否已有该时间的数据，如果没有则新增
-        for entry in existing_data:
-            existing_time = datetime.strptime(entry["time"], "%Y-%m-%d %H:%M:%S")
-            if existing_time == aligned_time:
-                if data["tagName"] in entry.keys():
-                    break
-                # 如果时间匹配，更新对应的 tagName 值
-                entry[data["tagName"]] = item["v"]
-                flag = 1
-                break
-
-        if flag == 0:
-            # 如果没有找到匹配的时间，创建新记录
-            new_entry = {
-                "time": aligned_time.strftime("%Y-%m-%d %H:%M:%S"),
-                data["tagName"]: item["v"]
-            }
-            existing_data.append(new_entry)
-
-    return existing_data
-
-def Complete_data_start(start_time_str, data, unit):
-    start_time = datetime.strptime(start_time_str, "%Y-%m-%d %H:%M:%S")
-
-    # 获取所有的时间点
-    times = [entry["time"] for entry in data]
-    times = sorted(set(times))  # 确保时间点唯一并排序
-
-    # 转换时间点为 datetime 对象
-    times = [datetime.strptime(time, "%Y-%m-%d %H:%M:%S") for time in times]
-
-    # 创建时间序列（从 start_time 到数据中最后的时间点，按 unit 增加）
-    all_times = []
-    current_time = start_time
-    while current_time <= times[-1]:
-        all_times.append(current_time)
-        current_time += timedelta(seconds=unit)  # 使用 unit 作为增量
-
-    # 填充数据
-    filled_data = []
-    for t in all_times:
-        # 如果该时间点的数据存在，直接加入
-        data_at_time = next((entry for entry in data if datetime.strptime(entry["time"], "%Y-%m-%d %H:%M:%S") == t),
-                            None)
-
-        if data_at_time:
-            filled_data.append(data_at_time)
-        else:
-            # 找到下一个时间点的数据进行填充
-            next_data = next((entry for entry in data if datetime.strptime(entry["time"], "%Y-%m-%d %H:%M:%S") > t),
-                             None)
-
-            if next_data:
-                # 用下一个时间点的数据填充当前时间点
-                filled_entry = {"time": t.strftime("%Y-%m-%d %H:%M:%S")}
-                for key in next_data:
-                    if key != "time":
-                        filled_entry[key] = next_data[key]
-                filled_data.append(filled_entry)
-
-    # 输出结果
-    return filled_data
-
-def Complete_data_end(start_time_str, end_time_str, data, unit):
-    start_time = datetime.strptime(start_time_str, "%Y-%m-%d %H:%M:%S")
-    end_time = datetime.strptime(end_time_str, "%Y-%m-%d %H:%M:%S")
-
-    # 获取所有的时间点
-    times = [entry["time"] for entry in data]
-    times = sorted(set(times))  # 确保时间点唯一并排序
-
-    # 转换时间点为 datetime 对象
-    times = [datetime.strptime(time, "%Y-%m-%d %H:%M:%S") for time in times]
-
-    # 创建时间序列（从 start_time 到 end_time，按 unit 增加）
-    all_times = []
-    current_time = start_time
-    while current_time <= end_time:
-        all_times.append(current_time)
-        current_time += timedelta(seconds=unit)
-    # 填充数据
-    filled_data = []
-    last_data = None  # 用于存储最后一个有效的数据
-
-    for t in all_times:
-        # 查找当前时间点的数据
-        data_at_time = next((entry for entry in data if datetime.strptime(entry["time"], "%Y-%m-%d %H:%M:%S") == t), None)
-
-        if data_at_time:
-            # 当前时间点有数据，直接使用
-            filled_data.append(data_at_time)
-            last_data = data_at_time
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_epoch_seconds(time_list):
+    """将时间字符串列表批量解析为 int64 秒级时间戳（按本地 naive 时间处理）"""
+    try:
+        return np.array(time_list, dtype="datetime64[s]").astype(np.int64)
+    except ValueError:
+        # numpy 只接受补零的 ISO 格式，其余情况退回 strptime 逐条解析
+        epoch = datetime(1970, 1, 1)
+        return np.array([int((datetime.strptime(t, TIME_FORMAT) - epoch).total_seconds()) for t in time_list],
+                        dtype=np.int64)
+
+
+def format_epoch_seconds(epochs):
+    """将 int64 秒级时间戳数组批量格式化为 "%Y-%m-%d %H:%M:%S" 字符串列表"""
+    if len(epochs) == 0:
+        return []
+    text = np.datetime_as_string(np.asarray(epochs, dtype=np.int64).astype("datetime64[s]"))
+    return [t.replace("T", " ") for t in text.tolist()]
+
+
+def align_epochs(epochs, unit):
+    """以小时起点为基准，按 unit 秒对齐时间戳：hour_start + (delta // unit) * unit"""
+    hour_start = epochs - epochs % 3600
+    return hour_start + (epochs - hour_start) // unit * unit
+
+
+def build_aligned_matrix(series_list, unit):
+    """
+    将多个标签的数据按 unit 对齐为列式矩阵。
+    :param series_list: [(tagName, epochs, values), ...]，epochs 为 int64 时间戳数组
+    :param unit: 对齐单位（秒）
+    :return: (bucket_times, tag_names, matrix)，matrix 形状为 (时间桶数, 标签数)，缺失值为 NaN
+    """
+    unit = int(unit)
+    tag_names = []
+    tag_index = {}
+    aligned = []
+    for tag_name, epochs, values in series_list:
+        buckets = align_epochs(np.asarray(epochs, dtype=np.int64), unit)
+        # 同一时间桶内只保留第一个样本
+        buckets, first = np.unique(buckets, return_index=True)
+        if tag_name not in tag_index:
+            tag_index[tag_name] = len(tag_names)
+            tag_names.append(tag_name)
+        aligned.append((tag_index[tag_name], buckets, np.asarray(values, dtype=np.float64)[first]))
+
+    if not aligned:
+        return np.empty(0, dtype=np.int64), tag_names, np.empty((0, 0))
+
+    # 时间桶索引：排序去重后的桶时间数组，通过 searchsorted 定位行号
+    bucket_times = np.unique(np.concatenate([buckets for _, buckets, _ in aligned]))
+    matrix = np.full((len(bucket_times), len(tag_names)), np.nan)
+    for column, buckets, values in aligned:
+        rows = np.searchsorted(bucket_times, buckets)
+        # 重复的 tagName 不覆盖已有的值
+        empty = np.isnan(matrix[rows, column])
+        matrix[rows[empty], column] = values[empty]
+    return bucket_times, tag_names, matrix
+
+
+def matrix_to_records(bucket_times, tag_names, matrix):
+    """将列式矩阵转换为 [{"time": ..., tagName: value}, ...] 记录列表，忽略缺失值"""
+    records = []
+    present = ~np.isnan(matrix)
+    for time_str, row, mask in zip(format_epoch_seconds(bucket_times), matrix.tolist(), present.tolist()):
+        entry = {"time": time_str}
+        for tag_name, value, has_value in zip(tag_names, row, mask):
+            if has_value:
+                entry[tag_name] = value
+        records.append(entry)
+    return records
+
+
+# "%Y-%m-%d %H:%M:%S" 中分隔符与数字所在的位置
+TIME_SEPARATOR_POSITIONS = [4, 7, 10, 13, 16]
+TIME_SEPARATORS = np.array(["-", "-", " ", ":", ":"])
+TIME_DIGIT_POSITIONS = [i for i in range(19) if i not in TIME_SEPARATOR_POSITIONS]
+MIN_EPOCH_SECONDS = int(np.datetime64("0001-01-01T00:00:00", "s").astype(np.int64))
+
+
+def parse_sensor_series(json_data):
+    """
+    快速路径：以数组方式一次性校验单个标签的数据（字段类型、时间格式、非空、时间严格递增）。
+    校验通过时返回 (tagName, epochs, values)，无法确认数据合法时返回 None。
+    """
+    try:
+        tag_name = json_data['tagName']
+        items = json_data['values']
+        if not isinstance(tag_name, str) or not isinstance(json_data['vt'], int) or not items:
+            return None
+        times = np.array([item['t'] for item in items])
+        values = np.array([item['v'] for item in items])
+        statuses = np.array([item['s'] for item in items])
+    except (KeyError, TypeError, ValueError, OverflowError):
+        return None
+
+    count = len(items)
+    if times.shape != (count,) or values.shape != (count,) or statuses.shape != (count,):
+        return None
+    # 只接受纯数值的 v、纯整数的 s 和纯字符串的 t，其余情况交给 SensorData 处理类型转换
+    if values.dtype.kind not in "biuf" or statuses.dtype.kind not in "biu" or times.dtype.kind != "U":
+        return None
+    if not (np.char.str_len(times) == 19).all():
+        return None
+
+    chars = times.astype("U19").view("U1").reshape(count, 19)
+    if not (chars[:, TIME_SEPARATOR_POSITIONS] == TIME_SEPARATORS).all():
+        return None
+    if not np.char.isdigit(chars[:, TIME_DIGIT_POSITIONS]).all():
+        return None
+    try:
+        epochs = times.astype("datetime64[s]").astype(np.int64)
+    except ValueError:
+        return None
+    if epochs.min() < MIN_EPOCH_SECONDS or not (np.diff(epochs) > 0).all():
+        return None
+    return tag_name, epochs, values.astype(np.float64)
+
+
+def validate_sensor_data(json_data):
+    """
+    校验单个标签的数据并返回 (tagName, epochs, values)，时间字符串只解析一次。
+    快速路径无法确认时退回 SensorData 逐项校验，校验失败时抛出 ValidationError，错误信息格式保持不变。
+    """
+    series = parse_sensor_series(json_data)
+    if series is not None:
+        return series
+
+    sensor_data = SensorData(**json_data)
+    epochs = parse_epoch_seconds([item.t for item in sensor_data.values])
+    return sensor_data.tagName, epochs, np.array([item.v for item in sensor_data.values], dtype=np.float64)
+
+
+# 数据补充策略：
+#   bfill  - 缺失时间点使用下一个样本的值，最后一个样本之后沿用最后的值（默认）
+#   ffill  - 缺失时间点使用上一个样本的值，第一个样本之前使用第一个样本的值
+#   linear - 在相邻样本之间线性插值，首尾之外同 bfill/ffill
+#   none   - 只保留恰好落在时间点上的样本，不做填充
+FILL_POLICIES = ("ffill", "bfill", "linear", "none")
+DEFAULT_FILL_POLICY = "bfill"
+
+
+def resolve_fill_policies(fill, tag_names):
+    """
+    解析请求中的 fill 字段，返回与 tag_names 一一对应的补充策略列表。
+    fill 可以是字符串（所有标签共用）或 {tagName: 策略} 字典（未指定的标签使用默认策略）。
+    """
+    if fill is None:
+        fill = DEFAULT_FILL_POLICY
+    if isinstance(fill, str):
+        policies = [fill] * len(tag_names)
+    elif isinstance(fill, dict):
+        policies = [fill.get(tag_name, DEFAULT_FILL_POLICY) for tag_name in tag_names]
+    else:
+        raise ValueError(f"Invalid fill: {fill}")
+    for policy in policies:
+        if policy not in FILL_POLICIES:
+            raise ValueError(f"Unsupported fill policy: {policy}, expected one of {FILL_POLICIES}")
+    return policies
+
+
+def fill_aligned_matrix(bucket_times, matrix, slot_times, policies):
+    """
+    按每个标签的补充策略，将对齐后的矩阵重采样到 slot_times 上。
+    每个标签只做一次 searchsorted，复杂度为 O((时间点数 + 样本数) log 样本数)。
+    """
+    filled = np.full((len(slot_times), matrix.shape[1]), np.nan)
+    for column, policy in enumerate(policies):
+        valid = ~np.isnan(matrix[:, column])
+        times = bucket_times[valid]
+        values = matrix[valid, column]
+        if len(times) == 0:
+            continue
+
+        if policy == "linear":
+            filled[:, column] = np.interp(slot_times, times, values)
+            continue
+
+        if policy == "ffill":
+            index = np.maximum(np.searchsorted(times, slot_times, side="right") - 1, 0)
         else:
-            if last_data:
-                # 如果当前时间点没有数据，使用最后的数据进行填充
-                filled_entry = {"time": t.strftime("%Y-%m-%d %H:%M:%S")}
-                for key in last_data:
-                    if key != "time":
-                        filled_entry[key] = last_data[key]
-                filled_data.append(filled_entry)
+            index = np.minimum(np.searchsorted(times, slot_times, side="left"), len(times) - 1)
 
-    # 输出结果
-    return filled_data
+        if policy == "none":
+            hit = times[index] == slot_times
+            filled[hit, column] = values[index[hit]]
+        else:
+            filled[:, column] = values[index]
+    return filled
+
+
+STREAM_CHUNK_SLOTS = 10000  # 流式输出时每次填充的时间点数
+
+
+def generate_filled_records(bucket_times, tag_names, matrix, start, end, unit, policies, chunk_slots=STREAM_CHUNK_SLOTS):
+    """按块生成填充后的记录，每块只分配 chunk_slots 个时间点，内存占用与时间范围长度无关"""
+    step = unit * chunk_slots
+    for chunk_start in range(int(start), int(end) + 1, step):
+        slot_times = np.arange(chunk_start, min(chunk_start + step, int(end) + 1), unit, dtype=np.int64)
+        filled = fill_aligned_matrix(bucket_times, matrix, slot_times, policies)
+        yield from matrix_to_records(slot_times, tag_names, filled)
+
+
+def complete_data(start_time_str, end_time_str, aligned, unit, fill=None, stream=False):
+    """
+    生成从 start_time 到 end_time（按 unit 递增）的所有时间点，并按补充策略填充数据。
+    :param aligned: build_aligned_matrix 返回的 (bucket_times, tag_names, matrix)
+    :param stream: 为 True 时返回记录生成器，否则返回完整列表
+    :return: [{"time": ..., tagName: value}, ...] 记录列表或生成器
+    """
+    bucket_times, tag_names, matrix = aligned
+    start, end = parse_epoch_seconds([start_time_str, end_time_str])
+    # 在开始生成之前完成参数校验，保证错误能以 400 响应返回
+    policies = resolve_fill_policies(fill, tag_names)
+    records = generate_filled_records(bucket_times, tag_names, matrix, start, end, int(unit), policies)
+    return records if stream else list(records)
+
+
+def generate_ndjson(records, batch_size=STREAM_CHUNK_SLOTS):
+    """将记录逐行编码为 NDJSON，按批写出以减少响应写入次数"""
+    lines = []
+    for record in records:
+        lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+        if len(lines) >= batch_size:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
 
 # 保存数据到 JSON 文件的函数
 def save_to_json(data, filename="res.json"):
@@ -207,87 +323,95 @@ def format_timedelta(timedelta_obj):
     return f"{hours:02}:{minutes:02}:{seconds:02}"
 
 
-def calculate_cumulative_time(fh, mh, oh, setData1, setData2, setData3):
-    # 将所有数据归类为 (time, value, source)
-    all_data = []
-    for entry in fh or []:
-        all_data.append({"time": entry["t"], "v": entry["v"], "source": "fh"})
-    for entry in mh or []:
-        all_data.append({"time": entry["t"], "v": entry["v"], "source": "mh"})
-    for entry in oh or []:
-        all_data.append({"time": entry["t"], "v": entry["v"], "source": "oh"})
-
-    # 按时间排序
-    all_data.sort(key=lambda x: datetime.strptime(x["time"], "%Y-%m-%d %H:%M:%S"))
-
-    # 累计匹配的时间
-    total_time = timedelta(0)
-    last_matched_time = None
-    in_matching_period = False
-
-    def is_value_matching(time, source):
-        """检查某个时间点的值是否匹配设定值"""
-        matching_value = {"fh": setData1, "mh": setData2, "oh": setData3}[source]
-        # 先找到时间点最接近的上下边界
-        filtered_data = [d for d in all_data if d["source"] == source]
-        for i, entry in enumerate(filtered_data):
-            current_time = datetime.strptime(entry["time"], "%Y-%m-%d %H:%M:%S")
-            if current_time == time:
-                return entry["v"] == matching_value
-            elif current_time > time:
-                if i == 0:
-                    return False
-                prev_entry = filtered_data[i - 1]
-                prev_time = datetime.strptime(prev_entry["time"], "%Y-%m-%d %H:%M:%S")
-                # 时间区间判断
-                return (
-                    prev_entry["v"] == matching_value
-                    and entry["v"] == matching_value
-                    and prev_time <= time <= current_time
-                )
-        return False  # 未找到匹配的时间点
-
-    # 遍历所有时间点
-    for entry in all_data:
-        current_time = datetime.strptime(entry["time"], "%Y-%m-%d %H:%M:%S")
-
-        # 检查 fh, mh, oh 是否匹配
-        fh_match = is_value_matching(current_time, "fh") if fh else True
-        mh_match = is_value_matching(current_time, "mh") if mh else True
-        oh_match = is_value_matching(current_time, "oh") if oh else True
-
-        if fh_match and mh_match and oh_match:
-            if not in_matching_period:
+def source_match_state(times, values, setpoint, position, current_time):
+    """
+    判断某个数据源在 current_time 是否匹配设定值。
+    position 为该数据源中第一个时间 >= current_time 的下标：
+    恰好落在采样点上时看该点的值，落在两个采样点之间时要求前后两点都匹配。
+    """
+    if position == len(times):
+        return False
+    if times[position] == current_time:
+        return values[position] == setpoint
+    if position == 0:
+        return False
+    return values[position - 1] == setpoint and values[position] == setpoint
+
+
+def calculate_cumulative_time(sources):
+    """
+    计算所有数据源同时匹配各自设定值的累计时间。
+    :param sources: [(数据列表, 设定值), ...]，数据列表为 [{"t": ..., "v": ...}, ...]，空列表的数据源不参与判断
+    :return: "HH:MM:SS" 格式的累计时间
+
+    对各数据源预先解析、排序后做 k 路归并扫描：每个数据源只维护一个单调前进的指针和当前匹配状态，
+    每个时间点只重新计算指针发生移动的数据源，总复杂度 O(n log k)。
+    """
+    series = []
+    for data, setpoint in sources:
+        if not data:
+            continue
+        times = parse_epoch_seconds([entry["t"] for entry in data])
+        order = np.argsort(times, kind="stable")
+        values = [data[i]["v"] for i in order.tolist()]
+        series.append((times[order].tolist(), values, setpoint))
+    if not series:
+        return format_timedelta(timedelta(0))
+
+    positions = [0] * len(series)
+    matched = [False] * len(series)
+    matched_count = 0
+    pending = []  # 上一个时间点上有采样的数据源，指针需要越过该采样点
+
+    total_seconds = 0
+    period_start = None
+    current_time = None
+
+    merged = heapq.merge(*[zip(times, repeat(index)) for index, (times, _, _) in enumerate(series)])
+    for current_time, events in groupby(merged, key=lambda event: event[0]):
+        changed = set(pending)
+        changed.update(index for _, index in events)
+        pending = []
+        for index in changed:
+            times, values, setpoint = series[index]
+            position = positions[index]
+            while position < len(times) and times[position] < current_time:
+                position += 1
+            positions[index] = position
+            if position < len(times) and times[position] == current_time:
+                pending.append(index)
+
+            state = source_match_state(times, values, setpoint, position, current_time)
+            if state != matched[index]:
+                matched[index] = state
+                matched_count += 1 if state else -1
+
+        if matched_count == len(series):
+            if period_start is None:
                 # 开始新的匹配周期
-                last_matched_time = current_time
-                in_matching_period = True
-        else:
-            if in_matching_period and last_matched_time:
-                # 结束匹配周期，计算时间差
-                total_time += current_time - last_matched_time
-                in_matching_period = False
+                period_start = current_time
+        elif period_start is not None:
+            # 结束匹配周期，累计时间差
+            total_seconds += current_time - period_start
+            period_start = None
 
-    # 如果最后一个周期未结束，补充计算时间
-    if in_matching_period and last_matched_time:
-        last_time = datetime.strptime(all_data[-1]["time"], "%Y-%m-%d %H:%M:%S")
-        total_time += last_time - last_matched_time
+    # 如果最后一个周期未结束，补充计算到最后一个时间点
+    if period_start is not None:
+        total_seconds += current_time - period_start
 
-    return format_timedelta(total_time)
+    return format_timedelta(timedelta(seconds=total_seconds))
 
 @app.route("/flask", methods=['POST'])
 def align_and_update_data():
     data = request.json  # 获取请求数据
 
-    res_list = []  # 初始化结果列表
+    series_list = []  # 通过验证的 (tagName, epochs, values)
     validation_errors = []  # 用于收集验证错误
 
     for json_data in data['data']:
         try:
-            # 尝试使用 SensorData 验证数据
-            sensor_data = SensorData(**json_data)
-            print("Data is valid!")
-            # 如果数据有效，调用更新函数
-            res_list = update_data(res_list, json_data, data['unit'])
+            # 批量验证数据，时间只解析一次并传给后续的对齐步骤
+            series_list.append(validate_sensor_data(json_data))
         except ValidationError as e:
             # 捕获 Pydantic 验证错误并记录
             validation_errors.append({
@@ -306,9 +430,21 @@ def align_and_update_data():
             "errors": validation_errors
         }), 400  # 返回 400 Bad Request
 
+    # 所有标签一次性对齐为列式矩阵
+    aligned = build_aligned_matrix(series_list, data['unit'])
+
+    # 流式模式：请求 Accept: application/x-ndjson 或 stream=true
+    stream = data.get('stream') is True or "application/x-ndjson" in request.headers.get("Accept", "")
+
     # 数据处理完毕后，执行数据补充
-    res_list = Complete_data_start(data["starttime"], res_list, data['unit'])
-    res_list = Complete_data_end(data["starttime"], data["endtime"], res_list, data['unit'])
+    try:
+        res_list = complete_data(data["starttime"], data["endtime"], aligned, data['unit'], data.get('fill'), stream)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    if stream:
+        # 边生成边写出，每行一条记录
+        return Response(generate_ndjson(res_list), 200, mimetype="application/x-ndjson")
 
     print(res_list)  # 打印最终结果
     # 返回成功响应
@@ -318,31 +454,37 @@ def align_and_update_data():
 def match_calculate_cumulative_time():
     data = request.json
 
+    # 数据源及其设定值，未提供设定值的数据源不参与判断
+    setpoints = {"fh": data.get("f"), "mh": data.get("m"), "oh": 1}
+    setpoints.update(data.get("sets") or {})
+
     res_list = []
-    try:
-        for json_data in data['hist']:
-            if 'mh' not in json_data.keys() or data["m"] == None:
-                json_data['mh'] = []
-            else:
-                sensor_data = SensorData2(data=json_data['mh'])
-                print("Data is valid!")
-            if 'fh' not in json_data.keys() or data["f"] == None:
-                json_data['fh'] = []
-            else:
-                sensor_data = SensorData2(data=json_data['mh'])
-                print("Data is valid!")
-            if 'oh' not in json_data.keys():
-                json_data['oh'] = []
-            else:
-                sensor_data = SensorData2(data=json_data['oh'])
-                print("Data is valid!")
-            cumulative_time = calculate_cumulative_time(json_data['fh'], json_data['mh'], json_data['oh'], data["f"], data["m"], 1)
-            res_list.append(cumulative_time)
-            print(res_list)
-            print("Data is valid!")
-            return json.dumps(res_list), 200, {"Content-Type": "application/json"}
-    except ValidationError as e:
-        print(e.json())  # 打印详细的验证错误信息
-        # 调用函数
+    validation_errors = []
+    for json_data in data['hist']:
+        sources = []
+        try:
+            for key, setpoint in setpoints.items():
+                if key not in json_data.keys() or setpoint is None:
+                    continue
+                SensorData2(data=json_data[key])
+                sources.append((json_data[key], setpoint))
+        except ValidationError as e:
+            validation_errors.append({
+                'error': 'ValidationError',
+                'details': e.errors()
+            })
+            print(e.json())  # 打印详细的验证错误信息
+            continue
+        res_list.append(calculate_cumulative_time(sources))
+
+    if validation_errors:
+        return jsonify({
+            "status": "error",
+            "message": "Validation failed for some data",
+            "errors": validation_errors
+        }), 400
+
+    return json.dumps(res_list), 200, {"Content-Type": "application/json"}
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=1820, debug=True)
@@ -0,0 +1,53 @@
+import json
+import time
+import tracemalloc
+import numpy as np
+from app import build_aligned_matrix, complete_data, generate_ndjson, format_epoch_seconds
+
+# 基准测试：/flask 缓冲输出与 NDJSON 流式输出的峰值内存对比
+TAG_COUNT = 50
+UNIT = 1
+SAMPLE_INTERVAL = 60  # 原始数据每分钟一个样本，补充到每秒一个时间点
+START = "2024-01-01 00:00:00"
+
+
+def make_aligned(hours):
+    """生成 TAG_COUNT 个标签、覆盖 hours 小时的对齐矩阵"""
+    start = int(np.datetime64(START, "s").astype(np.int64))
+    epochs = start + np.arange(0, hours * 3600, SAMPLE_INTERVAL, dtype=np.int64)
+    series_list = [(f"tag{i}", epochs, np.random.rand(len(epochs))) for i in range(TAG_COUNT)]
+    end = format_epoch_seconds([start + hours * 3600 - 1])[0]
+    return build_aligned_matrix(series_list, UNIT), end
+
+
+def buffered(aligned, end):
+    """原有路径：先构建完整的记录列表，再整体序列化"""
+    return len(json.dumps(complete_data(START, end, aligned, UNIT)))
+
+
+def streaming(aligned, end):
+    """流式路径：边生成边序列化，只保留当前批次"""
+    size = 0
+    for chunk in generate_ndjson(complete_data(START, end, aligned, UNIT, stream=True)):
+        size += len(chunk)
+    return size
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak / 1024 / 1024
+
+
+if __name__ == "__main__":
+    print(f"{'小时':>6} {'行数':>8} {'缓冲峰值(MB)':>13} {'缓冲耗时(s)':>12} {'流式峰值(MB)':>13} {'流式耗时(s)':>12}")
+    for hours in (1, 6, 24):
+        aligned, end = make_aligned(hours)
+        _, buffered_time, buffered_peak = measure(buffered, aligned, end)
+        _, streaming_time, streaming_peak = measure(streaming, aligned, end)
+        print(f"{hours:>6} {hours * 3600:>8} {buffered_peak:>13.1f} {buffered_time:>12.2f} "
+              f"{streaming_peak:>13.1f} {streaming_time:>12.2f}")
@@ -0,0 +1,32 @@
+import time
+import numpy as np
+from app import SensorData, validate_sensor_data, parse_epoch_seconds, format_epoch_seconds
+
+# 基准测试：批量校验与逐项 Pydantic 模型校验的吞吐量（样本/秒）
+START = int(np.datetime64("2024-01-01 00:00:00", "s").astype(np.int64))
+
+
+def make_sensor_data(samples):
+    times = format_epoch_seconds(START + np.arange(samples, dtype=np.int64))
+    return {"tagName": "tag", "vt": 0, "values": [{"v": float(i), "s": 1, "t": t} for i, t in enumerate(times)]}
+
+
+def model_validation(json_data):
+    """逐项模型校验，之后对齐步骤还需要再次解析时间"""
+    sensor_data = SensorData(**json_data)
+    return parse_epoch_seconds([item.t for item in sensor_data.values])
+
+
+def throughput(func, json_data, samples):
+    start = time.perf_counter()
+    func(json_data)
+    return samples / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    print(f"{'样本数':>10} {'模型校验(样本/秒)':>18} {'批量校验(样本/秒)':>18} {'加速比':>8}")
+    for samples in (1_000, 10_000, 100_000, 1_000_000):
+        json_data = make_sensor_data(samples)
+        model_rate = throughput(model_validation, json_data, samples)
+        fast_rate = throughput(validate_sensor_data, json_data, samples)
+        print(f"{samples:>10} {model_rate:>18,.0f} {fast_rate:>18,.0f} {fast_rate / model_rate:>8.1f}")
@@ -1,25 +1,51 @@
 import os
+import re
+import glob
 import json
+import hashlib
+import time
+import uuid
+import tempfile
+import threading
+from collections import namedtuple
+from datetime import datetime
 import numpy as np
 from sklearn.svm import SVR
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import make_pipeline
+from scipy.spatial import cKDTree
 from scipy.spatial.distance import cdist
+import matplotlib
+matplotlib.use('Agg')  # 无界面后端，图形保存为文件，不阻塞训练线程
 from matplotlib import pyplot as plt
+from matplotlib.figure import Figure
 from mpl_toolkits.mplot3d import Axes3D
 import joblib
 import requests
 import schedule
-import matplotlib
+from concurrent.futures import ThreadPoolExecutor
 from flask_cors import CORS
 from flask import Flask, request,jsonify,abort
 
-matplotlib.use('TkAgg')  # 更改为 TkAgg 后端
-
 app = Flask(__name__)
-CORS(app, supports_credentials=True)
+CORS(app, supports_credentials=True, expose_headers=["X-Model-Name", "X-Model-Version", "X-Model-Loaded-At", "X-Inference-Mode", "X-Grid-Max-Error"])
 
 # 文件路径常量
 MODEL_FILE = "cop_model.pkl"
-CACHE_FILE = "cop_history_cache.json"
+HISTORY_CACHE_DIR = "cop_history_cache"
+
+# 历史数据缓存参数
+HISTORY_CACHE_TTL_HOURS = 24  # 缓存有效期（小时），过期后重新获取
+HISTORY_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 缓存目录大小上限，超出时按最近最少使用淘汰
+HISTORY_COLUMNS = ("x_data", "y_data", "z_data", "cop_data")  # 负荷率、冷却水温度、冷冻水温度、COP
+TIME_COLUMN = "time"  # 采样时间（秒级时间戳）
+HISTORY_RANGE_FIELDS = ("start", "end")  # 请求中的起止时间字段，不参与缓存键计算
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 模型名称（不同机房可使用不同名称的模型）
+DEFAULT_MODEL_NAME = "default"
+MODEL_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
 
 # 数据范围定义（请根据实际情况调整）
 VALID_LOAD_LEVEL_RANGE = (0, 100)  # 负荷率范围：0% 到 100%
@@ -27,10 +53,44 @@ VALID_COOLING_TEMP_RANGE = (0, 15)  # 冷却水温度范围：0°C 到 15°C
 VALID_FREEZING_TEMP_RANGE = (-10, 10)  # 冷冻水温度范围：-10°C 到 10°C
 VALID_COP_RANGE = (2.0, 6.0)  # COP 范围：通常在 2 到 6 之间
 
+# 训练数据过滤规则（可选 finite、range、stuck），按顺序执行
+DATA_FILTER_RULES = ("finite", "range")
+STUCK_SENSOR_WINDOW = 30  # 连续相同取值达到该样本数时视为传感器卡死
+
 #向量回归模型(SVR)参数
 C = 30
 GAMMA = 0.01
 
+# 训练方式：full 在全部数据上训练；incremental 在有界的代表性训练集（分层抽样 + 当前模型的支持向量）上训练
+TRAINING_MODES = ("full", "incremental")
+DEFAULT_TRAINING_MODE = "full"
+MAX_TRAINING_SAMPLES = 5000  # incremental 训练集的样本数上限
+TRAINING_STRATA = (10, 5, 5)  # 分层抽样时负荷率、冷却水温度、冷冻水温度方向的分箱数
+# 核函数：exact 为精确 RBF 核 SVR；nystroem / rff 为近似核特征 + 线性求解器（岭回归），适用于大数据量
+KERNELS = ("exact", "nystroem", "rff")
+DEFAULT_KERNEL = "exact"
+KERNEL_COMPONENTS = 500  # 近似核的特征维数
+
+# 相似日查找参数
+SIMILAR_DAYS_K = 5  # 用于重新训练的相似日数量
+SIMILARITY_METRIC = "euclidean"
+SIMILARITY_METRICS = ("euclidean", "cityblock", "chebyshev", "cosine", "correlation")
+TREE_METRICS = {"euclidean": 2, "cityblock": 1, "chebyshev": np.inf}  # 可用 KD 树查询的距离及对应的闵可夫斯基 p
+SIMILAR_DAY_MIN_HOURS = 12  # 一天至少有多少个小时的数据才参与相似日查找
+
+# 后台训练任务参数
+TRAINING_WORKERS = 1  # 同时运行的训练任务数
+MAX_FINISHED_JOBS = 100  # 保留的已结束任务数量
+CACHE_REFRESH_HOURS = 1  # 定时刷新缓存的间隔（小时）
+PLOT_COP_SURFACE = True  # 训练完成后是否将 COP 曲面图保存为文件
+
+# 预计算 COP 网格（compiled 推理模式）参数
+COMPILE_COP_GRID = True  # 训练完成后是否生成预计算网格
+COP_GRID_SHAPE = (101, 31, 41)  # 负荷率、冷却水温度、冷冻水温度方向的网格点数
+COP_GRID_HOLDOUT_SIZE = 2000  # 评估插值误差的留出点数量
+INFERENCE_MODES = ("svr", "compiled")  # svr：直接调用模型；compiled：在预计算网格上三线性插值
+DEFAULT_INFERENCE_MODE = "svr"
+
 # ========== 1. 数据获取与缓存机制 ==========
 
 def fetch_data(url, data):
@@ -47,80 +107,637 @@ def fetch_data(url, data):
         print(f"接口请求异常：{e}")
         return None
 
-def fetch_history_data(url, data):
-    """获取历史数据并缓存"""
-    if os.path.exists(CACHE_FILE):
-        with open(CACHE_FILE, "r") as f:
-            cache = json.load(f)
+def history_cache_key(url, data):
+    """
+    根据请求（接口地址、标签、采样间隔）计算缓存键，不同请求的数据互不覆盖。
+    起止时间不参与计算，同一组标签的不同时间段共用一份缓存，按已覆盖的时间段增量获取。
+    """
+    if request_range(data) is not None:
+        data = {field: value for field, value in data.items() if field not in HISTORY_RANGE_FIELDS}
+    payload = json.dumps({"url": url, "data": data}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class HistoryCache:
+    """
+    历史数据列式缓存：每个缓存键对应一个 .npy 文件（每行一列数据）和一个 .json 描述文件。
+    读取时内存映射，不复制数据；写入时先写临时文件再原子替换；
+    超过有效期的条目视为未命中，目录超出大小上限时按最近访问时间淘汰。
+    """
+
+    def __init__(self, directory=HISTORY_CACHE_DIR, ttl_seconds=HISTORY_CACHE_TTL_HOURS * 3600, max_bytes=HISTORY_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _info_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _data_path(self, key, version):
+        # 数据文件名带版本，写入新数据时不会覆盖正在被内存映射的旧文件
+        return os.path.join(self.directory, f"{key}_{version}.npy")
+
+    def load(self, key, check_ttl=True):
+        """返回 ({列名: 数组} 的只读视图, 描述)，未命中或已过期时返回 (None, None)"""
+        try:
+            with open(self._info_path(key), "r") as f:
+                info = json.load(f)
+            values = np.load(self._data_path(key, info["version"]), mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None, None
+        if check_ttl and time.time() - info["created_at"] > self.ttl_seconds:
+            return None, None
+        # 更新描述文件的修改时间，作为最近访问时间
+        os.utime(self._info_path(key))
+        return {name: np.asarray(values[i]) for i, name in enumerate(info["columns"])}, info
+
+    def get(self, key):
+        """返回 {列名: 数组} 的只读视图，未命中或已过期时返回 None"""
+        return self.load(key)[0]
+
+    def put(self, key, columns, **meta):
+        """
+        写入 {列名: 数组}（各列等长），meta 中的其他信息（请求参数、已覆盖时间段等）写入描述文件，
+        并在超出大小上限时淘汰最久未访问的条目。
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        values = np.vstack([np.asarray(v, dtype=np.float64) for v in columns.values()])
+        version = time.time_ns()
+        info = dict(meta, version=version, columns=list(columns), rows=int(values.shape[1]), created_at=time.time())
+        with self._lock:
+            atomic_write(self._data_path(key, version), lambda f: np.save(f, values))
+            atomic_write(self._info_path(key), lambda f: f.write(json.dumps(info, ensure_ascii=False).encode("utf-8")))
+            self._remove_data_files(key, keep=version)
+            self._evict()
+
+    def _remove_data_files(self, key, keep=None):
+        """删除指定缓存键的旧版本数据文件（文件仍被映射而无法删除时跳过）"""
+        for path in glob.glob(os.path.join(self.directory, f"{key}_*.npy")):
+            version = os.path.basename(path)[len(key) + 1:-len(".npy")]
+            if version.isdigit() and int(version) != keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _evict(self):
+        """目录总大小超出上限时，按描述文件的修改时间（最近访问时间）从旧到新删除条目"""
+        entries = []
+        total = 0
+        for info_path in glob.glob(os.path.join(self.directory, "*.json")):
+            key = os.path.basename(info_path)[:-len(".json")]
+            size = sum(os.path.getsize(p) for p in glob.glob(os.path.join(self.directory, f"{key}_*.npy")))
+            entries.append((os.stat(info_path).st_mtime_ns, key, size))
+            total += size
+        for _, key, size in sorted(entries)[:-1]:
+            if total <= self.max_bytes:
+                break
+            os.remove(self._info_path(key))
+            self._remove_data_files(key)
+            total -= size
+            print(f"历史数据缓存超出大小上限，已淘汰：{key}")
+
+
+history_cache = HistoryCache()
+
+
+def parse_epoch_seconds(time_list):
+    """将时间字符串列表批量解析为 int64 秒级时间戳（按本地 naive 时间处理）"""
+    try:
+        return np.array(time_list, dtype="datetime64[s]").astype(np.int64)
+    except ValueError:
+        # numpy 只接受补零的 ISO 格式，其余情况（如 "2024-09-1 00:00:00"）退回 strptime 逐条解析
+        epoch = datetime(1970, 1, 1)
+        return np.array([int((datetime.strptime(t, TIME_FORMAT) - epoch).total_seconds()) for t in time_list],
+                        dtype=np.int64)
+
+
+def parse_history_time(value):
+    """将 "%Y-%m-%d %H:%M:%S" 格式的时间字符串转换为秒级时间戳"""
+    return int(parse_epoch_seconds([value])[0])
+
+
+def format_history_time(epoch):
+    """将秒级时间戳转换为 "%Y-%m-%d %H:%M:%S" 格式的时间字符串"""
+    return str(np.datetime64(int(epoch), "s")).replace("T", " ")
+
+
+def request_range(data):
+    """返回请求的起止时间（秒级时间戳），请求中没有起止时间时返回 None"""
+    if not isinstance(data, dict) or not all(field in data for field in HISTORY_RANGE_FIELDS):
+        return None
+    return tuple(parse_history_time(data[field]) for field in HISTORY_RANGE_FIELDS)
+
+
+def merge_ranges(ranges):
+    """合并重叠或相邻的闭区间（秒级时间戳）"""
+    merged = []
+    for low, high in sorted(ranges):
+        if merged and low <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], high)
+        else:
+            merged.append([low, high])
+    return merged
+
+
+def missing_ranges(covered, start, end):
+    """
+    返回 [start, end] 中未被 covered 覆盖的时间段。
+    紧接已覆盖时间段的缺口从该时间段的最后一秒开始获取，保持采样时间与已有数据对齐（重复的行在合并时去重）。
+    """
+    missing = []
+    cursor = start
+    for low, high in covered:
+        if high < cursor:
+            continue
+        if low > end:
+            break
+        if low > cursor:
+            missing.append([cursor - 1 if cursor > start else cursor, low])
+        cursor = high + 1
+    if cursor <= end:
+        missing.append([cursor - 1 if cursor > start else cursor, end])
+    return missing
+
+
+def parse_history_result(result):
+    """将接口返回的数据转换为列数组，采样时间取 COP 标签的时间"""
+    columns = {TIME_COLUMN: parse_epoch_seconds([item["t"] for item in result[0]["values"]])}
+    for name, index in zip(HISTORY_COLUMNS, (1, 2, 3, 0)):
+        columns[name] = np.array([item["v"] for item in result[index]["values"]], dtype=np.float64)
+    if len({len(values) for values in columns.values()}) != 1:
+        raise Exception("历史数据各标签的数据量不一致")
+    return columns
+
+
+def append_history(columns, new_columns):
+    """
+    将新获取的行合并到缓存数据中并按时间排序，时间重复的行以新数据为准。
+    新数据中没有的列（如 cop_history）填充 NaN，表示需要重新计算。
+    """
+    if columns is None:
+        order = np.argsort(new_columns[TIME_COLUMN], kind="stable")
+        return {name: values[order] for name, values in new_columns.items()}
+    rows = len(new_columns[TIME_COLUMN])
+    keep = ~np.isin(columns[TIME_COLUMN], new_columns[TIME_COLUMN])
+    merged = {name: np.concatenate((values[keep], new_columns.get(name, np.full(rows, np.nan))))
+              for name, values in columns.items()}
+    order = np.argsort(merged[TIME_COLUMN], kind="stable")
+    return {name: values[order] for name, values in merged.items()}
+
+
+def sync_history(url, data, refresh=False, trim=False):
+    """
+    同步指定请求的历史数据缓存，返回 (缓存中的全部数据 {列名: 数组}, 描述)。
+    请求带起止时间时，只从接口获取缓存尚未覆盖的时间段并追加到缓存；没有起止时间时整体获取。
+    refresh 为 True 时忽略缓存有效期；trim 为 True 时删除早于请求开始时间的数据（滚动窗口）。
+    """
+    key = history_cache_key(url, data)
+    requested = request_range(data)
+    columns, info = history_cache.load(key, check_ttl=not refresh)
+    if requested is None:
+        if columns is not None and not refresh:
             print("从缓存加载历史数据")
-            return (
-                np.array(cache["x_data"]),
-                np.array(cache["y_data"]),
-                np.array(cache["z_data"]),
-                np.array(cache["cop_data"]),
-            )
-
-    result = fetch_data(url, data)
-    if result:
-        x_data = np.array([item["v"] for item in result[1]["values"]])
-        y_data = np.array([item["v"] for item in result[2]["values"]])
-        z_data = np.array([item["v"] for item in result[3]["values"]])
-        cop_data = np.array([item["v"] for item in result[0]["values"]])
-        print(x_data)
-        # 缓存数据
-        with open(CACHE_FILE, "w") as f:
-            json.dump({"x_data": x_data.tolist(), "y_data": y_data.tolist(), "z_data": z_data.tolist(), "cop_data": cop_data.tolist()}, f)
+            return columns, info
+        result = fetch_data(url, data)
+        if not result:
+            raise Exception("历史数据获取失败")
+        columns = append_history(None, parse_history_result(result))
+        history_cache.put(key, columns, params={"url": url, "data": data}, covered=None)
         print("已缓存历史数据")
-        return x_data, y_data, z_data ,cop_data
-    else:
-        raise Exception("历史数据获取失败")
+        return history_cache.load(key, check_ttl=False)
+
+    start, end = requested
+    covered = info["covered"] if columns is not None else []
+    missing = missing_ranges(covered, start, end)
+    if not missing and not (trim and len(columns[TIME_COLUMN]) and columns[TIME_COLUMN][0] < start):
+        print("从缓存加载历史数据")
+        return columns, info
+
+    fetched_rows = 0
+    for low, high in missing:
+        result = fetch_data(url, dict(data, start=format_history_time(low), end=format_history_time(high)))
+        if not result:
+            raise Exception("历史数据获取失败")
+        new_columns = parse_history_result(result)
+        fetched_rows += len(new_columns[TIME_COLUMN])
+        columns = append_history(columns, new_columns)
+        # 末尾时间段只记录到最后一个样本，接口延迟写入的数据在下次同步时补齐
+        if high == end:
+            high = max(low, int(new_columns[TIME_COLUMN].max())) if len(new_columns[TIME_COLUMN]) else low
+        covered = merge_ranges(covered + [[low, high]])
+
+    if trim:
+        keep = columns[TIME_COLUMN] >= start
+        columns = {name: values[keep] for name, values in columns.items()}
+        covered = [[max(low, start), high] for low, high in covered if high >= start]
+
+    history_cache.put(key, columns, params={"url": url, "data": data}, covered=covered,
+                      cop_history_model=info.get("cop_history_model") if info else None)
+    print(f"已缓存历史数据，获取 {len(missing)} 个时间段共 {fetched_rows} 行")
+    return history_cache.load(key, check_ttl=False)
+
+
+def fetch_history_data(url, data, refresh=False, columns=HISTORY_COLUMNS):
+    """获取历史数据（优先使用缓存，只获取缓存未覆盖的时间段），返回请求时间范围内的 columns 各列数据"""
+    cached, _ = sync_history(url, data, refresh)
+    requested = request_range(data)
+    if requested is not None:
+        low, high = np.searchsorted(cached[TIME_COLUMN], requested[0], "left"), np.searchsorted(cached[TIME_COLUMN], requested[1], "right")
+        cached = {name: values[low:high] for name, values in cached.items()}
+    return tuple(cached[name] for name in columns)
 
 
 # ========== 2. 数据验证与处理 ==========
 
-def validate_data_in_range(x_data, y_data, z_data, cop_data):
-    """验证数据是否在合理范围内"""
-    # 负荷率、冷却水温度、冷冻水温度、COP 是否超出范围
-    valid_data_indices = []
+# 各列的有效范围
+COLUMN_RANGES = {
+    "x_data": VALID_LOAD_LEVEL_RANGE,
+    "y_data": VALID_COOLING_TEMP_RANGE,
+    "z_data": VALID_FREEZING_TEMP_RANGE,
+    "cop_data": VALID_COP_RANGE,
+}
+
+def finite_rule(columns):
+    """剔除包含 NaN 或 inf 的行"""
+    mask = np.ones(len(columns["x_data"]), dtype=bool)
+    for values in columns.values():
+        mask &= np.isfinite(values)
+    return mask
+
+def range_rule(columns):
+    """剔除负荷率、冷却水温度、冷冻水温度或 COP 超出范围的行"""
+    mask = np.ones(len(columns["x_data"]), dtype=bool)
+    for key, (low, high) in COLUMN_RANGES.items():
+        mask &= (columns[key] >= low) & (columns[key] <= high)
+    return mask
 
-    for i in range(len(x_data)):
-        load_level = x_data[i]
-        cooling_temp = y_data[i]
-        freezing_temp = z_data[i]
-        cop = cop_data[i]
+def stuck_sensor_rule(columns, window=STUCK_SENSOR_WINDOW):
+    """剔除传感器卡死的行：任一列连续 window 个及以上样本取值完全相同"""
+    mask = np.ones(len(columns["x_data"]), dtype=bool)
+    if len(mask) == 0:
+        return mask
+    for values in columns.values():
+        # 按取值变化切分连续段，计算每一行所在段的长度
+        run_ids = np.concatenate(([0], np.cumsum(values[1:] != values[:-1])))
+        mask &= np.bincount(run_ids)[run_ids] < window
+    return mask
 
-        # 检查是否超出负荷率、冷却水温度、冷冻水温度和COP的范围
-        if (VALID_LOAD_LEVEL_RANGE[0] <= load_level <= VALID_LOAD_LEVEL_RANGE[1] and
-                VALID_COOLING_TEMP_RANGE[0] <= cooling_temp <= VALID_COOLING_TEMP_RANGE[1] and
-                VALID_FREEZING_TEMP_RANGE[0] <= freezing_temp <= VALID_FREEZING_TEMP_RANGE[1] and
-                VALID_COP_RANGE[0] <= cop <= VALID_COP_RANGE[1]):
-            valid_data_indices.append(i)
+# 可用的过滤规则，按 DATA_FILTER_RULES 中的顺序依次执行
+FILTER_RULES = {
+    "finite": finite_rule,
+    "range": range_rule,
+    "stuck": stuck_sensor_rule,
+}
 
-    print(f"有效数据数量：{len(valid_data_indices)} / {len(x_data)}")
-    return valid_data_indices
+def validate_data_in_range(x_data, y_data, z_data, cop_data, rules=DATA_FILTER_RULES):
+    """
+    按规则流水线验证数据是否在合理范围内，返回 (有效行布尔掩码, 过滤报告)。
+    过滤报告记录每条规则在前面规则的基础上额外剔除的行数和耗时。
+    """
+    columns = {"x_data": np.asarray(x_data), "y_data": np.asarray(y_data),
+               "z_data": np.asarray(z_data), "cop_data": np.asarray(cop_data)}
+    valid = np.ones(len(columns["x_data"]), dtype=bool)
+    report = []
+    for name in rules:
+        start = time.perf_counter()
+        rule_mask = FILTER_RULES[name](columns)
+        rejected = int(np.count_nonzero(valid & ~rule_mask))
+        valid &= rule_mask
+        report.append({"rule": name, "rejected": rejected, "seconds": round(time.perf_counter() - start, 6)})
+
+    print(f"有效数据数量：{int(np.count_nonzero(valid))} / {len(valid)}，过滤报告：{report}")
+    return valid, report
 
 # ========== 3. 模型训练与预测 ==========
 
-def save_model(model, filepath=MODEL_FILE):
-    """保存模型到文件"""
-    joblib.dump(model, filepath)
+def model_path(name=DEFAULT_MODEL_NAME):
+    """返回指定名称模型的文件路径，默认模型沿用 MODEL_FILE"""
+    if not MODEL_NAME_PATTERN.match(name):
+        raise ValueError(f"模型名称不合法：{name}")
+    if name == DEFAULT_MODEL_NAME:
+        return MODEL_FILE
+    return f"cop_model_{name}.pkl"
+
+
+def grid_path(name=DEFAULT_MODEL_NAME, model_version=None):
+    """
+    返回指定模型版本的预计算网格文件路径。
+    网格文件名带模型版本，生成新网格时不会覆盖正在被内存映射的旧文件。
+    """
+    return model_path(name)[:-len(".pkl")] + f"_grid_{model_version}.npy"
+
+
+def grid_info_path(name=DEFAULT_MODEL_NAME):
+    """返回指定模型的预计算网格描述文件路径（坐标范围、对应模型版本、插值误差）"""
+    return model_path(name)[:-len(".pkl")] + "_grid.json"
+
+
+def atomic_write(path, write):
+    """先写入同目录下的临时文件再原子替换，读取方不会看到写了一半的文件"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+# 注册表中的模型条目，version 为模型文件的修改时间（纳秒），多个进程加载同一文件时版本号一致
+ModelEntry = namedtuple("ModelEntry", ["name", "model", "version", "loaded_at"])
+
+# 预计算网格，values 为内存映射的 COP 网格，info 为网格描述，mtime 为描述文件的修改时间
+CompiledGrid = namedtuple("CompiledGrid", ["values", "info", "mtime"])
+
+
+class ModelRegistry:
+    """
+    进程内模型注册表：每个模型只从磁盘加载一次，之后通过文件修改时间检测新版本并整体替换条目。
+    支持按名称（如不同机房）管理多个模型。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._grids = {}
+
+    def get(self, name=DEFAULT_MODEL_NAME):
+        """返回当前版本的模型条目，模型文件不存在时返回 None"""
+        path = model_path(name)
+        try:
+            version = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        entry = self._entries.get(name)
+        if entry is not None and entry.version == version:
+            return entry
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.version != version:
+                entry = ModelEntry(name, joblib.load(path), version, time.time())
+                self._entries[name] = entry
+                print(f"已加载模型 {name}，版本：{version}")
+        return entry
+
+    def get_grid(self, name=DEFAULT_MODEL_NAME):
+        """返回与当前模型版本一致的预计算网格，网格不存在或已过期时返回 None"""
+        entry = self.get(name)
+        if entry is None:
+            return None
+        try:
+            mtime = os.stat(grid_info_path(name)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        grid = self._grids.get(name)
+        if grid is None or grid.mtime != mtime:
+            with self._lock:
+                grid = self._grids.get(name)
+                if grid is None or grid.mtime != mtime:
+                    try:
+                        with open(grid_info_path(name), "r") as f:
+                            info = json.load(f)
+                        # 内存映射加载，不复制网格数据
+                        grid = CompiledGrid(np.asarray(np.load(grid_path(name, info["model_version"]), mmap_mode="r")), info, mtime)
+                    except (OSError, ValueError, KeyError) as e:
+                        # 网格文件已被其他进程删除或替换到一半，丢弃缓存，退回 SVR 预测
+                        print(f"加载 COP 网格失败，使用 SVR 预测：{e}")
+                        self._grids.pop(name, None)
+                        return None
+                    self._grids[name] = grid
+        return grid if grid.info["model_version"] == entry.version else None
 
-def load_model(filepath=MODEL_FILE):
-    """从文件加载模型"""
-    if os.path.exists(filepath):
-        return joblib.load(filepath)
-    return None
+    def publish(self, name, model):
+        """保存新版本模型（先写临时文件再原子替换），并立即切换内存中的模型"""
+        path = model_path(name)
+        atomic_write(path, lambda f: joblib.dump(model, f))
+        entry = ModelEntry(name, model, os.stat(path).st_mtime_ns, time.time())
+        with self._lock:
+            self._entries[name] = entry
+        return entry
 
-def train_model(x_data, y_data, z_data, cop_data):
-    """训练 SVR 模型"""
+
+model_registry = ModelRegistry()
+
+
+def save_model(model, name=DEFAULT_MODEL_NAME):
+    """保存模型到文件并发布为当前版本"""
+    return model_registry.publish(name, model)
+
+def load_model(name=DEFAULT_MODEL_NAME):
+    """从注册表获取模型，只在首次使用或文件更新后才从磁盘加载"""
+    entry = model_registry.get(name)
+    return entry.model if entry is not None else None
+
+def training_set_path(name=DEFAULT_MODEL_NAME):
+    """返回指定模型的 incremental 训练集文件路径"""
+    return model_path(name)[:-len(".pkl")] + "_train.npz"
+
+
+# 训练配置：mode 为训练方式（TRAINING_MODES），kernel 为核函数（KERNELS），
+# similar_days 和 similarity_metric 为相似日数量和距离
+TrainingConfig = namedtuple("TrainingConfig", ["mode", "kernel", "similar_days", "similarity_metric"],
+                            defaults=(SIMILAR_DAYS_K, SIMILARITY_METRIC))
+DEFAULT_TRAINING_CONFIG = TrainingConfig(DEFAULT_TRAINING_MODE, DEFAULT_KERNEL)
+
+
+def training_config(req_data):
+    """读取请求中的训练方式、核函数、相似日数量和距离"""
+    config = TrainingConfig(req_data.get('training_mode', DEFAULT_TRAINING_MODE), req_data.get('kernel', DEFAULT_KERNEL),
+                            req_data.get('similar_days', SIMILAR_DAYS_K), req_data.get('similarity_metric', SIMILARITY_METRIC))
+    if config.mode not in TRAINING_MODES:
+        raise ValueError(f"不支持的训练方式：{config.mode}，可选 {TRAINING_MODES}")
+    if config.kernel not in KERNELS:
+        raise ValueError(f"不支持的核函数：{config.kernel}，可选 {KERNELS}")
+    if not isinstance(config.similar_days, int) or isinstance(config.similar_days, bool) or config.similar_days < 1:
+        raise ValueError(f"相似日数量必须是正整数：{config.similar_days}")
+    if config.similarity_metric not in SIMILARITY_METRICS:
+        raise ValueError(f"不支持的距离：{config.similarity_metric}，可选 {SIMILARITY_METRICS}")
+    return config
+
+
+def make_regressor(kernel=DEFAULT_KERNEL):
+    """创建回归模型：精确核使用 SVR，近似核使用 Nyström / 随机傅里叶特征 + 岭回归"""
+    if kernel == "nystroem":
+        return make_pipeline(Nystroem(gamma=GAMMA, n_components=KERNEL_COMPONENTS, random_state=0), Ridge(alpha=1.0 / C))
+    if kernel == "rff":
+        return make_pipeline(RBFSampler(gamma=GAMMA, n_components=KERNEL_COMPONENTS, random_state=0), Ridge(alpha=1.0 / C))
+    return SVR(kernel="rbf", C=C, gamma=GAMMA)
+
+
+def stratified_sample(X, budget, keep=None, strata=TRAINING_STRATA, seed=0):
+    """
+    在（负荷率、冷却水温度、冷冻水温度）空间按 strata 分箱分层抽样，返回不超过 budget 个行号。
+    每个分箱分到相同的名额（样本不足的分箱全部保留，余下名额分给其他分箱），稀疏工况不会被密集工况淹没。
+    keep 中的行（如支持向量）优先保留，只有 keep 本身超过 budget 时才对其抽样。
+    """
+    keep = np.zeros(len(X), dtype=bool) if keep is None else keep
+    rng = np.random.default_rng(seed)
+    kept = np.flatnonzero(keep)
+    if len(kept) >= budget:
+        return np.sort(rng.choice(kept, budget, replace=False))
+    candidates = np.flatnonzero(~keep)
+    budget -= len(kept)
+    if len(candidates) <= budget:
+        return np.arange(len(X))
+
+    ranges = np.array([VALID_LOAD_LEVEL_RANGE, VALID_COOLING_TEMP_RANGE, VALID_FREEZING_TEMP_RANGE], dtype=np.float64)
+    bins = np.clip(((X[candidates] - ranges[:, 0]) / (ranges[:, 1] - ranges[:, 0]) * strata).astype(np.intp), 0, np.array(strata) - 1)
+    cells = np.ravel_multi_index(bins.T, strata)
+
+    # 每个分箱的名额：最大的 quota 使 sum(min(count, quota)) 不超过 budget
+    counts = np.bincount(cells)
+    counts = np.sort(counts[counts > 0])
+    below = np.concatenate(([0], np.cumsum(counts)[:-1]))  # 比当前分箱样本少的分箱的样本总数
+    used = below + counts * np.arange(len(counts), 0, -1)  # quota 取各分箱样本数时使用的名额
+    full = np.searchsorted(used, budget, side="right")  # 前 full 个分箱可以全部保留
+    quota = (budget - below[full]) // (len(counts) - full)
+
+    # 分箱内随机排序后，取每个分箱的前 quota 个，余下的名额随机分给样本更多的分箱（每个分箱至多再取 1 个）
+    order = rng.permutation(len(candidates))
+    order = order[np.argsort(cells[order], kind="stable")]
+    sorted_cells = cells[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_cells, sorted_cells, side="left")
+    chosen = rank < quota
+    chosen[rng.choice(np.flatnonzero(rank == quota), budget - np.count_nonzero(chosen), replace=False)] = True
+    selected = candidates[order[chosen]]
+    return np.sort(np.concatenate((kept, selected)))
+
+
+def incremental_training_set(X, y, times, name=DEFAULT_MODEL_NAME, budget=MAX_TRAINING_SAMPLES):
+    """
+    合并上次的代表性训练集和比它更新的数据（采样时间 times 晚于上次训练集的 last_time），保留上次基础模型的支持向量，
+    再分层抽样到 budget 个样本以内。times 为 None 时全部视为新数据。返回 (X, y, 新的 last_time)。
+    """
+    try:
+        previous = np.load(training_set_path(name))
+    except FileNotFoundError:
+        previous = None
+    last_time = int(times.max()) if times is not None and len(times) else None
+    keep = np.zeros(len(X), dtype=bool)
+    if previous is not None:
+        if "last_time" in previous.files and times is not None:
+            # 只合并上次训练集之后的新数据，已经在训练集中的时间段不再重复加入
+            previous_time = int(previous["last_time"])
+            newer = times > previous_time
+            X, y = X[newer], y[newer]
+            keep = keep[newer]
+            last_time = max(previous_time, last_time) if last_time is not None else previous_time
+        elif "last_time" in previous.files:
+            last_time = int(previous["last_time"])
+        previous_keep = np.zeros(len(previous["X"]), dtype=bool)
+        if "support" in previous.files:
+            previous_keep[previous["support"]] = True
+        X = np.concatenate((previous["X"], X))
+        y = np.concatenate((previous["y"], y))
+        keep = np.concatenate((previous_keep, keep))
+    selected = stratified_sample(X, budget, keep)
+    print(f"incremental 训练集：{len(selected)} / {len(X)} 个样本，其中支持向量 {int(np.count_nonzero(keep[selected]))} 个")
+    return X[selected], y[selected], last_time
+
+
+def train_model(x_data, y_data, z_data, cop_data, name=DEFAULT_MODEL_NAME, config=DEFAULT_TRAINING_CONFIG, times=None):
+    """
+    训练 SVR 模型（或近似核模型）。incremental 方式把新数据（按采样时间 times 只取上次之后的部分）合并进有界的代表性训练集后训练，
+    并保存该训练集和模型的支持向量，供下次合并使用。
+    """
     # 将负荷率、合成温度特征堆叠为一个输入数组
     X = np.vstack((x_data, y_data, z_data)).T
-    model = SVR(kernel="rbf", C=C, gamma=GAMMA)
-    model.fit(X, cop_data)
-    save_model(model)
+    y = np.asarray(cop_data, dtype=np.float64)
+    incremental = config.mode == "incremental"
+    if incremental:
+        X, y, last_time = incremental_training_set(X, y, None if times is None else np.asarray(times), name)
+    model = make_regressor(config.kernel)
+    model.fit(X, y)
+    entry = save_model(model, name)
+    if incremental:
+        support = getattr(model, "support_", np.array([], dtype=np.intp))
+        saved = dict(X=X, y=y, support=support, model_version=entry.version)
+        if last_time is not None:
+            saved["last_time"] = last_time
+        atomic_write(training_set_path(name), lambda f: np.savez(f, **saved))
     print("模型训练完成并保存")
+    if COMPILE_COP_GRID:
+        compile_cop_grid(model, entry.version, name)
     return model
 
+# 三线性插值中单元格 8 个角点相对左下角的偏移
+GRID_CORNER_OFFSETS = np.array([[dx, dy, dz] for dx in (0, 1) for dy in (0, 1) for dz in (0, 1)])
+
+def interpolate_cop_grid(values, ranges, points):
+    """在预计算网格 values 上对 points（n×3）做三线性插值，超出网格范围的坐标按边界处理"""
+    ranges = np.asarray(ranges, dtype=np.float64)
+    sizes = np.array(values.shape)
+    position = (points - ranges[:, 0]) / (ranges[:, 1] - ranges[:, 0]) * (sizes - 1)
+    lower = np.clip(np.floor(position).astype(np.intp), 0, sizes - 2)
+    fraction = np.clip(position - lower, 0, 1)[:, None, :]
+
+    corners = lower[:, None, :] + GRID_CORNER_OFFSETS  # (n, 8, 3)
+    corner_values = values[corners[..., 0], corners[..., 1], corners[..., 2]]
+    corner_weights = np.where(GRID_CORNER_OFFSETS, fraction, 1 - fraction).prod(axis=2)
+    return (corner_values * corner_weights).sum(axis=1)
+
+def compile_cop_grid(model, model_version, name=DEFAULT_MODEL_NAME, shape=COP_GRID_SHAPE, holdout_size=COP_GRID_HOLDOUT_SIZE):
+    """
+    在有效输入范围内按 shape 生成网格并计算每个网格点的 COP，保存为 .npy（加载时内存映射）。
+    同时在随机留出点上比较插值结果与 SVR 预测值，记录最大和平均插值误差。
+    """
+    ranges = [VALID_LOAD_LEVEL_RANGE, VALID_COOLING_TEMP_RANGE, VALID_FREEZING_TEMP_RANGE]
+    axes = [np.linspace(low, high, size) for (low, high), size in zip(ranges, shape)]
+    mesh = np.meshgrid(*axes, indexing="ij")
+    values = model.predict(np.column_stack([m.ravel() for m in mesh])).reshape(shape)
+
+    rng = np.random.default_rng(0)
+    holdout = np.column_stack([rng.uniform(low, high, holdout_size) for low, high in ranges])
+    errors = np.abs(interpolate_cop_grid(values, ranges, holdout) - model.predict(holdout))
+    info = {
+        "model_version": model_version,
+        "shape": list(shape),
+        "ranges": [list(r) for r in ranges],
+        "max_abs_error": float(errors.max()),
+        "mean_abs_error": float(errors.mean()),
+    }
+
+    # 先写网格再写描述文件，描述文件中的 model_version 与当前模型一致时网格才会被使用
+    path = grid_path(name, model_version)
+    atomic_write(path, lambda f: np.save(f, values))
+    atomic_write(grid_info_path(name), lambda f: f.write(json.dumps(info).encode("utf-8")))
+
+    # 清理旧版本网格，仍被其他进程映射的文件留到下次清理
+    prefix = model_path(name)[:-len(".pkl")] + "_grid_"
+    for old_path in glob.glob(grid_path(name, "*")):
+        if old_path[len(prefix):-len(".npy")].isdigit() and old_path != path:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+    print(f"COP 网格已生成：{shape}，最大插值误差 {info['max_abs_error']:.5f}，平均插值误差 {info['mean_abs_error']:.5f}")
+    return info
+
+def predict_cop_values(entry, inputs, mode=DEFAULT_INFERENCE_MODE):
+    """
+    按推理模式预测 COP，返回 (预测值数组, 响应头)。
+    compiled 模式下如果网格不存在或与当前模型版本不一致，则退回 SVR 预测。
+    """
+    headers = model_headers(entry)
+    if mode == "compiled":
+        grid = model_registry.get_grid(entry.name)
+        if grid is not None:
+            headers["X-Inference-Mode"] = "compiled"
+            headers["X-Grid-Max-Error"] = str(grid.info["max_abs_error"])
+            return interpolate_cop_grid(grid.values, grid.info["ranges"], inputs), headers
+    headers["X-Inference-Mode"] = "svr"
+    return entry.model.predict(inputs), headers
+
+def inference_mode(req_data):
+    """读取请求中的推理模式"""
+    mode = req_data.get('mode', DEFAULT_INFERENCE_MODE)
+    if mode not in INFERENCE_MODES:
+        raise ValueError(f"不支持的推理模式：{mode}，可选 {INFERENCE_MODES}")
+    return mode
+
 def calculate_cop_history(x_data, y_data, z_data, model):
     """计算 COP 历史值数组"""
     inputs = np.vstack((x_data, y_data, z_data)).T
@@ -128,27 +745,99 @@ def calculate_cop_history(x_data, y_data, z_data, model):
 
 # ========== 3. 相似日逻辑 ==========
 
-def find_similar_days(history_data, target_cop=None, similarity_metric="euclidean"):
-    """
-    找到与目标 COP 值相似的历史日期。
-    """
-    cop_values = np.array(history_data["cop_data"])
-    if target_cop is None:
-        target_cop = np.mean(cop_values)
-        print(f"未提供 target_cop，默认使用全局平均值：{target_cop}")
-    target_cop = np.array(target_cop).reshape(1, -1)
-    cop_values = cop_values.reshape(-1, 1)
-    distances = cdist(target_cop, cop_values, metric=similarity_metric)
-    similar_indices = np.argsort(distances[0])[:5]
-    print(f"找到相似日索引：{similar_indices}")
-    return similar_indices
-
-def optimize_data_with_similar_days(history_data, similar_indices):
-    """使用相似日优化数据"""
-    x_data = history_data["x_data"][similar_indices]
-    y_data = history_data["y_data"][similar_indices]
-    z_data = history_data["z_data"][similar_indices]
-    cop_data = history_data["cop_data"][similar_indices]
+def history_fingerprint(times):
+    """历史数据的标识（行数、起止时间），用于判断相似日索引是否需要重建"""
+    return (len(times), int(times[0]), int(times[-1])) if len(times) else (0, 0, 0)
+
+
+class SimilarDayIndex:
+    """
+    相似日索引：把历史数据按天聚合为特征向量（日均负荷率、冷却水温度、冷冻水温度和 24 小时 COP 曲线），
+    按特征标准化后建立 KD 树。欧氏、曼哈顿、切比雪夫距离用 KD 树查询，其他距离用 cdist + argpartition 取前 k 个。
+    """
+
+    def __init__(self, times, x_data, y_data, z_data, cop_data, min_hours=SIMILAR_DAY_MIN_HOURS):
+        times = np.asarray(times, dtype=np.int64)
+        self.fingerprint = history_fingerprint(times)
+        day_numbers, day_index = np.unique(times // 86400, return_inverse=True)
+        day_count = len(day_numbers)
+        samples = np.bincount(day_index, minlength=day_count)
+        means = [np.bincount(day_index, weights=values, minlength=day_count) / samples for values in (x_data, y_data, z_data, cop_data)]
+
+        # 逐小时 COP 曲线，缺少数据的小时用当天的平均 COP 代替
+        cells = day_index * 24 + (times % 86400) // 3600
+        hour_samples = np.bincount(cells, minlength=day_count * 24).reshape(day_count, 24)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            profile = np.bincount(cells, weights=cop_data, minlength=day_count * 24).reshape(day_count, 24) / hour_samples
+        profile = np.where(hour_samples > 0, profile, means[3][:, None])
+
+        # 数据不足 min_hours 个小时的天不参与查找（所有天都不足时保留数据最多的天）
+        hours = np.count_nonzero(hour_samples, axis=1)
+        eligible = hours >= min(min_hours, hours.max()) if day_count else np.zeros(0, dtype=bool)
+        features = np.column_stack(means[:3] + [profile])[eligible]
+
+        self.days = day_numbers[eligible] * 86400  # 每个相似日 0 点的秒级时间戳
+        self.mean = features.mean(axis=0) if len(features) else np.zeros(features.shape[1])
+        self.scale = features.std(axis=0) if len(features) else np.ones(features.shape[1])
+        self.scale[self.scale == 0] = 1
+        self.features = (features - self.mean) / self.scale
+        self.tree = cKDTree(self.features)
+
+    def day_vector(self, day):
+        """返回指定日期（0 点时间戳）的原始特征向量"""
+        return self.features[np.searchsorted(self.days, day)] * self.scale + self.mean
+
+    def query(self, target=None, k=SIMILAR_DAYS_K, metric=SIMILARITY_METRIC):
+        """
+        返回与 target（原始特征向量）最相似的 k 天（0 点时间戳），按相似度从高到低排列。
+        未提供 target 时以最近一天为目标，结果包含该天本身。
+        """
+        if len(self.days) == 0:
+            return self.days
+        target = self.features[-1] if target is None else (np.asarray(target, dtype=np.float64) - self.mean) / self.scale
+        k = min(k, len(self.days))
+        if metric in TREE_METRICS:
+            _, nearest = self.tree.query(target, k=k, p=TREE_METRICS[metric])
+            return self.days[np.atleast_1d(nearest)]
+        distances = cdist(target.reshape(1, -1), self.features, metric=metric)[0]
+        nearest = np.argpartition(distances, k - 1)[:k]
+        return self.days[nearest[np.argsort(distances[nearest])]]
+
+
+# 已建立的相似日索引：缓存键 -> SimilarDayIndex，历史数据变化（行数或起止时间不同）时重建
+similar_day_indexes = {}
+similar_day_indexes_lock = threading.Lock()
+
+
+def similar_day_index(history_data, key=None):
+    """返回 history_data 对应的相似日索引，同一份历史数据只建立一次"""
+    times = np.asarray(history_data["time"], dtype=np.int64)
+    index = similar_day_indexes.get(key) if key is not None else None
+    if index is None or index.fingerprint != history_fingerprint(times):
+        index = SimilarDayIndex(times, history_data["x_data"], history_data["y_data"], history_data["z_data"], history_data["cop_data"])
+        if key is not None:
+            with similar_day_indexes_lock:
+                similar_day_indexes[key] = index
+    return index
+
+
+def find_similar_days(history_data, target=None, k=SIMILAR_DAYS_K, similarity_metric=SIMILARITY_METRIC, key=None):
+    """
+    找到与目标日相似的历史日期（0 点时间戳）。
+    target 为目标日的特征向量（日均负荷率、冷却水温度、冷冻水温度和 24 小时 COP），默认使用最近一天。
+    """
+    index = similar_day_index(history_data, key)
+    similar_days = index.query(target, k, similarity_metric)
+    print(f"找到相似日：{[format_history_time(day)[:10] for day in similar_days]}")
+    return similar_days
+
+def optimize_data_with_similar_days(history_data, similar_days):
+    """使用相似日优化数据：取出相似日当天的全部样本"""
+    in_similar_days = np.isin(np.asarray(history_data["time"], dtype=np.int64) // 86400 * 86400, similar_days)
+    x_data = history_data["x_data"][in_similar_days]
+    y_data = history_data["y_data"][in_similar_days]
+    z_data = history_data["z_data"][in_similar_days]
+    cop_data = history_data["cop_data"][in_similar_days]
     return x_data, y_data, z_data, cop_data
 
 # ========== 4. 数据可视化 ==========
@@ -164,8 +853,8 @@ def create_combined_temperature_feature(cooling_temp, freezing_temp, method="ave
     else:
         raise ValueError("方法仅支持 'average' 或 'difference'")
 
-def plot_cop_surface(x_data, cooling_temp_data, freezing_temp_data, cop_data, model, method="average"):
-    """绘制 COP 曲面和原始数据点"""
+def plot_cop_surface(x_data, cooling_temp_data, freezing_temp_data, cop_data, model, output_file, method="average"):
+    """绘制 COP 曲面和原始数据点，并保存到 output_file（不弹出窗口，可在后台线程中调用）"""
     # 合成温度特征
     combined_temp_data = create_combined_temperature_feature(cooling_temp_data, freezing_temp_data, method)
 
@@ -181,8 +870,8 @@ def plot_cop_surface(x_data, cooling_temp_data, freezing_temp_data, cop_data, mo
     normed_cop_pred = Z_pred / np.max(Z_pred)
     facecolors = plt.cm.viridis(normed_cop_pred)  # 颜色映射
 
-    # 绘制曲面
-    fig = plt.figure()
+    # 绘制曲面（直接使用 Figure，不依赖 pyplot 的全局状态）
+    fig = Figure()
     ax = fig.add_subplot(111, projection="3d")
     surf = ax.plot_surface(X_grid, Y_grid, Z_pred, rstride=1, cstride=1, facecolors=facecolors, alpha=0.8)
 
@@ -197,21 +886,236 @@ def plot_cop_surface(x_data, cooling_temp_data, freezing_temp_data, cop_data, mo
     # 添加色条（颜色映射）
     fig.colorbar(surf, ax=ax, shrink=0.5, aspect=5)
 
-    # 显示图形
-    plt.show()
+    # 保存图形
+    fig.savefig(output_file)
+    print(f"COP 曲面图已保存：{output_file}")
+    return output_file
 
 # ========== 5. 定时任务与主逻辑 ==========
 
-def update_cop_cache(url, data):
-    """定时更新缓存"""
-    x_data, y_data, z_data, cop_data = fetch_history_data(url, data)
-    model = load_model()
+class JobCancelled(Exception):
+    """训练任务被取消"""
+
+
+class TrainingJob:
+    """后台训练任务：记录状态、进度和结果，运行中的任务在各阶段之间检查取消请求"""
+
+    def __init__(self, job_id, model_name):
+        self.job_id = job_id
+        self.model_name = model_name
+        self.status = "queued"  # queued / running / succeeded / failed / cancelled
+        self.progress = 0
+        self.stage = "排队中"
+        self.message = None
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self.cancel_event = threading.Event()
+
+    def checkpoint(self, progress, stage):
+        """更新进度，如果已请求取消则中止任务"""
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+        self.progress = progress
+        self.stage = stage
+        print(f"训练任务 {self.job_id}：{progress}% {stage}")
+
+    def to_dict(self):
+        def format_time(timestamp):
+            return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S") if timestamp else None
+
+        return {
+            "job_id": self.job_id,
+            "model": self.model_name,
+            "status": self.status,
+            "progress": self.progress,
+            "stage": self.stage,
+            "message": self.message,
+            "result": self.result,
+            "created_at": format_time(self.created_at),
+            "started_at": format_time(self.started_at),
+            "finished_at": format_time(self.finished_at),
+        }
+
+
+training_executor = ThreadPoolExecutor(max_workers=TRAINING_WORKERS, thread_name_prefix="cop-training")
+training_jobs = {}
+training_jobs_lock = threading.Lock()
+
+
+def submit_training_job(url, data, model_name=DEFAULT_MODEL_NAME, config=DEFAULT_TRAINING_CONFIG):
+    """提交后台训练任务，立即返回任务对象"""
+    job = TrainingJob(uuid.uuid4().hex, model_name)
+    with training_jobs_lock:
+        finished = [j for j in training_jobs.values() if j.finished_at is not None]
+        for old_job in sorted(finished, key=lambda j: j.finished_at)[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            del training_jobs[old_job.job_id]
+        training_jobs[job.job_id] = job
+    job.future = training_executor.submit(run_training_job, job, url, data, config)
+    return job
+
+
+def cancel_training_job(job):
+    """取消任务：排队中的任务直接取消，运行中的任务在下一个阶段开始前停止"""
+    if job.future is not None and job.future.cancel():
+        job.status = "cancelled"
+        job.stage = "已取消"
+        job.finished_at = time.time()
+    elif job.finished_at is None:
+        job.cancel_event.set()
+
+
+def run_training_job(job, url, data, config=DEFAULT_TRAINING_CONFIG):
+    """在后台线程中执行训练流程，并记录任务状态"""
+    job.status = "running"
+    job.started_at = time.time()
+    try:
+        job.result = train_cop_model(url, data, job.model_name, job.checkpoint, config)
+        job.status = "succeeded"
+        job.progress = 100
+        job.stage = "已完成"
+    except JobCancelled:
+        job.status = "cancelled"
+        job.stage = "已取消"
+    except Exception as e:
+        print(f"训练任务 {job.job_id} 失败：{e}")
+        job.status = "failed"
+        job.message = str(e)
+    finally:
+        job.finished_at = time.time()
+
+
+def train_cop_model(url, data, model_name=DEFAULT_MODEL_NAME, checkpoint=lambda progress, stage: None, config=DEFAULT_TRAINING_CONFIG):
+    """训练流程：获取历史数据、过滤、训练、相似日优化、绘图并注册定时刷新"""
+    checkpoint(5, "获取历史数据")
+    time_data, x_data, y_data, z_data, cop_data = fetch_history_data(url, data, columns=(TIME_COLUMN,) + HISTORY_COLUMNS)
+
+    checkpoint(20, "过滤数据")
+    valid_mask, filter_report = validate_data_in_range(x_data, y_data, z_data, cop_data)
+
+    # 过滤不合适的数据
+    time_data = time_data[valid_mask]
+    x_data = x_data[valid_mask]
+    y_data = y_data[valid_mask]
+    z_data = z_data[valid_mask]
+    cop_data = cop_data[valid_mask]
+
+    # 加载或训练模型
+    checkpoint(30, "加载或训练模型")
+    # incremental 方式每次都把新数据合并进代表性训练集并训练基础模型
+    model = load_model(model_name)
+    if model is None or config.mode == "incremental":
+        model = train_model(x_data, y_data, z_data, cop_data, model_name, config, time_data)
+
+    # 查找相似日
+    checkpoint(60, "查找相似日")
+    history_data = {"time": time_data, "x_data": x_data, "y_data": y_data, "z_data": z_data, "cop_data": cop_data}
+    similar_days = find_similar_days(history_data, k=config.similar_days, similarity_metric=config.similarity_metric,
+                                     key=(history_cache_key(url, data), tuple(DATA_FILTER_RULES)))
+
+    # 用相似日数据优化模型
+    optimized_x, optimized_y, optimized_z, optimized_cop = optimize_data_with_similar_days(history_data, similar_days)
+
+    # 用相似日数据重新训练模型
+    checkpoint(70, "用相似日数据重新训练模型")
+    # 只用相似日的样本训练，不合并代表性训练集
+    model = train_model(optimized_x, optimized_y, optimized_z, optimized_cop, model_name, config._replace(mode="full"))
+
+    # 可视化
+    plot_file = None
+    if PLOT_COP_SURFACE:
+        checkpoint(90, "保存 COP 曲面图")
+        plot_file = plot_cop_surface(x_data, y_data, z_data, cop_data, model, f"cop_surface_{model_name}.png")
+
+    # 定时任务：每小时更新缓存
+    schedule_cache_refresh(url, data, model_name)
+
+    return {
+        "model": model_name,
+        "model_version": model_registry.get(model_name).version,
+        "training_mode": config.mode,
+        "kernel": config.kernel,
+        "samples": int(len(x_data)),
+        "similar_days": [format_history_time(day)[:10] for day in similar_days],
+        "filter_report": filter_report,
+        "plot_file": plot_file,
+    }
+
+
+scheduler_thread = None
+scheduler_lock = threading.Lock()
+
+
+def run_scheduler():
+    """定时任务线程：休眠到下一个任务到期再执行，不占用 CPU"""
+    while True:
+        idle_seconds = schedule.idle_seconds()
+        if idle_seconds is None:
+            time.sleep(60)
+        elif idle_seconds > 0:
+            time.sleep(min(idle_seconds, 60))
+        schedule.run_pending()
+
+
+def schedule_cache_refresh(url, data, model_name=DEFAULT_MODEL_NAME):
+    """注册（或替换）指定模型的定时缓存刷新，刷新任务交给训练线程池执行"""
+    global scheduler_thread
+    tag = f"cop-cache-{model_name}"
+    schedule.clear(tag)
+    schedule.every(CACHE_REFRESH_HOURS).hours.do(training_executor.submit, run_cache_refresh, url, data, model_name).tag(tag)
+    with scheduler_lock:
+        if scheduler_thread is None:
+            scheduler_thread = threading.Thread(target=run_scheduler, name="cop-scheduler", daemon=True)
+            scheduler_thread.start()
+
+
+def rolling_window(data, now=None):
+    """将请求的起止时间整体平移到当前时间（窗口长度不变），定时刷新只需获取新增的时间段"""
+    requested = request_range(data)
+    if requested is None:
+        return data
+    now = parse_history_time(datetime.now().strftime(TIME_FORMAT)) if now is None else now
+    shift = max(0, now - requested[1])
+    return dict(data, start=format_history_time(requested[0] + shift), end=format_history_time(requested[1] + shift))
+
+
+# 各模型最近一次定时刷新的结果：模型名称 -> {"status", "message", "finished_at"}
+cache_refresh_results = {}
+
+
+def run_cache_refresh(url, data, model_name=DEFAULT_MODEL_NAME):
+    """在训练线程池中执行定时刷新；线程池返回的 Future 无人读取，异常在这里记录日志和结果，不会被静默丢弃"""
+    try:
+        update_cop_cache(url, data, model_name)
+        cache_refresh_results[model_name] = {"status": "succeeded", "message": None, "finished_at": time.time()}
+    except Exception as e:
+        print(f"模型 {model_name} 的 COP 历史缓存定时刷新失败：{e}")
+        cache_refresh_results[model_name] = {"status": "failed", "message": str(e), "finished_at": time.time()}
+
+
+def update_cop_cache(url, data, model_name=DEFAULT_MODEL_NAME):
+    """定时更新缓存：只获取新增的时间段，并只为新增的行计算 COP 历史值"""
+    window = rolling_window(data)
+    columns, info = sync_history(url, window, refresh=True, trim=True)
+    x_data, y_data, z_data, cop_data = (columns[name] for name in HISTORY_COLUMNS)
+    model = load_model(model_name)
     if model is None:
-        model = train_model(x_data, y_data, z_data, cop_data)
-    cop_history = calculate_cop_history(x_data, y_data, z_data, model)
-    with open(CACHE_FILE, "w") as f:
-        json.dump({"x_data": x_data.tolist(), "y_data": y_data.tolist(), "z_data": z_data.tolist(), "cop_data": cop_data.tolist(), "cop_history": cop_history.tolist()}, f)
-    print("COP 历史缓存已更新")
+        model = train_model(x_data, y_data, z_data, cop_data, model_name)
+    cop_history_model = [model_name, model_registry.get(model_name).version]
+
+    # 模型版本变化时全部重新计算，否则只计算新增（cop_history 为 NaN）的行
+    if "cop_history" in columns and info.get("cop_history_model") == cop_history_model:
+        cop_history = np.array(columns["cop_history"])
+    else:
+        cop_history = np.full(len(x_data), np.nan)
+    new_rows = np.isnan(cop_history)
+    if new_rows.any():
+        cop_history[new_rows] = calculate_cop_history(x_data[new_rows], y_data[new_rows], z_data[new_rows], model)
+    history_cache.put(history_cache_key(url, window), dict(columns, cop_history=cop_history), params=info["params"],
+                      covered=info["covered"], cop_history_model=cop_history_model)
+    print(f"COP 历史缓存已更新，新计算 {int(np.count_nonzero(new_rows))} 行")
 
 def validate_single_input(load_level, temperature, frozen_temp):
     """
@@ -230,6 +1134,26 @@ def validate_single_input(load_level, temperature, frozen_temp):
     return True
 
 
+def validate_input_arrays(load_level, temperature, frozen_temp):
+    """
+    批量验证负荷率、冷却水温度和冷冻水温度数组，返回每行是否在合理范围内的布尔掩码。
+    NaN 视为无效。
+    """
+    return ((load_level >= VALID_LOAD_LEVEL_RANGE[0]) & (load_level <= VALID_LOAD_LEVEL_RANGE[1]) &
+            (temperature >= VALID_COOLING_TEMP_RANGE[0]) & (temperature <= VALID_COOLING_TEMP_RANGE[1]) &
+            (frozen_temp >= VALID_FREEZING_TEMP_RANGE[0]) & (frozen_temp <= VALID_FREEZING_TEMP_RANGE[1]))
+
+
+def model_headers(entry):
+    """响应头：当前使用的模型名称、版本和加载时间"""
+    return {
+        "Content-Type": "application/json",
+        "X-Model-Name": entry.name,
+        "X-Model-Version": str(entry.version),
+        "X-Model-Loaded-At": datetime.fromtimestamp(entry.loaded_at).strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
 @app.route("/select_cop", methods=['POST'])
 def predict_cop():
     """
@@ -241,63 +1165,90 @@ def predict_cop():
         load_level = req_data['load_level']  # 获取 load_level
         temperature = req_data['temperature'] # 获取 temperature
         frozen_temp = req_data['frozen_temp']  # 获取 frozen_temp
+        mode = inference_mode(req_data)  # 获取推理模式（默认 svr）
+        entry = model_registry.get(req_data.get('model', DEFAULT_MODEL_NAME))  # 获取模型（默认 default）
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 400
 
-    model = load_model()
+    if entry is None:
+        return jsonify({"status": "error", "message": "模型不存在，请先训练模型"}), 400
 
     # 数据验证
     if not validate_single_input(load_level, temperature, frozen_temp):
         abort(400, description="输入数据无效，无法进行预测。")
 
-    input_data = np.array([[load_level, temperature, frozen_temp]])
-    predicted_cop = model.predict(input_data)
+    input_data = np.array([[load_level, temperature, frozen_temp]], dtype=np.float64)
+    predicted_cop, headers = predict_cop_values(entry, input_data, mode)
     print(f"负荷率：{load_level}%，冷却水温度：{temperature}℃，冷冻水温度：{frozen_temp}℃ 的预测值 COP: {predicted_cop[0]}")
-    return json.dumps((predicted_cop)[0]), 200, {"Content-Type": "application/json"}
+    return json.dumps((predicted_cop)[0]), 200, headers
+
+@app.route("/select_cop/batch", methods=['POST'])
+def predict_cop_batch():
+    """
+    批量预测 COP：输入为等长的 load_level、temperature、frozen_temp 数组，
+    一次性完成范围校验和模型预测，超出范围的行预测值为 null，并在 valid 中标记为 false。
+    """
+    try:
+        req_data = request.json
+        load_level = np.asarray(req_data['load_level'], dtype=np.float64)
+        temperature = np.asarray(req_data['temperature'], dtype=np.float64)
+        frozen_temp = np.asarray(req_data['frozen_temp'], dtype=np.float64)
+        if load_level.ndim != 1 or not (load_level.shape == temperature.shape == frozen_temp.shape):
+            raise ValueError("load_level、temperature、frozen_temp 必须是等长的一维数组")
+        mode = inference_mode(req_data)
+        entry = model_registry.get(req_data.get('model', DEFAULT_MODEL_NAME))
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    if entry is None:
+        return jsonify({"status": "error", "message": "模型不存在，请先训练模型"}), 400
+
+    valid = validate_input_arrays(load_level, temperature, frozen_temp)
+    predicted_cop = np.zeros(len(load_level))
+    headers = model_headers(entry)
+    if valid.any():
+        inputs = np.column_stack((load_level, temperature, frozen_temp))[valid]
+        predicted_cop[valid], headers = predict_cop_values(entry, inputs, mode)
+
+    predictions = predicted_cop.tolist()
+    for i in np.flatnonzero(~valid).tolist():
+        predictions[i] = None
+    print(f"批量预测 COP：{int(valid.sum())} / {len(valid)} 行有效")
+    return json.dumps({"predicted_cop": predictions, "valid": valid.tolist()}), 200, headers
 
 @app.route("/train_cop_model", methods=['POST'])
 def update_and_train_cop_model():
-    """主入口函数"""
-    # 获取历史数据
+    """提交后台训练任务，立即返回任务 ID"""
     try:
         request_data = request.json
         url = request_data['url']  # 获取 URL
         data = request_data['data']  # 获取 data
-        x_data, y_data, z_data, cop_data = fetch_history_data(url, data)  #Todo
+        model_name = request_data.get('model', DEFAULT_MODEL_NAME)  # 获取模型名称
+        model_path(model_name)
+        config = training_config(request_data)  # 获取训练方式和核函数
     except Exception as e:
         print(e)
         return jsonify({"status": "error", "message": str(e)}), 400
 
-    valid_indices = validate_data_in_range(x_data, y_data, z_data, cop_data)
+    job = submit_training_job(url, data, model_name, config)
+    return jsonify({"status": "success", "job_id": job.job_id, "message": "训练任务已提交"}), 202
 
-    # 过滤不合适的数据
-    x_data = x_data[valid_indices]
-    y_data = y_data[valid_indices]
-    z_data = z_data[valid_indices]
-    cop_data = cop_data[valid_indices]
-
-    # 加载或训练模型
-    model = load_model()
-    if model is None:
-        model = train_model(x_data, y_data, z_data, cop_data)
-    # 查找相似日
-    similar_indices = find_similar_days({"x_data": x_data, "y_data": y_data, "z_data": z_data, "cop_data": cop_data})
-
-    # 用相似日数据优化模型
-    optimized_x, optimized_y, optimized_z, optimized_cop = optimize_data_with_similar_days(
-        {"x_data": x_data, "y_data": y_data, "z_data": z_data, "cop_data": cop_data}, similar_indices
-    )
+@app.route("/train_cop_model/<job_id>", methods=['GET'])
+def get_training_job(job_id):
+    """查询训练任务的状态和进度"""
+    job = training_jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"训练任务不存在：{job_id}"}), 404
+    return jsonify(job.to_dict()), 200
 
-    # 用相似日数据重新训练模型
-    model = train_model(optimized_x, optimized_y, optimized_z, optimized_cop)
-
-    # 可视化
-    plot_cop_surface(x_data, y_data, z_data, cop_data, model)
-
-    # 定时任务：每小时更新缓存
-    schedule.every(1).hours.do(update_cop_cache)
-    while True:
-        schedule.run_pending()
+@app.route("/train_cop_model/<job_id>/cancel", methods=['POST'])
+def cancel_training(job_id):
+    """取消训练任务"""
+    job = training_jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"训练任务不存在：{job_id}"}), 404
+    cancel_training_job(job)
+    return jsonify(job.to_dict()), 200
 
 
 if __name__ == "__main__":
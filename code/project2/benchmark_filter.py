@@ -0,0 +1,49 @@
+import time
+import numpy as np
+from app import validate_data_in_range, VALID_LOAD_LEVEL_RANGE, VALID_COOLING_TEMP_RANGE, VALID_FREEZING_TEMP_RANGE, VALID_COP_RANGE
+
+# 基准测试：逐行循环过滤 与 向量化过滤流水线 的耗时（最大 10M 行）
+LOOP_MAX_ROWS = 1_000_000  # 逐行循环在更大规模下耗时过长，只测到 1M
+
+
+def make_history(rows):
+    """生成分钟级历史数据，包含少量越界值、NaN 和卡死片段"""
+    rng = np.random.default_rng(0)
+    x_data = rng.uniform(-5, 105, rows)
+    y_data = rng.uniform(-1, 16, rows)
+    z_data = rng.uniform(-11, 11, rows)
+    cop_data = rng.uniform(1.5, 6.5, rows)
+    cop_data[rng.integers(0, rows, rows // 1000)] = np.nan
+    for start in rng.integers(0, max(rows - 60, 1), rows // 10000):
+        y_data[start:start + 60] = y_data[start]
+    return x_data, y_data, z_data, cop_data
+
+
+def loop_filter(x_data, y_data, z_data, cop_data):
+    """逐行循环的范围过滤（对照组）"""
+    valid_data_indices = []
+    for i in range(len(x_data)):
+        if (VALID_LOAD_LEVEL_RANGE[0] <= x_data[i] <= VALID_LOAD_LEVEL_RANGE[1] and
+                VALID_COOLING_TEMP_RANGE[0] <= y_data[i] <= VALID_COOLING_TEMP_RANGE[1] and
+                VALID_FREEZING_TEMP_RANGE[0] <= z_data[i] <= VALID_FREEZING_TEMP_RANGE[1] and
+                VALID_COP_RANGE[0] <= cop_data[i] <= VALID_COP_RANGE[1]):
+            valid_data_indices.append(i)
+    return valid_data_indices
+
+
+if __name__ == "__main__":
+    print(f"{'行数':>10} {'逐行循环(s)':>12} {'finite+range(s)':>16} {'含 stuck(s)':>12}")
+    for rows in (100_000, 1_000_000, 10_000_000):
+        columns = make_history(rows)
+        loop_time = float("nan")
+        if rows <= LOOP_MAX_ROWS:
+            start = time.perf_counter()
+            loop_filter(*columns)
+            loop_time = time.perf_counter() - start
+        start = time.perf_counter()
+        validate_data_in_range(*columns)
+        vector_time = time.perf_counter() - start
+        start = time.perf_counter()
+        _, report = validate_data_in_range(*columns, rules=("finite", "range", "stuck"))
+        full_time = time.perf_counter() - start
+        print(f"{rows:>10} {loop_time:>12.3f} {vector_time:>16.3f} {full_time:>12.3f}  {report}")
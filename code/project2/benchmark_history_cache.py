@@ -0,0 +1,60 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import numpy as np
+from app import HistoryCache, HISTORY_COLUMNS
+
+# 基准测试：一年分钟级历史数据，JSON 缓存 与 内存映射列式缓存 的写入/加载耗时
+ROWS = 365 * 24 * 60
+REPEAT = 5
+
+
+def make_columns(rows=ROWS):
+    rng = np.random.default_rng(0)
+    return {name: rng.uniform(0, 100, rows) for name in HISTORY_COLUMNS}
+
+
+def json_write(path, columns):
+    """原有方式：各列转换为列表后写入 JSON"""
+    with open(path, "w") as f:
+        json.dump({name: values.tolist() for name, values in columns.items()}, f)
+
+
+def json_load(path):
+    """原有方式：读取 JSON 后逐列转换为数组"""
+    with open(path, "r") as f:
+        cache = json.load(f)
+    return tuple(np.array(cache[name]) for name in HISTORY_COLUMNS)
+
+
+def best_of(func, *args):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    columns = make_columns()
+    directory = tempfile.mkdtemp()
+    try:
+        json_path = os.path.join(directory, "cop_history_cache.json")
+        cache = HistoryCache(os.path.join(directory, "cache"))
+        rows = [
+            ("JSON", best_of(json_write, json_path, columns), best_of(json_load, json_path), os.path.getsize(json_path)),
+            ("列式缓存(.npy 内存映射)", best_of(cache.put, "benchmark", columns), best_of(cache.get, "benchmark"),
+             sum(os.path.getsize(os.path.join(cache.directory, f)) for f in os.listdir(cache.directory))),
+        ]
+        # 内存映射只在访问时读取数据，这里额外统计加载后完整读取一遍（求和）的耗时
+        full_read = best_of(lambda: [values.sum() for values in cache.get("benchmark").values()])
+        print(f"行数：{ROWS}，列数：{len(HISTORY_COLUMNS)}")
+        print(f"{'方式':<24} {'写入(s)':>10} {'加载(s)':>10} {'文件(MB)':>10}")
+        for label, write_time, load_time, size in rows:
+            print(f"{label:<24} {write_time:>10.4f} {load_time:>10.6f} {size / 1024 / 1024:>10.1f}")
+        print(f"列式缓存加载并读取全部数据：{full_read:.4f} s")
+    finally:
+        shutil.rmtree(directory)
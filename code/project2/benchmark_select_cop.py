@@ -0,0 +1,64 @@
+import os
+import time
+import joblib
+import numpy as np
+from sklearn.svm import SVR
+from app import app, model_path, model_registry, save_model, C, GAMMA
+
+# 基准测试：/select_cop 每次请求都从磁盘加载模型 与 使用模型注册表 的延迟（p50/p99）
+MODEL_NAME = "benchmark"
+REQUESTS = 500
+PAYLOAD = {"load_level": 85, "temperature": 13, "frozen_temp": 8, "model": MODEL_NAME}
+
+
+def train_benchmark_model(samples=5000):
+    """在合成数据上训练一个与线上参数一致的 SVR 模型"""
+    rng = np.random.default_rng(0)
+    X = np.column_stack((rng.uniform(0, 100, samples), rng.uniform(0, 15, samples), rng.uniform(-10, 10, samples)))
+    y = 2 + 0.03 * X[:, 0] + 0.1 * X[:, 1] - 0.05 * X[:, 2] + rng.normal(0, 0.2, samples)
+    model = SVR(kernel="rbf", C=C, gamma=GAMMA).fit(X, y)
+    save_model(model, MODEL_NAME)
+    return model
+
+
+def percentiles(latencies):
+    latencies = np.array(latencies) * 1000
+    return np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def measure(get_model):
+    """重复执行 获取模型 + 单点预测，记录每次耗时"""
+    input_data = np.array([[PAYLOAD["load_level"], PAYLOAD["temperature"], PAYLOAD["frozen_temp"]]])
+    latencies = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        get_model().predict(input_data)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def registry_endpoint():
+    """注册表方式：通过 /select_cop 接口请求（含 Flask 处理开销）"""
+    client = app.test_client()
+    latencies = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        client.post("/select_cop", json=PAYLOAD)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+if __name__ == "__main__":
+    model = train_benchmark_model()
+    print(f"支持向量数：{len(model.support_vectors_)}，模型文件：{os.path.getsize(model_path(MODEL_NAME)) / 1024:.0f} KB")
+    try:
+        rows = [
+            ("每次请求 joblib.load", percentiles(measure(lambda: joblib.load(model_path(MODEL_NAME))))),
+            ("模型注册表", percentiles(measure(lambda: model_registry.get(MODEL_NAME).model))),
+            ("模型注册表 + /select_cop", percentiles(registry_endpoint())),
+        ]
+        print(f"{'方式':<24} {'p50(ms)':>10} {'p99(ms)':>10}")
+        for label, (p50, p99) in rows:
+            print(f"{label:<24} {p50:>10.3f} {p99:>10.3f}")
+    finally:
+        os.remove(model_path(MODEL_NAME))
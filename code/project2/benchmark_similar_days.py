@@ -0,0 +1,53 @@
+import gc
+import time
+import numpy as np
+from scipy.spatial.distance import cdist
+from app import SimilarDayIndex, SIMILARITY_METRICS
+
+# 基准测试：10 年分钟级历史数据的相似日查找延迟（p50/p99），对比原有逐样本 cdist + argsort
+YEARS = 10
+QUERIES = 1000
+K = 5
+START = int(np.datetime64("2015-01-01 00:00:00", "s").astype(np.int64))
+
+
+def make_history(years=YEARS):
+    rng = np.random.default_rng(0)
+    times = START + np.arange(years * 365 * 1440, dtype=np.int64) * 60
+    hours = (times % 86400) / 3600
+    x_data = np.clip(60 + 20 * np.sin(hours / 24 * 2 * np.pi) + rng.normal(0, 5, len(times)), 0, 100)
+    y_data = rng.uniform(0, 15, len(times))
+    z_data = rng.uniform(-10, 10, len(times))
+    cop_data = 3 + 0.01 * x_data + rng.normal(0, 0.1, len(times))
+    return times, x_data, y_data, z_data, cop_data
+
+
+def legacy_query(cop_values):
+    """原有方式：目标为全局平均 COP，与每个样本计算距离后全量排序"""
+    distances = cdist(np.array(np.mean(cop_values)).reshape(1, -1), cop_values.reshape(-1, 1))
+    return np.argsort(distances[0])[:K]
+
+
+def latency(func, *args, repeat=QUERIES):
+    gc.disable()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    gc.enable()
+    timings = np.array(timings) * 1000
+    return np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+if __name__ == "__main__":
+    history = make_history()
+    start = time.perf_counter()
+    index = SimilarDayIndex(*history)
+    print(f"样本数：{len(history[0])}，天数：{len(index.days)}，特征维数：{index.features.shape[1]}，建立索引：{time.perf_counter() - start:.2f} s")
+    print(f"{'方式':<28} {'p50(ms)':>10} {'p99(ms)':>10}")
+    for metric in SIMILARITY_METRICS:
+        p50, p99 = latency(index.query, None, K, metric)
+        print(f"{'相似日索引 ' + metric:<28} {p50:>10.3f} {p99:>10.3f}")
+    p50, p99 = latency(legacy_query, history[4], repeat=5)
+    print(f"{'逐样本 cdist + argsort':<28} {p50:>10.3f} {p99:>10.3f}")
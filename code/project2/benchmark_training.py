@@ -0,0 +1,73 @@
+import os
+import time
+import shutil
+import tempfile
+import numpy as np
+import app
+from app import train_model, TrainingConfig
+
+# 基准测试：full / incremental 训练方式与精确核 / 近似核的训练耗时和精度（相对全量 SVR）
+SAMPLE_SIZES = (5_000, 20_000)  # 全量 SVR 在 50k 样本上训练约需 10 分钟，这里只测到 20k
+TEST_SAMPLES = 5_000
+MODEL_NAME = "benchmark"
+CONFIGS = [
+    ("full + exact", TrainingConfig("full", "exact")),
+    ("incremental + exact", TrainingConfig("incremental", "exact")),
+    ("full + nystroem", TrainingConfig("full", "nystroem")),
+    ("full + rff", TrainingConfig("full", "rff")),
+]
+
+
+def make_data(samples, seed):
+    """生成工况集中在高负荷区间的合成数据（与实际运行数据的分布类似）"""
+    rng = np.random.default_rng(seed)
+    x_data = np.clip(rng.normal(75, 15, samples), 0, 100)
+    y_data = rng.uniform(0, 15, samples)
+    z_data = rng.uniform(-10, 10, samples)
+    cop_data = 3 + 0.02 * x_data - 0.0002 * (x_data - 70) ** 2 + 0.08 * y_data - 0.05 * z_data + rng.normal(0, 0.1, samples)
+    return x_data, y_data, z_data, cop_data
+
+
+def fit(config, data):
+    """训练并返回 (模型, 耗时)；incremental 每次从空的代表性训练集开始"""
+    if os.path.exists(app.training_set_path(MODEL_NAME)):
+        os.remove(app.training_set_path(MODEL_NAME))
+    start = time.perf_counter()
+    model = train_model(*data, MODEL_NAME, config)
+    return model, time.perf_counter() - start
+
+
+def rmse(a, b):
+    return float(np.sqrt(np.mean((a - b) ** 2)))
+
+
+if __name__ == "__main__":
+    app.COMPILE_COP_GRID = False  # 只统计模型训练耗时
+    directory = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(directory)  # 模型文件写入临时目录
+    try:
+        test_x, test_y, test_z, test_cop = make_data(TEST_SAMPLES, seed=1)
+        test_inputs = np.column_stack((test_x, test_y, test_z))
+        print(f"{'样本数':>8} {'方式':<22} {'训练(s)':>9} {'RMSE(真实值)':>13} {'RMSE(全量 SVR)':>15}")
+        for samples in SAMPLE_SIZES:
+            data = make_data(samples, seed=0)
+            reference = None
+            for label, config in CONFIGS:
+                model, elapsed = fit(config, data)
+                predictions = model.predict(test_inputs)
+                reference = predictions if reference is None else reference
+                print(f"{samples:>8} {label:<22} {elapsed:>9.2f} {rmse(predictions, test_cop):>13.4f} {rmse(predictions, reference):>15.4f}")
+
+            # 增量重训练：在上一轮代表性训练集（含支持向量）的基础上加入新一批数据
+            # 采样时间按行号递增，新一批数据的时间接在上一轮之后
+            train_model(*data, MODEL_NAME, TrainingConfig("incremental", "exact"), np.arange(samples))
+            new_data = make_data(samples // 10, seed=2)
+            start = time.perf_counter()
+            model = train_model(*new_data, MODEL_NAME, TrainingConfig("incremental", "exact"), samples + np.arange(samples // 10))
+            elapsed = time.perf_counter() - start
+            predictions = model.predict(test_inputs)
+            print(f"{samples:>8} {'incremental 追加 10%':<22} {elapsed:>9.2f} {rmse(predictions, test_cop):>13.4f} {rmse(predictions, reference):>15.4f}")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory)
@@ -1,5 +1,14 @@
 from flask import Flask, request, jsonify, abort
+import io
+import csv
+import time
+import base64
 import pymysql
+from array import array
+from datetime import date, datetime
+
+# 共用模块 code/common：在 code 目录下以 python -m project3.app 启动服务
+from common.db import ConnectionPool, HolidayCalendar, bump_schedule_version, calendar_slice, create_schedule_version_table, date_ordinal, db_pool_blueprint, scan_schedule
 
 app = Flask(__name__)
 
@@ -12,96 +21,263 @@ DB_CONFIG = {
 }
 
 
-# 连接 MySQL 数据库
-def get_db_connection():
+# 工休状态范围查询参数
+RANGE_QUERY_MAX_DAYS = 366 * 100  # 一次范围查询最多的天数
+RANGE_ENCODINGS = ("rle", "bitmap", "list")  # rle：游程编码；bitmap：位图；list：逐日列表
+RANGE_SOURCES = ("cache", "db")  # cache：工休日历缓存；db：直接按日期范围扫描数据库
+
+# 工休状态写入参数
+UPSERT_CHUNK_SIZE = 500  # 批量写入时每条 INSERT 语句包含的行数
+UPSERT_MODES = ("bulk", "row")  # bulk：分组批量写入；row：逐行写入（原有方式）
+UPSERT_QUERY = "INSERT INTO schedule (datetime, holiday) VALUES (%s, %s) ON DUPLICATE KEY UPDATE holiday = VALUES(holiday)"
+
+# 全局数据库连接池，/db_pool_status 返回连接池指标
+db_pool = ConnectionPool(DB_CONFIG)
+app.register_blueprint(db_pool_blueprint(db_pool))
+
+# 全局工休日历缓存
+holiday_calendar = HolidayCalendar(db_pool)
+
+# 本进程是否已创建工休日历版本号表
+schedule_version_table_ready = False
+
+
+def ensure_schedule_version_table(connection):
+	"""本进程第一次写入前创建版本号表（DDL 会隐式提交，需在事务开始之前执行），之后的写入请求不再执行 DDL"""
+	global schedule_version_table_ready
+	if not schedule_version_table_ready:
+		create_schedule_version_table(connection)
+		schedule_version_table_ready = True
+
+
+def generate_schedule(start, end, holidays=(), workdays=()):
+	"""
+	按规则生成 [start, end) 的工休状态：周一到周五为工作日（1），周六周日为休息日（0），
+	holidays 中的日期（法定节假日）为休息日，workdays 中的日期（调休上班）为工作日。
+	返回：(日期列表, 状态列表)，日期格式为 "YYYY-MM-DD 00:00:00"
+	"""
+	start_ordinal, end_ordinal = date_ordinal(start), date_ordinal(end)
+	holidays, workdays = {date_ordinal(day) for day in holidays}, {date_ordinal(day) for day in workdays}
+	if None in (start_ordinal, end_ordinal) or None in holidays or None in workdays:
+		raise ValueError("日期格式错误")
+	dates, statuses = [], []
+	for ordinal in range(start_ordinal, end_ordinal):
+		day = date.fromordinal(ordinal)
+		if ordinal in workdays:
+			status = 1
+		elif ordinal in holidays:
+			status = 0
+		else:
+			status = 0 if day.weekday() >= 5 else 1
+		dates.append(day.strftime("%Y-%m-%d 00:00:00"))
+		statuses.append(status)
+	return dates, statuses
+
+
+def validate_schedule(dates, statuses):
+	"""校验日期和状态列表，返回 (日期列表, 整数状态列表)"""
+	if not dates or not statuses or len(dates) != len(statuses):
+		raise ValueError("日期列表和状态列表不匹配")
+	invalid = [day for day in dates if date_ordinal(day) is None]
+	if invalid:
+		raise ValueError(f"日期格式错误: {invalid[0]}")
 	try:
-		source_conn = pymysql.connect(**DB_CONFIG)
-		return source_conn
-	except pymysql.MySQLError as e:
-		print(f"数据库连接失败: {e}")
-		return None
+		statuses = [int(status) for status in statuses]
+	except (TypeError, ValueError):
+		raise ValueError("工休状态必须是整数")
+	return list(dates), statuses
+
+
+def parse_schedule_json(data):
+	"""
+	解析 JSON 格式的工休状态，支持三种格式：
+	- {"dates": [...], "statuses": [...]}
+	- {"rows": [[日期, 状态], ...]} 或 {"rows": [{"date": 日期, "status": 状态}, ...]}
+	- {"year": 2025, "holidays": [...], "workdays": [...]}：按规则生成整年
+	"""
+	if not isinstance(data, dict):
+		raise ValueError("请求数据格式错误")
+	if "year" in data:
+		year = int(data["year"])
+		return generate_schedule(date(year, 1, 1), date(year + 1, 1, 1), data.get("holidays", ()), data.get("workdays", ()))
+	if "rows" in data:
+		rows = [(row["date"], row["status"]) if isinstance(row, dict) else tuple(row) for row in data["rows"]]
+		return validate_schedule([row[0] for row in rows], [row[1] for row in rows])
+	return validate_schedule(data.get("dates"), data.get("statuses"))
+
+
+def parse_schedule_csv(text):
+	"""解析 CSV 格式的工休状态：每行 "日期,状态"，第一行可以是表头"""
+	rows = [row for row in csv.reader(io.StringIO(text)) if row]
+	if rows and date_ordinal(rows[0][0].strip()) is None:
+		rows = rows[1:]  # 跳过表头
+	if any(len(row) < 2 for row in rows):
+		raise ValueError("CSV 每行必须包含日期和状态")
+	return validate_schedule([row[0].strip() for row in rows], [row[1].strip() for row in rows])
+
+
+def upsert_schedule(cursor, dates, statuses, chunk_size=UPSERT_CHUNK_SIZE, mode="bulk"):
+	"""
+	在调用方的事务中写入工休状态（由调用方提交）。
+	bulk：每 chunk_size 行一组，executemany 合并为一条多行 INSERT；row：逐行执行，每行一次往返。
+	"""
+	rows = list(zip(dates, statuses))
+	if mode == "row":
+		for row in rows:
+			cursor.execute(UPSERT_QUERY, row)
+		return
+	for start in range(0, len(rows), chunk_size):
+		cursor.executemany(UPSERT_QUERY, rows[start:start + chunk_size])
+
+
+def encode_runs(status):
+	"""游程编码：[[工休状态, 连续天数], ...]"""
+	runs = []
+	for value in status:
+		if runs and runs[-1][0] == value:
+			runs[-1][1] += 1
+		else:
+			runs.append([value, 1])
+	return runs
+
+
+def encode_bits(flags):
+	"""位图编码：第 i 天对应第 i 位（高位在前），base64 字符串"""
+	bits = bytearray((len(flags) + 7) // 8)
+	for index, flag in enumerate(flags):
+		if flag:
+			bits[index >> 3] |= 0x80 >> (index & 7)
+	return base64.b64encode(bytes(bits)).decode()
+
+
+def query_work_rest_range(params):
+	"""
+	按日期范围查询工休状态。params: {"start", "end"（包含）, "weekdays"（可选，1-7 表示周一到周日）,
+	"encoding"（rle/bitmap/list，默认 rle）, "source"（cache/db，默认 cache）}
+	"""
+	first, last = date_ordinal(params.get("start")), date_ordinal(params.get("end"))
+	weekdays = params.get("weekdays")
+	encoding, source = params.get("encoding", "rle"), params.get("source", "cache")
+	if first is None or last is None or first > last:
+		raise ValueError("start、end 必须是日期，且 start 不晚于 end")
+	if last - first + 1 > RANGE_QUERY_MAX_DAYS:
+		raise ValueError(f"查询范围不能超过 {RANGE_QUERY_MAX_DAYS} 天")
+	if weekdays is not None and (not isinstance(weekdays, list) or not set(weekdays) <= set(range(1, 8))):
+		raise ValueError("weekdays 必须是 1-7 的列表")
+	if encoding not in RANGE_ENCODINGS or source not in RANGE_SOURCES:
+		raise ValueError(f"encoding 必须是 {', '.join(RANGE_ENCODINGS)} 之一，source 必须是 {', '.join(RANGE_SOURCES)} 之一")
+
+	if source == "cache":
+		status = holiday_calendar.range(first, last)
+	else:
+		with db_pool.connection() as connection:
+			status = calendar_slice(scan_schedule(connection, first, last), first, last)
+
+	# 按星期过滤：日期序数 1（0001-01-01）为周一
+	ordinals = range(first, last + 1)
+	if weekdays is not None:
+		weekdays = set(weekdays)
+		ordinals = [ordinal for ordinal in ordinals if (ordinal - 1) % 7 + 1 in weekdays]
+		status = array('b', [status[ordinal - first] for ordinal in ordinals])
+
+	result = {"start": str(date.fromordinal(first)), "end": str(date.fromordinal(last)), "days": len(status), "encoding": encoding, "source": source}
+	if params.get("weekdays") is not None:
+		result["weekdays"] = sorted(weekdays)
+	if encoding == "rle":
+		result["runs"] = encode_runs(status)
+	elif encoding == "bitmap":
+		result["bitmap"] = encode_bits([value == 1 for value in status])
+		if -1 in status:
+			result["mask"] = encode_bits([value != -1 for value in status])
+	else:
+		result["data"] = [{"date": str(date.fromordinal(ordinal)), "status": value} for ordinal, value in zip(ordinals, status) if value != -1]
+	return result
 
 
 # ========== 接口1: 查询日期对应的工休状态 ==========
 
 @app.route('/query_work_rest_status', methods=['POST'])
 def query_work_rest_status():
-	"""查询一组日期对应的工休状态"""
+	"""查询一组日期对应的工休状态；传入 {"start", "end", ...} 时按日期范围查询"""
 	try:
 		# 获取传入的日期列表
 		dates = request.json
 
+		if isinstance(dates, dict):
+			try:
+				return jsonify(query_work_rest_range(dates)), 200
+			except ValueError as e:
+				return jsonify({"status": "error", "message": str(e)}), 400
 		if not dates:
 			return jsonify({"status": "error", "message": "日期列表不能为空"}), 400
-		# 查询工休状态
-		source_conn = get_db_connection()
-		if source_conn is None:
-			return jsonify({"status": "error", "message": "数据库连接失败"}), 500
-
-		source_cursor = source_conn.cursor()
-		placeholders = ', '.join(['%s'] * len(dates))
-		query = f"SELECT datetime, holiday FROM schedule WHERE datetime IN ({placeholders})"
-		source_cursor.execute(query, dates)
-
-		results = source_cursor.fetchall()
+		# 查询工休状态（从工休日历缓存中读取，按日期去重排序）
+		results = {datetime.fromordinal(date_ordinal(day)): status for day, status in holiday_calendar.lookup(dates).items()}
 
 		# 返回工休状态列表
-		status_list = [{"date": row[0], "status": row[1]} for row in results]
+		status_list = [{"date": day, "status": results[day]} for day in sorted(results)]
 		return jsonify(status_list), 200
 
+	except pymysql.OperationalError as e:
+		print(f"数据库连接失败: {e}")
+		return jsonify({"status": "error", "message": "数据库连接失败"}), 500
+
 	except Exception as e:
 		return jsonify({"status": "error", "message": str(e)}), 500
 
-	finally:
-		if source_conn:
-			source_conn.close()
-			source_cursor.close()
-
 
 # ========== 接口2: 修改日期对应的工休状态 ==========
 
 @app.route('/update_work_rest_status', methods=['POST'])
 def update_work_rest_status():
-	"""修改一组日期对应的工休状态"""
+	"""修改一组日期对应的工休状态（JSON 或 CSV 请求体，一个事务内批量写入）"""
 	try:
-		# 获取传入的日期列表和工休状态列表
-		request_data = request.json
-		dates = request_data['dates']
-		statuses = request_data['statuses']
+		# 获取写入方式和传入的日期、工休状态
+		mode = request.args.get('mode', 'bulk')
+		chunk_size = int(request.args.get('chunk_size', UPSERT_CHUNK_SIZE))
+		if mode not in UPSERT_MODES or chunk_size <= 0:
+			return jsonify({"status": "error", "message": f"mode 必须是 {', '.join(UPSERT_MODES)} 之一，chunk_size 必须大于 0"}), 400
+		if request.mimetype == 'text/csv':
+			dates, statuses = parse_schedule_csv(request.get_data(as_text=True))
+		else:
+			dates, statuses = parse_schedule_json(request.get_json(silent=True))
+	except (ValueError, TypeError, KeyError, IndexError) as e:
+		return jsonify({"status": "error", "message": str(e)}), 400
 
-		if not dates or not statuses or len(dates) != len(statuses):
-			return jsonify({"status": "error", "message": "日期列表和状态列表不匹配"}), 400
-
-		# 更新工休状态
-		connection = get_db_connection()
-		if connection is None:
-			return jsonify({"status": "error", "message": "数据库连接失败"}), 500
+	try:
+		# 确保工休日历已加载，写入后才能判断版本号是否连续
+		holiday_calendar.refresh()
 
-		cursor = connection.cursor()
+		# 在一个事务中写入工休状态
+		start = time.perf_counter()
+		with db_pool.connection() as connection:
+			# 版本号表由写入方创建，每个进程只执行一次
+			ensure_schedule_version_table(connection)
+			with connection.cursor() as cursor:
+				upsert_schedule(cursor, dates, statuses, chunk_size, mode)
 
-		updated_dates = []
-		for date, status in zip(dates, statuses):
-			update_query = """
-                INSERT INTO schedule (datetime, holiday)
-                VALUES (%s, %s)
-                ON DUPLICATE KEY UPDATE holiday = %s
-            """
-			cursor.execute(update_query, (date, status, status))
-			updated_dates.append(date)
+				# 同一事务中递增日历版本号，提交后更新本进程的工休日历缓存
+				version = bump_schedule_version(cursor)
+			connection.commit()
+		elapsed = time.perf_counter() - start
+		holiday_calendar.apply(dates, statuses, version)
 
-		# 提交更新
-		connection.commit()
+		# 返回修改了的日期列表和写入速度
+		return jsonify({
+			"status": "success",
+			"updated_dates": dates,
+			"rows": len(dates),
+			"mode": mode,
+			"elapsed": round(elapsed, 4),
+			"rows_per_second": round(len(dates) / elapsed) if elapsed > 0 else None,
+		}), 200
 
-		# 返回修改了的日期列表
-		return jsonify({"status": "success", "updated_dates": updated_dates}), 200
+	except pymysql.OperationalError as e:
+		print(f"数据库连接失败: {e}")
+		return jsonify({"status": "error", "message": "数据库连接失败"}), 500
 
 	except Exception as e:
 		return jsonify({"status": "error", "message": str(e)}), 500
 
-	finally:
-		if connection:
-			connection.close()
-
 
 if __name__ == '__main__':
 	app.run(host='0.0.0.0', port=1820, debug=True)
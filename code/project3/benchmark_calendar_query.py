@@ -0,0 +1,73 @@
+"""工休状态查询压测：1、5、20 年的日历，对比按日期列表查询与按日期范围查询的耗时和响应大小。
+
+- 日期列表：原有方式，传入每一天的日期；数据库对比项为 IN (%s, ...) + fetchall
+- 日期范围：{"start", "end"}，分别从工休日历缓存（cache）和数据库 BETWEEN 范围扫描 + 服务端游标（db）读取，
+  返回 rle（游程编码）、bitmap（位图）、list（逐日列表）三种编码
+
+需要可访问的 MySQL/MariaDB（DB_CONFIG 指定），本地可用 docker 启动一个替身，例如：
+    docker run -d -p 3306:3306 -e MARIADB_ROOT_PASSWORD=dcny123 -e MARIADB_DATABASE=audit mariadb
+首次运行会自动建表，并按规则补齐 2025 年起 20 年的数据（INSERT IGNORE，不覆盖已有记录）。
+
+用法（在 code 目录下）：python -m project3.benchmark_calendar_query [每项重复次数]
+"""
+
+import sys
+import time
+import numpy as np
+from datetime import date
+from project3.app import app, db_pool, generate_schedule, bump_schedule_version, create_schedule_version_table
+
+START = date(2025, 1, 1)
+YEARS = (1, 5, 20)
+
+
+def prepare():
+    dates, statuses = generate_schedule(START, date(START.year + max(YEARS), 1, 1))
+    with db_pool.connection() as connection:
+        create_schedule_version_table(connection)
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE TABLE IF NOT EXISTS schedule (`index` int NOT NULL AUTO_INCREMENT, `datetime` datetime NOT NULL, "
+                           "`holiday` int NOT NULL, PRIMARY KEY (`index`), UNIQUE KEY `datetime_UNIQUE` (`datetime`))")
+            cursor.executemany("INSERT IGNORE INTO schedule (datetime, holiday) VALUES (%s, %s)", list(zip(dates, statuses)))
+            bump_schedule_version(cursor)
+        connection.commit()
+
+
+def legacy_sql(dates):
+    """原有数据库查询方式：IN (%s, ...) + fetchall"""
+    with db_pool.connection() as connection, connection.cursor() as cursor:
+        cursor.execute(f"SELECT datetime, holiday FROM schedule WHERE datetime IN ({', '.join(['%s'] * len(dates))})", dates)
+        return cursor.fetchall()
+
+
+def measure(func, repeat):
+    """返回 (p50 毫秒, 最后一次的返回值)"""
+    result = func()  # 预热（加载工休日历缓存、建立连接）
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return np.percentile(timings, 50) * 1000, result
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    prepare()
+    client = app.test_client()
+    print(f"每项重复 {repeat} 次，耗时取中位数")
+    print(f"{'范围':<6} {'方式':<28} {'耗时(ms)':>10} {'响应(字节)':>12}")
+    for years in YEARS:
+        end = date(START.year + years, 1, 1)
+        dates, _ = generate_schedule(START, end)
+        cases = [("数据库 IN + fetchall（原有）", lambda: legacy_sql(dates), False),
+                 ("日期列表", lambda: client.post('/query_work_rest_status', json=dates), True)]
+        for source in ("cache", "db"):
+            for encoding in ("rle", "bitmap", "list"):
+                body = {"start": str(START), "end": str(date.fromordinal(end.toordinal() - 1)), "encoding": encoding, "source": source}
+                cases.append((f"日期范围 {source} + {encoding}", lambda body=body: client.post('/query_work_rest_status', json=body), True))
+        for label, func, is_response in cases:
+            elapsed, result = measure(func, repeat)
+            size = len(result.get_data()) if is_response else "-"
+            print(f"{years:>2} 年  {label:<28} {elapsed:>10.2f} {size:>12}")
+    print("连接池指标：", db_pool.metrics())
@@ -0,0 +1,95 @@
+"""数据库连接池压测：多个线程并发执行工休状态查询，对比每次新建连接（原有方式）与连接池的吞吐量和延迟。
+
+需要可访问的 MySQL/MariaDB（DB_CONFIG 指定，库中有 schedule 表），本地可用 docker 启动一个替身，例如：
+    docker run -d -p 3306:3306 -e MARIADB_ROOT_PASSWORD=dcny123 -e MARIADB_DATABASE=audit mariadb
+首次运行会自动建表并写入一年的数据。
+
+用法（在 code 目录下）：python -m project3.benchmark_db_pool [线程数] [每种方式的压测秒数]
+"""
+
+import sys
+import time
+import threading
+import numpy as np
+import pymysql
+from project3.app import DB_CONFIG, ConnectionPool
+
+DATES = ["2025-01-01", "2025-01-02", "2025-01-03", "2025-01-04", "2025-01-05"]
+QUERY = f"SELECT datetime, holiday FROM schedule WHERE datetime IN ({', '.join(['%s'] * len(DATES))})"
+
+
+def prepare():
+    connection = pymysql.connect(**DB_CONFIG)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE TABLE IF NOT EXISTS schedule (`index` int NOT NULL AUTO_INCREMENT, `datetime` datetime NOT NULL, "
+                           "`holiday` int NOT NULL, PRIMARY KEY (`index`), UNIQUE KEY `datetime_UNIQUE` (`datetime`))")
+            cursor.execute("INSERT IGNORE INTO schedule (datetime, holiday) "
+                           "SELECT TIMESTAMP('2025-01-01') + INTERVAL seq DAY, IF(DAYOFWEEK(DATE('2025-01-01') + INTERVAL seq DAY) IN (1, 7), 0, 1) "
+                           "FROM (SELECT a.N + b.N * 10 + c.N * 100 AS seq FROM "
+                           "(SELECT 0 N UNION SELECT 1 UNION SELECT 2 UNION SELECT 3 UNION SELECT 4 UNION SELECT 5 UNION SELECT 6 UNION SELECT 7 UNION SELECT 8 UNION SELECT 9) a, "
+                           "(SELECT 0 N UNION SELECT 1 UNION SELECT 2 UNION SELECT 3 UNION SELECT 4 UNION SELECT 5 UNION SELECT 6 UNION SELECT 7 UNION SELECT 8 UNION SELECT 9) b, "
+                           "(SELECT 0 N UNION SELECT 1 UNION SELECT 2 UNION SELECT 3) c) days WHERE seq < 365")
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def query_with_new_connection():
+    connection = pymysql.connect(**DB_CONFIG)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(QUERY, DATES)
+            cursor.fetchall()
+    finally:
+        connection.close()
+
+
+def make_pooled_query(pool):
+    def query():
+        with pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute(QUERY, DATES)
+            cursor.fetchall()
+    return query
+
+
+def load_test(query, threads, duration):
+    """每个线程在 duration 秒内循环查询，返回 (每秒查询数, p50 毫秒, p99 毫秒, 失败次数)"""
+    timings, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker():
+        local = []
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                query()
+            except pymysql.Error:
+                with lock:
+                    errors[0] += 1
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            timings.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    timings = np.array(timings) * 1000
+    return len(timings) / duration, np.percentile(timings, 50), np.percentile(timings, 99), errors[0]
+
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    prepare()
+    pool = ConnectionPool(DB_CONFIG)
+    print(f"{threads} 个线程，每种方式 {duration:.0f} 秒，连接池大小 {pool.max_size}")
+    print(f"{'方式':<16} {'查询/秒':>10} {'p50(ms)':>10} {'p99(ms)':>10} {'失败':>6}")
+    for label, query in (("每次新建连接", query_with_new_connection), ("连接池", make_pooled_query(pool))):
+        qps, p50, p99, errors = load_test(query, threads, duration)
+        print(f"{label:<16} {qps:>10.0f} {p50:>10.2f} {p99:>10.2f} {errors:>6}")
+    print("连接池指标：", pool.metrics())
@@ -1,5 +1,22 @@
+"""写入工休日历（schedule 表）。数据来源三选一：
+- 默认：按规则生成 [--start, --end) 的工休状态（周一到周五为工作日，周六周日为休息日）
+- --year：按规则生成整年，可用 --holidays / --workdays 指定法定节假日和调休上班日
+- --csv / --json：从文件读取（格式与 /update_work_rest_status 接口的请求体相同）
+
+默认每 --chunk-size 行合并为一条多行 INSERT，整批在一个事务中提交；--per-row 使用逐行写入，
+--compare 依次用两种方式写入同一批数据并对比速度（数据相同，写入是幂等的）。
+
+用法示例（在 code 目录下）：
+    python -m project3.insert_database --year 2025 --holidays 2025-01-01 2025-05-01 --workdays 2025-01-26
+    python -m project3.insert_database --csv schedule.csv --chunk-size 1000
+"""
+
+import json
+import time
+import argparse
 import pymysql
-from datetime import date, timedelta
+from datetime import date
+from project3.app import UPSERT_CHUNK_SIZE, bump_schedule_version, create_schedule_version_table, generate_schedule, parse_schedule_csv, parse_schedule_json, upsert_schedule
 
 # MySQL 数据库配置
 DB_CONFIG = {
@@ -9,43 +26,69 @@ DB_CONFIG = {
     'database': 'audit'
 }
 
-try:
-    # 连接 MySQL 数据库
-    source_conn = pymysql.connect(**DB_CONFIG)
-    source_cursor = source_conn.cursor()
-
-    # 定义起始日期和结束日期
-    start_date = date(2025, 1, 1)
-    end_date = date(2025, 2, 1)
-
-    # 循环插入日期和状态
-    current_date = start_date
-    while current_date < end_date:
-        # 判断是否是工作日（周一到周五为工作日，周六周日为休息日）
-        is_weekend = current_date.weekday() >= 5  # weekday()返回0~6，周六周日为5和6
-        holiday_status = 0 if is_weekend else 1  # 0表示休息日，1表示工作日
-
-        # 插入数据，使用 ON DUPLICATE KEY UPDATE 避免重复插入
-        insert_query = """
-        INSERT INTO schedule (datetime, holiday)
-        VALUES (%s, %s)
-        ON DUPLICATE KEY UPDATE holiday = VALUES(holiday)
-        """
-        source_cursor.execute(insert_query, (current_date, holiday_status))
-
-        # 日期加1天
-        current_date += timedelta(days=1)
-
-    # 提交事务
-    source_conn.commit()
-
-    print("数据插入完成！")
-
-except pymysql.MySQLError as e:
-    print(f"数据库操作失败：{e}")
-finally:
-    # 关闭数据库连接
-    if source_cursor:
-        source_cursor.close()
-    if source_conn:
-        source_conn.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="写入工休日历")
+    parser.add_argument("--start", default="2025-01-01", help="起始日期（包含）")
+    parser.add_argument("--end", default="2025-02-01", help="结束日期（不包含）")
+    parser.add_argument("--year", type=int, help="按规则生成整年")
+    parser.add_argument("--holidays", nargs="*", default=[], help="法定节假日（休息日）")
+    parser.add_argument("--workdays", nargs="*", default=[], help="调休上班日（工作日）")
+    parser.add_argument("--csv", help="CSV 文件：每行 日期,状态")
+    parser.add_argument("--json", help="JSON 文件：格式与 /update_work_rest_status 请求体相同")
+    parser.add_argument("--chunk-size", type=int, default=UPSERT_CHUNK_SIZE, help="每条 INSERT 语句包含的行数")
+    parser.add_argument("--per-row", action="store_true", help="逐行写入（原有方式）")
+    parser.add_argument("--compare", action="store_true", help="对比批量写入和逐行写入的速度")
+    return parser.parse_args()
+
+
+def load_schedule(args):
+    if args.csv:
+        with open(args.csv, encoding="utf-8") as f:
+            return parse_schedule_csv(f.read())
+    if args.json:
+        with open(args.json, encoding="utf-8") as f:
+            return parse_schedule_json(json.load(f))
+    if args.year:
+        return generate_schedule(date(args.year, 1, 1), date(args.year + 1, 1, 1), args.holidays, args.workdays)
+    return generate_schedule(args.start, args.end, args.holidays, args.workdays)
+
+
+def write_schedule(connection, dates, statuses, chunk_size, mode):
+    """在一个事务中写入工休状态并递增日历版本号，返回耗时（秒）"""
+    start = time.perf_counter()
+    with connection.cursor() as cursor:
+        upsert_schedule(cursor, dates, statuses, chunk_size, mode)
+        # 递增工休日历版本号，各服务的工休日历缓存据此重新加载
+        bump_schedule_version(cursor)
+    connection.commit()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    dates, statuses = load_schedule(args)
+    modes = ["bulk", "row"] if args.compare else ["row" if args.per_row else "bulk"]
+
+    source_conn = None
+    try:
+        # 连接 MySQL 数据库
+        source_conn = pymysql.connect(**DB_CONFIG)
+        # 工休日历版本号表（DDL 会隐式提交，需在插入数据之前执行）
+        create_schedule_version_table(source_conn)
+
+        for mode in modes:
+            elapsed = write_schedule(source_conn, dates, statuses, args.chunk_size, mode)
+            label = f"批量写入（每组 {args.chunk_size} 行）" if mode == "bulk" else "逐行写入"
+            print(f"{label}：{len(dates)} 行，耗时 {elapsed:.3f} 秒，{len(dates) / elapsed:.0f} 行/秒")
+
+        print("数据插入完成！")
+
+    except pymysql.MySQLError as e:
+        if source_conn:
+            source_conn.rollback()
+        print(f"数据库操作失败：{e}")
+    finally:
+        # 关闭数据库连接
+        if source_conn:
+            source_conn.close()
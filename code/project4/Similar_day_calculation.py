@@ -1,9 +1,20 @@
+import time
 import requests
+import threading
+import numpy as np
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from flask_cors import CORS
 from flask import Flask, request, jsonify, abort
 from datetime import datetime, timedelta
-import pymysql
-from collections import defaultdict
+import ast
+import json
+import operator
+import functools
+from collections import OrderedDict
+
+# 共用模块 code/common：在 code 目录下以 python -m project4.Similar_day_calculation 启动服务
+from common.db import ConnectionPool, HolidayCalendar, db_pool_blueprint
 
 app = Flask(__name__)
 CORS(app, supports_credentials=True)
@@ -30,28 +41,332 @@ VALID_COOLING_CAPACITY_RANGE = (0, 500) # 瞬时冷量范围：0kW 到 500kW
 VALID_TOTAL_ENERGY_RANGE = (0, 1e6)     # 当前累计能耗范围：0 到 1,000,000kWh
 VALID_COOLING_PRICE_RANGE = (0, 10)     # 冷量单价范围：0 到 10 元/kWh
 
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 历史数据接口参数
+HISTORIAN_POOL_SIZE = 8  # 每个接口地址保持的长连接数量
+HISTORIAN_RETRIES = 3  # 连接失败、超时或 5xx 时的最大重试次数
+HISTORIAN_BACKOFF = 0.5  # 重试退避基数（秒），第 n 次重试前等待 HISTORIAN_BACKOFF * 2^(n-1)
+HISTORIAN_TIMEOUT = 10  # 单次接口调用的总时间预算（秒），包含全部重试和退避
+HISTORIAN_CONNECT_TIMEOUT = 3  # 建立连接的超时时间（秒）
+FETCH_WORKERS = 4  # 并行获取对比数据和当天数据的线程数
+FETCH_CHUNK_DAYS = 7  # 长时间范围按该天数分块获取（分块边界对齐采样间隔 second）
+FETCH_CHUNK_WORKERS = 4  # 同时向接口获取的分块数量上限（所有请求共用）
+
+# 相似日计算参数
+TOP_SIMILAR_DATES = 5  # 返回的相似日数量
+SIMILARITY_WORKERS = 0  # 候选日评分使用的进程数，0 表示在当前进程内计算
+SIMILARITY_PARALLEL_MIN_DAYS = 3650  # 候选日数量达到该值时才分块交给进程池
+
+# 每日统计参数
+REPORT_WINDOWS = {  # 报表使用的时段：名称 -> (开始时刻, 结束时刻)，两端都包含
+    "day": ("00:00:00", "23:59:59"),
+    "daytime": ("08:00:00", "17:59:59"),
+    "nighttime_one": ("00:00:00", "08:00:00"),
+    "nighttime_two": ("17:59:59", "23:59:59"),
+}
+WINDOW_STATISTICS = ("mean", "min", "max", "first", "sum", "count")  # 自定义时段支持的统计量
+DAILY_AGGREGATE_CACHE_SIZE = 16  # 缓存的每日统计结果数量（按对比数据请求区分）
+
+# 运行模式条件：报表字段名 -> 条件表达式。变量为对比数据中的运行状态变量（状态 s 非 0 表示运行），
+# 支持 & | ^ ~ 以及 and or not 和括号；新增模式或更换机房只需修改这里（或在请求中传入 run_modes）
+RUN_MODE_CONDITIONS = {
+    "peak_mode_duration": "(JiFang9_BHSB_EC1_Run | JiFang9_BHSB_EC2_Run)"
+                          " | (JiFang30_BHSB_EC1_Run & JiFang30_BHSB_EC2_Run & JiFang30_BHSB_EC3_Run)",
+    "night_mode_duration": "(~JiFang9_BHSB_EC3_Run | ~JiFang9_BHSB_EC4_Run)"
+                           " | (~JiFang30_BHSB_EC1_Run & ~JiFang30_BHSB_EC2_Run & ~JiFang30_BHSB_EC3_Run)",
+}
+MODE_OPERATORS = {ast.BitAnd: operator.and_, ast.BitOr: operator.or_, ast.BitXor: operator.xor,
+                  ast.And: np.logical_and, ast.Or: np.logical_or}
+
 # ========== 1. 数据获取 ==========
 
-def fetch_data(url, data):
-    """通用 HTTP POST 请求方法"""
+def parse_epoch_seconds(time_list):
+    """将时间字符串列表批量解析为 int64 秒级时间戳（按本地 naive 时间处理）"""
     try:
-        response = requests.post(url, data=data, timeout=10)
-        if response.status_code == 200:
-            return response.json()
+        return np.array(time_list, dtype="datetime64[s]").astype(np.int64)
+    except ValueError:
+        # numpy 只接受补零的 ISO 格式，其余情况退回 strptime 逐条解析
+        epoch = datetime(1970, 1, 1)
+        return np.array([int((datetime.strptime(t, TIME_FORMAT) - epoch).total_seconds()) for t in time_list],
+                        dtype=np.int64)
+
+
+def format_epoch_seconds(epochs):
+    """将 int64 秒级时间戳数组批量格式化为 "%Y-%m-%d %H:%M:%S" 字符串列表"""
+    if len(epochs) == 0:
+        return []
+    text = np.datetime_as_string(np.asarray(epochs, dtype=np.int64).astype("datetime64[s]"))
+    return [t.replace("T", " ") for t in text.tolist()]
+
+
+def to_epoch(moment):
+    """datetime 转换为秒级时间戳（按本地 naive 时间处理，与 parse_epoch_seconds 一致）"""
+    return int((moment - datetime(1970, 1, 1)).total_seconds())
+
+
+class TagSeries:
+    """
+    单个标签的历史数据：按时间升序排列的 int64 秒级时间戳、数值和状态数组。
+    在获取数据时从 [{'t', 'v', 's'}, ...] 构建一次，之后不再解析时间字符串；按时间范围切片为二分查找，返回视图。
+    """
+    __slots__ = ("times", "values", "status")
+
+    def __init__(self, times, values, status):
+        self.times = times
+        self.values = values
+        self.status = status
+
+    @classmethod
+    def from_records(cls, records):
+        times = parse_epoch_seconds([record['t'] for record in records])
+        values = np.array([record['v'] for record in records])
+        if values.dtype.kind not in "iuf":
+            values = np.array([record['v'] for record in records], dtype=np.float64)
+        status = np.array([record.get('s', 0) for record in records], dtype=np.int64)
+        order = np.argsort(times, kind="stable")
+        return cls(times[order], values[order], status[order])
+
+    def __len__(self):
+        return len(self.times)
+
+    def between(self, start, end):
+        """返回 start <= t <= end（秒级时间戳）的子序列"""
+        low = np.searchsorted(self.times, start, "left")
+        high = np.searchsorted(self.times, end, "right")
+        return TagSeries(self.times[low:high], self.values[low:high], self.status[low:high])
+
+    def nearest(self, target):
+        """返回最接近 target（秒级时间戳，可为数组）的样本下标，距离相同时取较早的样本"""
+        position = np.searchsorted(self.times, target, "left")
+        left = np.maximum(position - 1, 0)
+        right = np.minimum(position, len(self.times) - 1)
+        return np.where(np.abs(self.times[right] - target) < np.abs(self.times[left] - target), right, left)
+
+    def clip(self, valid_range):
+        """将超出范围的值调整为边界值"""
+        return TagSeries(self.times, np.clip(self.values, valid_range[0], valid_range[1]).astype(self.values.dtype), self.status)
+
+    @classmethod
+    def concatenate(cls, parts):
+        """按顺序拼接多个序列（调用方保证时间递增）"""
+        if not parts:
+            return cls.from_records([])
+        return cls(np.concatenate([part.times for part in parts]), np.concatenate([part.values for part in parts]),
+                   np.concatenate([part.status for part in parts]))
+
+    def to_records(self):
+        """转换回 [{'t', 'v', 's'}, ...]，用于接口输出"""
+        return [{'t': t, 'v': v, 's': s} for t, v, s in zip(format_epoch_seconds(self.times), self.values.tolist(), self.status.tolist())]
+
+
+class TagMatrix:
+    """
+    多个标签按时间对齐后的列式数据：所有标签时间戳的并集 times（升序），
+    values[i, j] 为第 j 个标签在 times[i] 的值（float64），valid[i, j] 表示该时刻是否有这个标签的样本。
+    integer[j] 记录原始数据是否为整数，输出时还原为整数。
+    """
+    __slots__ = ("times", "tags", "values", "valid", "integer")
+
+    def __init__(self, times, tags, values, valid, integer):
+        self.times = times
+        self.tags = tags
+        self.values = values
+        self.valid = valid
+        self.integer = integer
+
+    @classmethod
+    def from_series(cls, data_list):
+        """由 {标签: TagSeries} 构建"""
+        tags = [key for key, series in data_list.items() if isinstance(series, TagSeries)]
+        parts = [data_list[key].times for key in tags]
+        aligned = bool(parts) and all(np.array_equal(part, parts[0]) for part in parts)
+        if aligned:
+            times = parts[0]  # 常见情况：各标签采样时刻相同，不需要对齐
         else:
+            times = np.sort(np.concatenate(parts), kind="stable") if parts else np.array([], dtype=np.int64)
+            times = times[np.append(True, times[1:] != times[:-1])] if len(times) else times
+        # 按列存储（order="F"），逐标签写入和取列都是连续内存
+        values = np.zeros((len(times), len(tags)), order="F")
+        valid = np.zeros((len(times), len(tags)), dtype=bool, order="F")
+        for column, key in enumerate(tags):
+            series = data_list[key]
+            rows = slice(None) if aligned else np.searchsorted(times, series.times)
+            values[rows, column] = series.values
+            valid[rows, column] = True
+        integer = np.array([data_list[key].values.dtype.kind in "iu" for key in tags], dtype=bool)
+        return cls(times, tags, values, valid, integer)
+
+    def column(self, tag):
+        """返回 (值, 是否有样本)；没有这个标签时全部视为没有样本"""
+        if tag not in self.tags:
+            return np.zeros(len(self.times)), np.zeros(len(self.times), dtype=bool)
+        column = self.tags.index(tag)
+        return self.values[:, column], self.valid[:, column]
+
+    def with_column(self, tag, values, valid, integer=False):
+        """追加（或替换）一列，返回新的矩阵"""
+        keep = [column for column, name in enumerate(self.tags) if name != tag]
+        return TagMatrix(self.times, [self.tags[column] for column in keep] + [tag],
+                         np.asfortranarray(np.column_stack([self.values[:, keep], values])),
+                         np.asfortranarray(np.column_stack([self.valid[:, keep], valid])),
+                         np.append(self.integer[keep], integer))
+
+    def day_rows(self):
+        """返回 {日期 "YYYY-MM-DD": (起始行, 结束行)}"""
+        days, starts = np.unique(self.times // 86400, return_index=True)
+        ends = np.append(starts[1:], len(self.times))
+        labels = [text[:10] for text in format_epoch_seconds(days * 86400)]
+        return {label: (start, end) for label, start, end in zip(labels, starts.tolist(), ends.tolist())}
+
+    def to_records(self, start=0, end=None):
+        """将 [start, end) 行转换为 {时间: {标签: 值}}，只包含有样本的标签，用于接口输出"""
+        end = len(self.times) if end is None else end
+        columns = [(self.values[start:end, column].astype(np.int64) if self.integer[column] else self.values[start:end, column]).tolist()
+                   for column in range(len(self.tags))]
+        valid = self.valid[start:end].tolist()
+        return {t: {tag: columns[column][row] for column, tag in enumerate(self.tags) if valid[row][column]}
+                for row, t in enumerate(format_epoch_seconds(self.times[start:end]))}
+
+
+class HistorianClient:
+    """
+    历史数据接口客户端：所有请求共用一个带连接池的 Session（长连接，避免每次重新握手），
+    连接失败、超时、5xx 和无法解析的响应体按指数退避重试，每次调用的总耗时不超过时间预算。
+    """
+
+    def __init__(self, pool_size=HISTORIAN_POOL_SIZE, retries=HISTORIAN_RETRIES, backoff=HISTORIAN_BACKOFF,
+                 timeout=HISTORIAN_TIMEOUT, connect_timeout=HISTORIAN_CONNECT_TIMEOUT):
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def post(self, url, data, timeout=None):
+        """POST 请求并解析 JSON，失败时返回 None；timeout 为本次调用的总时间预算（秒）"""
+        deadline = time.monotonic() + (timeout or self.timeout)
+        for attempt in range(self.retries + 1):
+            if attempt:
+                # 退避等待不超过剩余预算
+                time.sleep(min(self.backoff * 2 ** (attempt - 1), max(deadline - time.monotonic(), 0)))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print(f"接口请求超时：超过 {timeout or self.timeout} 秒的时间预算")
+                return None
+            try:
+                response = self.session.post(url, data=data, timeout=(min(self.connect_timeout, remaining), remaining))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                print(f"接口请求异常（第 {attempt + 1} 次）：{e}")
+                continue
+            except Exception as e:
+                print(f"接口请求异常：{e}")
+                return None
+            if response.status_code == 200:
+                try:
+                    return response.json()
+                except ValueError as e:
+                    # 响应体被截断或不是 JSON，与连接中断同样处理：重试
+                    print(f"接口响应解析失败（第 {attempt + 1} 次）：{e}")
+                    continue
             print(f"接口请求失败，状态码：{response.status_code}")
-            return None
-    except Exception as e:
-        print(f"接口请求异常：{e}")
+            if response.status_code < 500:
+                return None  # 4xx 为请求参数问题，重试无意义
+        return None
+
+# 全局历史数据客户端和并行获取线程池（分块使用单独的线程池，避免在 fetch_executor 内等待自身）
+historian = HistorianClient()
+fetch_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="historian-fetch")
+chunk_executor = ThreadPoolExecutor(max_workers=FETCH_CHUNK_WORKERS, thread_name_prefix="historian-chunk")
+
+def fetch_data(url, data):
+    """通用 HTTP POST 请求方法"""
+    return historian.post(url, data)
+
+def split_time_range(data, chunk_days=FETCH_CHUNK_DAYS):
+    """
+    将请求参数的 [start, end] 拆分为不超过 chunk_days 天的多段请求参数，分段长度为采样间隔 second 的整数倍，
+    保证分段后返回的采样时刻与整段请求一致。只有一段或无法解析 start/end 时返回原参数。
+    """
+    try:
+        start = datetime.strptime(data['start'], TIME_FORMAT)
+        end = datetime.strptime(data['end'], TIME_FORMAT)
+        second = max(int(data.get('second', 1)), 1)
+    except (KeyError, TypeError, ValueError):
+        return [data]
+    step = -(-chunk_days * 86400 // second) * second
+    chunks = []
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + timedelta(seconds=step - 1), end)
+        chunks.append({**data, 'start': chunk_start.strftime(TIME_FORMAT), 'end': chunk_end.strftime(TIME_FORMAT)})
+        chunk_start += timedelta(seconds=step)
+    return chunks if len(chunks) > 1 else [data]
+
+def fetch_chunk(url, data):
+    """获取一段数据并立即转换为 [(标签名, TagSeries), ...]，解析后的 JSON 随即释放；失败时返回 None"""
+    result = fetch_data(url, data)
+    if not result:
+        return None
+    return [(item.get('tagName'), TagSeries.from_records(item.get('values', []))) for item in result]
+
+def stitch_chunks(results):
+    """
+    按分段顺序拼接各标签的数据，丢弃与前一段重叠的样本。各段按 tagName 对应（接口在某段中调整顺序或缺少标签时不会错位），
+    标签顺序为首次出现的顺序；某段缺少的标签在该段没有数据。
+    """
+    chunks = []
+    for result in results:
+        series_by_tag = dict(result)
+        if len(series_by_tag) != len(result):
+            raise ValueError("分块返回的标签名重复")
+        chunks.append(series_by_tag)
+    tags = list(dict.fromkeys(tag for result in results for tag, _ in result))
+    stitched = []
+    for tag in tags:
+        parts = []
+        for series_by_tag in chunks:
+            series = series_by_tag.get(tag)
+            if series is None:
+                continue
+            if parts:
+                series = series.between(parts[-1].times[-1] + 1, np.iinfo(np.int64).max)
+            if len(series):
+                parts.append(series)
+        stitched.append((tag, TagSeries.concatenate(parts)))
+    return stitched
+
+def fetch_tag_series(url, data):
+    """
+    获取历史数据，返回 [(标签名, TagSeries), ...]（与接口返回顺序一致），失败时返回 None。
+    长时间范围按 FETCH_CHUNK_DAYS 分块，最多 FETCH_CHUNK_WORKERS 块同时获取；每块单独按客户端策略重试，
+    只重试失败的块，成功后按时间顺序拼接。内存中只保留各块解析后的数组，不保留整段 JSON。
+    """
+    chunks = split_time_range(data)
+    if len(chunks) == 1:
+        return fetch_chunk(url, chunks[0])
+    results = list(chunk_executor.map(lambda chunk: fetch_chunk(url, chunk), chunks))
+    failed = [chunk for chunk, result in zip(chunks, results) if result is None]
+    if failed:
+        print(f"分块获取失败：{len(failed)}/{len(chunks)} 块，首个失败时段 {failed[0]['start']} ~ {failed[0]['end']}")
         return None
+    return stitch_chunks(results)
+
+def fetch_in_parallel(fetch, url, *request_data):
+    """并行获取多组历史数据，按参数顺序返回结果；任一组失败时抛出其异常"""
+    futures = [fetch_executor.submit(fetch, url, data) for data in request_data]
+    return [future.result() for future in futures]
 
 def fetch_history_data(url, data):
     compare_data_list = {}
 
     # 获取数据
-    result = fetch_data(url, data)
-    print(len(result))
+    result = fetch_tag_series(url, data)
     if result:
+        print(len(result))
         try:
             # 定义变量与 result 索引的映射
             variables = {
@@ -71,15 +386,15 @@ def fetch_history_data(url, data):
             }
 
             # 遍历变量字典，逐一赋值
-            for index_data in result:
+            for tag_name, series in result:
                 for key, value in variables.items():
-                    if value == index_data['tagName'] and len(index_data['values'])>0:
-                        compare_data_list[key] = index_data["values"]
+                    if value == tag_name and len(series)>0:
+                        compare_data_list[key] = series
             for key ,value in variables.items():
                 if key not in compare_data_list:
-                    compare_data_list[key] = []
-                    for i in result[0]['values']:
-                        compare_data_list[key].append({'t':i['t'],'v':0,'s':1})
+                    # 缺少的标签按第一个标签的时间补 0，状态为 1
+                    times = result[0][1].times
+                    compare_data_list[key] = TagSeries(times, np.zeros(len(times), dtype=np.int64), np.ones(len(times), dtype=np.int64))
             # 验证数据范围
             compare_data_list = validate_data_in_range(compare_data_list)
 
@@ -114,9 +429,9 @@ def fetch_history_data(url, data):
 
 def fetch_history_data2(url, data):
     compare_data_list = {}
-    result = fetch_data(url, data)
-    print(len(result))
+    result = fetch_tag_series(url, data)
     if result:
+        print(len(result))
         try:
             # 定义变量与 result 索引的映射
             variables = {
@@ -148,10 +463,10 @@ def fetch_history_data2(url, data):
             # 遍历变量字典，逐一赋值
             for key, index in variables.items():
                 try:
-                    compare_data_list[key] = result[index]["values"]
-                except (IndexError, KeyError) as e:
+                    compare_data_list[key] = result[index][1]
+                except IndexError as e:
                     print(f"Warning: Missing or invalid data for '{key}': {e}")
-                    compare_data_list[key] = []  # 设置默认值为空列表
+                    compare_data_list[key] = TagSeries.from_records([])  # 设置默认值为空序列
 
             # 验证数据范围
             compare_data_list = validate_data_in_range2(compare_data_list)
@@ -167,12 +482,11 @@ def fetch_history_data2(url, data):
 
 def fetch_history_data3(url, data):
     compare_data_list = {}
-    result = fetch_data(url, data)
-    print(result)
-    print(len(result))
+    result = fetch_tag_series(url, data)
     if result:
+        print(len(result))
         try:
-            compare_data_list["cooling_capacity"] = result[0]["values"]
+            compare_data_list["cooling_capacity"] = result[0][1]
             # 验证数据范围
             compare_data_list['cooling_capacity'] = validate_value(compare_data_list.get('cooling_capacity', 0), VALID_COOLING_CAPACITY_RANGE)
             return compare_data_list
@@ -183,13 +497,9 @@ def fetch_history_data3(url, data):
         raise Exception("数据获取失败")
 
 # ========== 2. 数据验证与处理 ==========
-def validate_value(data_list, valid_range):
-    for data in data_list:
-        if data['v'] < valid_range[0]:
-            data['v'] = valid_range[0]  # 返回最小有效值
-        elif data['v'] > valid_range[1]:
-            data['v'] = valid_range[1]  # 返回最大有效值
-    return data_list
+def validate_value(series, valid_range):
+    """超出范围的值调整为边界值"""
+    return series.clip(valid_range)
 def validate_data_in_range(data_list):
     # 对每个数据进行验证和处理
     data_list['out_temp'] = validate_value(data_list['out_temp'], OUT_TEMP)
@@ -225,86 +535,63 @@ def validate_data_in_range2(data_list):
 
     return data_list
 # ========== 3. 相似日逻辑 ==========
-def group_data_by_date(data):
+def hourly_nearest_values(times, values, day_starts, within_day=True):
     """
-    将数据按日期分组
-    :param data: 包含时间戳和值的字典
-    :return: 按日期分组的数据字典
+    对每个日期（0 点时间戳）取最接近当天 0-23 点各整点的样本值，返回 (日期数, 24) 矩阵。
+    times 为升序的秒级时间戳；within_day 为 True 时只在当天的样本中查找。
+    距离相同时取较早的样本。
     """
-    grouped = defaultdict(list)
-    for entry in data['out_temp']:
-        date = entry['t'][:10]  # 提取日期部分
-        grouped[date].append(entry)
+    targets = day_starts[:, None] + np.arange(24) * 3600
+    if within_day:
+        low = np.searchsorted(times, day_starts, "left")[:, None]
+        high = np.searchsorted(times, day_starts + 86400, "left")[:, None] - 1
+    else:
+        low, high = 0, len(times) - 1
+    position = np.searchsorted(times, targets, "left")
+    left = np.clip(position - 1, low, high)
+    right = np.clip(position, low, high)
+    use_right = np.abs(times[right] - targets) < np.abs(times[left] - targets)
+    return values[np.where(use_right, right, left)]
+
 
-    return grouped
+def day_of_year(day_starts):
+    """0 点时间戳对应的年中天数（1 月 1 日为 1）"""
+    days = (np.asarray(day_starts) // 86400).astype("datetime64[D]")
+    return (days - days.astype("datetime64[Y]").astype("datetime64[D]")).astype(np.int64) + 1
 
 
-def calculate_similarity(today_data, compare_data, today_date, compare_date, is_holiday_today, is_holiday_compare):
+def score_similarity(today_temps, compare_temps, today_doy, compare_doy, is_holiday_today, compare_holidays):
     """
-    计算两个日期的数据相似度
-    :param today_data: 今天的数据列表
-    :param compare_data: 比较日期的数据列表
-    :param today_date: 今天的日期
-    :param compare_date: 比较的日期
-    :param is_holiday_today: 今天是否为节假日
-    :param is_holiday_compare: 比较日期是否为节假日
-    :return: 相似度值
+    一次性计算所有候选日的相似度：
+    100 - 整点温度差平方的均值 × 0.1 - 年中天数差 × 0.1 - 节假日差异（不同为 20）
     """
-    similarity = 100.0
-
-    def calculate_variance(data1, data2):
-        """
-        根据整点时间计算温度方差
-        """
-        # 生成整点时间
-        hourly_times = [datetime.strptime(data1[0]['t'], '%Y-%m-%d %H:%M:%S').replace(hour=0, minute=0, second=0) + timedelta(hours=i) for i in range(24)]
-
-        def get_nearest_entry(entries, target_time):
-            """
-            获取与目标时间最接近的记录
-            """
-            nearest = min(entries, key=lambda x: abs(datetime.strptime(x['t'], '%Y-%m-%d %H:%M:%S') - target_time))
-            return nearest['v']
-
-        today_temps = [get_nearest_entry(data1, t) for t in hourly_times]
-        compare_temps = [get_nearest_entry(data2, t) for t in hourly_times]
-
-        temp_differences = [(t1 - t2) ** 2 for t1, t2 in zip(today_temps, compare_temps)]
-        variance = sum(temp_differences) / len(temp_differences)
-
-        return variance
-
-    def calculate_day_of_year(date1, date2):
-        """
-        计算两个日期的年中天数差异
-        """
-        day_of_year1 = date1.timetuple().tm_yday
-        day_of_year2 = date2.timetuple().tm_yday
-        return abs(day_of_year1 - day_of_year2)
-
-    def calculate_holiday_difference(is_holiday1, is_holiday2):
-        """
-        计算节假日差异
-        """
-        return 20 if is_holiday1 != is_holiday2 else 0
+    variance = ((today_temps - compare_temps) ** 2).mean(axis=1)
+    similarity = 100.0 - variance * 0.1
+    similarity -= np.abs(today_doy - compare_doy) * 0.1
+    similarity -= np.where(compare_holidays != is_holiday_today, 20, 0)
+    return similarity
 
-    # 计算整点温度差异的方差
 
-    variance_diff = calculate_variance(today_data, compare_data)
+def score_similarity_chunk(args):
+    """进程池任务：计算一块候选日的相似度"""
+    return score_similarity(*args)
 
-    # 计算日期差异
-    today_date_format = datetime.strptime(today_date, '%Y-%m-%d').replace(hour=0, minute=0, second=0)
-    day_diff = calculate_day_of_year(today_date_format, compare_date)
 
-    # 计算节假日差异
-    holiday_diff = calculate_holiday_difference(is_holiday_today, is_holiday_compare)
+similarity_pool = None
+similarity_pool_lock = threading.Lock()
 
-    # 更新相似度
-    similarity -= variance_diff * 0.1
-    similarity -= day_diff * 0.1
-    similarity -= holiday_diff
 
-    return similarity
+def score_similarity_parallel(today_temps, compare_temps, today_doy, compare_doy, is_holiday_today, compare_holidays):
+    """候选日数量较多且配置了 SIMILARITY_WORKERS 时，按块分给进程池计算，否则在当前进程内计算"""
+    global similarity_pool
+    if SIMILARITY_WORKERS <= 0 or len(compare_temps) < SIMILARITY_PARALLEL_MIN_DAYS:
+        return score_similarity(today_temps, compare_temps, today_doy, compare_doy, is_holiday_today, compare_holidays)
+    with similarity_pool_lock:
+        if similarity_pool is None:
+            similarity_pool = ProcessPoolExecutor(max_workers=SIMILARITY_WORKERS)
+    chunks = np.array_split(np.arange(len(compare_temps)), SIMILARITY_WORKERS)
+    tasks = [(today_temps, compare_temps[c], today_doy, compare_doy[c], is_holiday_today, compare_holidays[c]) for c in chunks]
+    return np.concatenate(list(similarity_pool.map(score_similarity_chunk, tasks)))
 
 
 def calculate_similar_dates(today_data, compare_data_all, today_date, is_holiday_today, holiday_map):
@@ -317,21 +604,31 @@ def calculate_similar_dates(today_data, compare_data_all, today_date, is_holiday
     :param holiday_map: 包含历史日期的节假日信息的字典
     :return: 最相似的5个日期及相似度
     """
-    # 按日期分组历史数据
-    grouped_data = group_data_by_date(compare_data_all)
-    similarities = []
+    # 今天：取第一条记录所在日期的 24 个整点温度
+    today_series = today_data['out_temp']
+    if len(today_series) == 0:
+        raise ValueError("今天的室外温度数据为空")
+    today_start = today_series.times[0] - today_series.times[0] % 86400
+    today_temps = hourly_nearest_values(today_series.times, today_series.values.astype(np.float64),
+                                        np.array([today_start]), within_day=False)[0]
+
+    # 历史数据：按日期分组，得到（日期数 × 24）的整点温度矩阵
+    compare_series = compare_data_all['out_temp']
+    if len(compare_series) == 0:
+        return []
+    day_starts = np.unique(compare_series.times - compare_series.times % 86400)
+    compare_temps = hourly_nearest_values(compare_series.times, compare_series.values.astype(np.float64), day_starts)
 
-    # 遍历每个分组数据，计算相似度
-    for compare_date, compare_data in grouped_data.items():
-        is_holiday_compare = holiday_map.get(compare_date, False)  # 获取比较日期的节假日信息
-        similarity = calculate_similarity(today_data['out_temp'], compare_data, today_date,
-                                          datetime.strptime(compare_date, "%Y-%m-%d"),
-                                          is_holiday_today, is_holiday_compare)
-        similarities.append((compare_date, similarity))
+    compare_dates = np.datetime_as_string((day_starts // 86400).astype("datetime64[D]")).tolist()
+    compare_holidays = np.array([bool(holiday_map.get(date, False)) for date in compare_dates])
+    today_doy = day_of_year(parse_epoch_seconds([today_date + " 00:00:00"]))[0]
 
-    # 按相似度排序，返回最高的5个
-    similarities.sort(key=lambda x: x[1], reverse=True)
-    return similarities[:5]
+    similarities = score_similarity_parallel(today_temps, compare_temps, today_doy, day_of_year(day_starts),
+                                             bool(is_holiday_today), compare_holidays)
+
+    # 按相似度从高到低取前 TOP_SIMILAR_DATES 个（相似度相同时日期早的在前）
+    top = np.argsort(-similarities, kind="stable")[:TOP_SIMILAR_DATES]
+    return [(compare_dates[i], float(similarities[i])) for i in top]
 
 
 # ========== 4: 查询日期对应的工休状态 ==========
@@ -344,264 +641,346 @@ DB_CONFIG = {
     'database': 'audit'
 }
 
-# 连接 MySQL 数据库
-def get_db_connection():
-    try:
-        source_conn = pymysql.connect(**DB_CONFIG)
-        return source_conn
-    except pymysql.MySQLError as e:
-        print(f"数据库连接失败: {e}")
-        return None
+# 全局数据库连接池，/db_pool_status 返回连接池指标
+db_pool = ConnectionPool(DB_CONFIG)
+app.register_blueprint(db_pool_blueprint(db_pool))
+
+# 全局工休日历缓存
+holiday_calendar = HolidayCalendar(db_pool)
 
 
 def query_work_rest_status(dates):
-    """查询一组日期对应的工休状态"""
+    """查询一组日期对应的工休状态（从工休日历缓存中读取）"""
+    # 获取传入的日期列表
+    if not dates:
+        print("日期列表不能为空")
     try:
-        # 获取传入的日期列表
-        if not dates:
-            print("日期列表不能为空")
-        # 查询工休状态
-        source_conn = get_db_connection()
-        source_cursor = source_conn.cursor()
-        placeholders = ', '.join(['%s'] * len(dates))
-        query = f"SELECT datetime, holiday FROM schedule WHERE datetime IN ({placeholders})"
-        source_cursor.execute(query, dates)
-
-        results = source_cursor.fetchall()
-
-        status_list = {}
         # 返回工休状态列表
-        for row in results:
-            if row[1] == 1:
-                status_list[str(row[0])] = True
-            else:
-                status_list[str(row[0])] = False
-        return status_list
+        return {day: status == 1 for day, status in holiday_calendar.lookup(dates).items()}
 
     except Exception as e:
         print(f"数据库获取数据失败: {e}")
         return None
 
-    finally:
-        if source_conn:
-            source_conn.close()
-            source_cursor.close()
-
 # ========== 5. 相关属性值计算 ==========
-def temp_average_calculation(start_time,end_time,records):
-    values = []
-    for record in records:
-        record_time = datetime.strptime(record["t"], "%Y-%m-%d %H:%M:%S")
-        if start_time <= record_time <= end_time:
-            values.append(record["v"])
+def temp_average_calculation(start_time,end_time,series):
+    values = series.between(to_epoch(start_time), to_epoch(end_time)).values
     if len(values) != 0:
-        return sum(values) / len(values)
+        return values.mean().item()
     else:
         return 0
 
-def temp_min_max_calculation(start_time, end_time, records):
-    values = []
-    for record in records:
-        record_time = datetime.strptime(record["t"], "%Y-%m-%d %H:%M:%S")
-        if start_time <= record_time <= end_time:
-            values.append(record["v"])
+def temp_min_max_calculation(start_time, end_time, series):
+    values = series.between(to_epoch(start_time), to_epoch(end_time)).values
     if len(values) != 0:
-        return min(values), max(values)  # 返回最小值和最大值
+        return values.min().item(), values.max().item()  # 返回最小值和最大值
     else:
         return None, None  # 如果没有值，返回 None
 
-def calculate_daily_difference(start_time, end_time, records):
-    closest_start = None
-    closest_end = None
-    min_start_diff = float("inf")
-    min_end_diff = float("inf")
-
-    for record in records:
-        record_time = datetime.strptime(record["t"], "%Y-%m-%d %H:%M:%S")
-        time_diff_start = abs((record_time - start_time).total_seconds())
-        time_diff_end = abs((record_time - end_time).total_seconds())
-
-        # 找最接近 start_time 的值
-        if time_diff_start < min_start_diff:
-            closest_start = record["v"]
-            min_start_diff = time_diff_start
-
-        # 找最接近 end_time 的值
-        if time_diff_end < min_end_diff:
-            closest_end = record["v"]
-            min_end_diff = time_diff_end
-
-    if closest_start is not None and closest_end is not None:
-        return closest_end - closest_start
-    else:
+def calculate_daily_difference(start_time, end_time, series):
+    if len(series) == 0:
         raise ValueError("记录为空或未找到任何时间点的值")
 
-def calculate_daily_cooling_price(start_time, end_time, records):
-    for record in records:
-        record_time = datetime.strptime(record["t"], "%Y-%m-%d %H:%M:%S")
-        # 找最接近 start_time 的值
-        if record_time < start_time or record_time > end_time:
-            continue
-        return record["v"]
-
-def Altitude_mode_running_time(start_time, end_time, compare_data_list):
-    """
-    计算满足条件的运行时长。
-    条件：
-        1. (JiFang9_BHSB_EC1_Run | JiFang9_BHSB_EC2_Run) |
-           (JiFang30_BHSB_EC1_Run & JiFang30_BHSB_EC2_Run & JiFang30_BHSB_EC3_Run)
-        2. (!JiFang9_BHSB_EC3_Run | !JiFang9_BHSB_EC4_Run) |
-           (!JiFang30_BHSB_EC1_Run & !JiFang30_BHSB_EC2_Run & !JiFang30_BHSB_EC3_Run)
-    返回：
-        字典形式的时长统计结果，包含两组条件的运行时长（单位：秒）。
-    """
-    # 初始化运行时长
-    condition_1_duration = 0
-    condition_2_duration = 0
-
-    # 对齐数据按时间排序
-    zipped_data = zip(
-        compare_data_list['JiFang9_BHSB_EC1_Run'],
-        compare_data_list['JiFang9_BHSB_EC2_Run'],
-        compare_data_list['JiFang9_BHSB_EC3_Run'],
-        compare_data_list['JiFang9_BHSB_EC4_Run'],
-        compare_data_list['JiFang30_BHSB_EC1_Run'],
-        compare_data_list['JiFang30_BHSB_EC2_Run'],
-        compare_data_list['JiFang30_BHSB_EC3_Run'],
-    )
-    previous_record = None
-
-    for JiFang9_EC1, JiFang9_EC2, JiFang9_EC3, JiFang9_EC4, JiFang30_EC1, JiFang30_EC2, JiFang30_EC3 in zipped_data:
-        # 获取当前时间戳
-        times = [
-            JiFang9_EC1["t"],
-            JiFang9_EC2["t"],
-            JiFang9_EC3["t"],
-            JiFang9_EC4["t"],
-            JiFang30_EC1["t"],
-            JiFang30_EC2["t"],
-            JiFang30_EC3["t"],
-        ]
-
-        # 确保所有时间一致
-        if len(set(times)) != 1:
-            continue  # 跳过时间不一致的记录
-
-        record_time = datetime.strptime(times[0], "%Y-%m-%d %H:%M:%S")
-
-        # 跳过不在时间范围内的数据
-        if record_time < start_time or record_time > end_time:
-            continue
-
-        # 如果存在前一条记录，计算时间差
-        if previous_record:
-            prev_time = datetime.strptime(previous_record["t"], "%Y-%m-%d %H:%M:%S")
-            time_delta = (record_time - prev_time).total_seconds()
-
-            # 获取状态值
-            JiFang9_EC1_status = JiFang9_EC1["s"]
-            JiFang9_EC2_status = JiFang9_EC2["s"]
-            JiFang9_EC3_status = JiFang9_EC3["s"]
-            JiFang9_EC4_status = JiFang9_EC4["s"]
-            JiFang30_EC1_status = JiFang30_EC1["s"]
-            JiFang30_EC2_status = JiFang30_EC2["s"]
-            JiFang30_EC3_status = JiFang30_EC3["s"]
-
-            # 条件 1 判断
-            condition_1 = (
-                    (JiFang9_EC1_status != 0 or JiFang9_EC2_status != 0) or
-                    (JiFang30_EC1_status != 0 and JiFang30_EC2_status != 0 and JiFang30_EC3_status != 0)
-            )
-            if condition_1:
-                condition_1_duration += time_delta
-
-            # 条件 2 判断
-            condition_2 = (
-                    (JiFang9_EC3_status == 0 or JiFang9_EC4_status == 0) or
-                    (JiFang30_EC1_status == 0 and JiFang30_EC2_status == 0 and JiFang30_EC3_status == 0)
-            )
-            if condition_2:
-                condition_2_duration += time_delta
-
-        # 更新前一条记录
-        previous_record = JiFang9_EC1  # 以 JiFang9_BHSB_EC1_Run 为基准记录时间
-
-    # 返回结果
-    return {
-        "Day_RunTime": condition_1_duration,
-        "Night_RunTime": condition_2_duration,
-    }
-
-def Related_attribute_value_calculation(compare_data_list,top_similar_dates):
-    results = []
+    # 分别找最接近 start_time 和 end_time 的值
+    closest_start = series.values[series.nearest(to_epoch(start_time))]
+    closest_end = series.values[series.nearest(to_epoch(end_time))]
+    return (closest_end - closest_start).item()
 
-    for date, similarity in top_similar_dates:
-        # 当前日期对应的时间范围
-        current_date = datetime.strptime(date, "%Y-%m-%d")
-        start_time = current_date
-        end_time = current_date.replace(hour=23, minute=59, second=59)
-        air_supply_temp = temp_average_calculation(start_time, end_time, compare_data_list['air_supply_temp'])
-        water_inlet_temp = temp_average_calculation(start_time, end_time, compare_data_list['water_inlet_temp'])
+def calculate_daily_cooling_price(start_time, end_time, series):
+    values = series.between(to_epoch(start_time), to_epoch(end_time)).values
+    if len(values) != 0:
+        return values[0].item()
 
-        daytime_start_time = current_date.replace(hour=8, minute=0, second=0)
-        daytime_end_time = current_date.replace(hour=17, minute=59, second=59)
+def compile_mode_condition(expression):
+    """
+    解析运行模式条件表达式，只允许变量名、括号和 & | ^ ~ / and or not。
+    返回：(引用的变量名列表, 计算函数)，计算函数的参数为 {变量名: 是否运行的布尔数组}
+    """
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except (SyntaxError, TypeError) as e:
+        raise ValueError(f"运行模式条件格式错误: {expression}") from e
+    names = []
+
+    def build(node):
+        if isinstance(node, ast.Name):
+            if node.id not in names:
+                names.append(node.id)
+            return lambda status: status[node.id]
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Invert, ast.Not)):
+            operand = build(node.operand)
+            return lambda status: ~operand(status)
+        if isinstance(node, ast.BinOp) and type(node.op) in MODE_OPERATORS:
+            left, right, combine = build(node.left), build(node.right), MODE_OPERATORS[type(node.op)]
+            return lambda status: combine(left(status), right(status))
+        if isinstance(node, ast.BoolOp):
+            values, combine = [build(value) for value in node.values], MODE_OPERATORS[type(node.op)]
+            return lambda status: functools.reduce(combine, (value(status) for value in values))
+        raise ValueError(f"运行模式条件不支持的写法: {ast.unparse(node)}")
+
+    return names, build(tree.body)
+
+def compile_mode_conditions(conditions, compare_data_list=None):
+    """
+    校验并解析全部运行模式条件，给出 compare_data_list 时同时检查引用的变量是否存在。
+    返回：{模式名: (变量名列表, 计算函数)}
+    """
+    if not isinstance(conditions, dict) or not conditions:
+        raise ValueError("运行模式条件必须是非空的 {模式名: 表达式} 字典")
+    compiled = {name: compile_mode_condition(expression) for name, expression in conditions.items()}
+    for names, _ in compiled.values() if compare_data_list is not None else ():
+        for name in names:
+            if not isinstance(compare_data_list.get(name), TagSeries):
+                raise ValueError(f"运行模式条件引用了未知变量: {name}")
+    return compiled
+
+def align_status(compare_data_list, names):
+    """
+    按时间戳合并多个运行状态序列（内连接），只保留所有变量都有数据的时间。
+    返回：(公共时间, {变量名: 是否运行的布尔数组})
+    """
+    times = functools.reduce(np.intersect1d, (compare_data_list[name].times for name in names))
+    status = {}
+    for name in names:
+        series = compare_data_list[name]
+        status[name] = series.status[np.searchsorted(series.times, times)] != 0
+    dropped = max(len(compare_data_list[name]) for name in names) - len(times)
+    if dropped:
+        print(f"运行状态时间未对齐，跳过 {dropped} 条记录")
+    return times, status
+
+def mode_rows(compare_data_list, conditions=RUN_MODE_CONDITIONS):
+    """
+    计算每条对齐后的记录满足哪些运行模式。
+    返回：(记录时间, {模式名: 是否满足的布尔数组})
+    """
+    compiled = compile_mode_conditions(conditions, compare_data_list)
+    names = list(dict.fromkeys(name for variables, _ in compiled.values() for name in variables))
+    times, status = align_status(compare_data_list, names)
+    return times, {mode: evaluate(status) for mode, (_, evaluate) in compiled.items()}
 
-        daytime_avg_temp = temp_average_calculation(daytime_start_time, daytime_end_time, compare_data_list['out_temp'])
-        nighttime_avg_temp_one = temp_average_calculation(current_date, daytime_start_time,compare_data_list['out_temp'])
-        nighttime_avg_temp_two = temp_average_calculation(daytime_end_time, end_time,compare_data_list['out_temp'])
-        min_temp, max_temp = temp_min_max_calculation(start_time, end_time, compare_data_list['out_temp'])
+def Altitude_mode_running_time(start_time, end_time, compare_data_list, conditions=RUN_MODE_CONDITIONS):
+    """
+    计算时间范围内满足各运行模式条件的运行时长。
+    条件见 RUN_MODE_CONDITIONS，每条记录与前一条记录的时间差按当前记录的状态计入。
+    返回：
+        字典形式的时长统计结果，{模式名: 运行时长（单位：秒）}。
+    """
+    record_time, modes = mode_rows(compare_data_list, conditions)
 
-        cooling_capacity_kwh = calculate_daily_difference(start_time, end_time, compare_data_list['cooling_capacity_kwh'])
-        energy_consumption_kwh = calculate_daily_difference(start_time, end_time,compare_data_list['energy_consumption_kwh'])
+    # 只保留时间范围内的记录
+    in_range = (record_time >= to_epoch(start_time)) & (record_time <= to_epoch(end_time))
+    time_delta = np.diff(record_time[in_range])
+    return {mode: float(time_delta[satisfied[in_range][1:]].sum()) for mode, satisfied in modes.items()}
 
-        peak_mode_duration = Altitude_mode_running_time(start_time, end_time, compare_data_list)
+def mode_running_time_by_day(compare_data_list, first_day, day_count, conditions=RUN_MODE_CONDITIONS):
+    """
+    一次计算多天的运行时长：first_day 起（按天编号，即秒级时间戳 // 86400）连续 day_count 天。
+    只累计同一天内相邻记录的时间差。
+    返回：{模式名: 每天运行时长（秒）的数组}
+    """
+    record_time, modes = mode_rows(compare_data_list, conditions)
+    day = record_time // 86400 - first_day
+    same_day = (day[1:] == day[:-1]) & (day[1:] >= 0) & (day[1:] < day_count)
+    time_delta = np.diff(record_time)[same_day]
+    day = day[1:][same_day]
+    return {mode: np.bincount(day, weights=time_delta * satisfied[1:][same_day], minlength=day_count)
+            for mode, satisfied in modes.items()}
+
+def parse_time_of_day(text):
+    """将 "HH:MM:SS" 转换为当天的秒数"""
+    moment = datetime.strptime(text, "%H:%M:%S")
+    return moment.hour * 3600 + moment.minute * 60 + moment.second
+
+class DailyAggregates:
+    """
+    对比数据的每日统计：每个（标签, 时段）只做一次分组计算，得到全部日期的均值、最值、首个值等，
+    报表中任意日期的属性值都变成查表。计算结果和各日期的报表都缓存在对象中。
+    """
 
-        cooling_price = calculate_daily_cooling_price(start_time, end_time, compare_data_list['cooling_price'])
+    def __init__(self, data_list, conditions=RUN_MODE_CONDITIONS):
+        self.data_list = data_list
+        self.conditions = conditions
+        series = [item for item in data_list.values() if isinstance(item, TagSeries) and len(item)]
+        self.first_day = min(item.times[0] for item in series) // 86400 if series else 0
+        self.day_count = max(item.times[-1] for item in series) // 86400 - self.first_day + 1 if series else 0
+        self.windows = {name: (parse_time_of_day(start), parse_time_of_day(end)) for name, (start, end) in REPORT_WINDOWS.items()}
+        self.statistics = {}
+        self.reports = {}
+
+    def day_index(self, date):
+        """日期在统计数组中的下标，不在数据范围内时返回 None"""
+        index = int(np.datetime64(date, "D").astype(np.int64)) - self.first_day
+        return index if 0 <= index < self.day_count else None
+
+    def window(self, tag, start, end):
+        """一次分组计算标签在每天 [start, end]（当天秒数）时段内的全部统计量"""
+        key = (tag, start, end)
+        statistics = self.statistics.get(key)
+        if statistics is None:
+            series = self.data_list[tag]
+            seconds = series.times % 86400
+            mask = (seconds >= start) & (seconds <= end)
+            day = series.times[mask] // 86400 - self.first_day
+            values = series.values[mask]
+
+            count = np.bincount(day, minlength=self.day_count)
+            total = np.bincount(day, weights=values, minlength=self.day_count)
+            statistics = {"count": count, "sum": total, "mean": total / np.maximum(count, 1)}
+            # 时间已排序，同一天的样本连续，按天分段后用 reduceat 求最值
+            segments = np.flatnonzero(np.diff(day, prepend=-1))
+            for name, reduce in (("min", np.minimum), ("max", np.maximum), ("first", None)):
+                statistics[name] = np.zeros(self.day_count, dtype=values.dtype)
+                if len(values):
+                    statistics[name][day[segments]] = values[segments] if reduce is None else reduce.reduceat(values, segments)
+            self.statistics[key] = statistics
+        return statistics
+
+    def value(self, tag, start, end, statistic, index, default=None):
+        """某天某时段的统计值，当天没有数据时返回 default（count 和 sum 为 0）"""
+        if index is None or self.window(tag, start, end)["count"][index] == 0:
+            return 0 if statistic in ("count", "sum") else default
+        return self.window(tag, start, end)[statistic][index].item()
+
+    def daily_difference(self, tag, index, date):
+        """当天最接近 00:00:00 与 23:59:59 的两个值之差（在全部数据上查找）"""
+        key = (tag, "difference")
+        differences = self.statistics.get(key)
+        if differences is None:
+            series = self.data_list[tag]
+            if len(series) == 0:
+                raise ValueError("记录为空或未找到任何时间点的值")
+            day_starts = (self.first_day + np.arange(self.day_count)) * 86400
+            differences = series.values[series.nearest(day_starts + 86399)] - series.values[series.nearest(day_starts)]
+            self.statistics[key] = differences
+        if index is None:
+            start_time = datetime.strptime(date, "%Y-%m-%d")
+            return calculate_daily_difference(start_time, start_time.replace(hour=23, minute=59, second=59), self.data_list[tag])
+        return differences[index].item()
+
+    def mode_running_time(self, index):
+        """当天各运行模式的时长，全部日期一次计算"""
+        key = "mode_running_time"
+        durations = self.statistics.get(key)
+        if durations is None:
+            durations = mode_running_time_by_day(self.data_list, self.first_day, self.day_count, self.conditions)
+            self.statistics[key] = durations
+        return {mode: 0.0 if index is None else float(duration[index]) for mode, duration in durations.items()}
+
+    def report(self, date, windows=None):
+        """
+        某天的报表属性值。
+        windows：额外时段 {名称: {"tag", "start", "end", "statistic"}}，start/end 为当天秒数
+        """
+        report = self.reports.get(date)
+        if report is None:
+            index = self.day_index(date)
+            day, daytime = self.windows["day"], self.windows["daytime"]
+            night_one, night_two = self.windows["nighttime_one"], self.windows["nighttime_two"]
+            report = {
+                "min_temp": self.value("out_temp", *day, "min", index),
+                "max_temp": self.value("out_temp", *day, "max", index),
+                "daytime_avg_temp": self.value("out_temp", *daytime, "mean", index, 0),
+                "nighttime_avg_temp": self.value("out_temp", *night_one, "mean", index, 0) + self.value("out_temp", *night_two, "mean", index, 0),
+                **self.mode_running_time(index),
+                "air_supply_temp": self.value("air_supply_temp", *day, "mean", index, 0),
+                "water_inlet_temp": self.value("water_inlet_temp", *day, "mean", index, 0),
+                "cooling_capacity_kwh": self.daily_difference("cooling_capacity_kwh", index, date),
+                "energy_consumption_kwh": self.daily_difference("energy_consumption_kwh", index, date),
+                "cooling_price": self.value("cooling_price", *day, "first", index),
+            }
+            self.reports[date] = report
+        report = dict(report)
+        for name, window in (windows or {}).items():
+            report[name] = self.value(window["tag"], window["start"], window["end"], window["statistic"], self.day_index(date))
+        return report
+
+def parse_report_windows(windows, data_list):
+    """校验请求中的额外时段，start/end 转换为当天秒数"""
+    parsed = {}
+    for name, window in (windows or {}).items():
+        if window.get("tag") not in data_list or not isinstance(data_list[window["tag"]], TagSeries):
+            raise ValueError(f"时段 {name} 的标签无效: {window.get('tag')}")
+        statistic = window.get("statistic", "mean")
+        if statistic not in WINDOW_STATISTICS:
+            raise ValueError(f"时段 {name} 的统计量必须是 {', '.join(WINDOW_STATISTICS)} 之一")
+        start, end = parse_time_of_day(window.get("start", "00:00:00")), parse_time_of_day(window.get("end", "23:59:59"))
+        if start > end:
+            raise ValueError(f"时段 {name} 的开始时刻晚于结束时刻")
+        parsed[name] = {"tag": window["tag"], "start": start, "end": end, "statistic": statistic}
+    return parsed
+
+# 每日统计缓存：请求参数与数据指纹 -> DailyAggregates
+daily_aggregates_cache = OrderedDict()
+daily_aggregates_lock = threading.Lock()
+
+def daily_aggregates(data_list, key, conditions=RUN_MODE_CONDITIONS):
+    """按请求参数、运行模式条件和数据指纹复用每日统计，同一份对比数据的报表只需查表"""
+    fingerprint = tuple((name, len(item), int(item.times[-1]) if len(item) else 0)
+                        for name, item in sorted(data_list.items()) if isinstance(item, TagSeries))
+    cache_key = (key, json.dumps(conditions, sort_keys=True), fingerprint)
+    with daily_aggregates_lock:
+        aggregates = daily_aggregates_cache.get(cache_key)
+        if aggregates is not None:
+            daily_aggregates_cache.move_to_end(cache_key)
+            return aggregates
+
+    aggregates = DailyAggregates(data_list, conditions)
+    with daily_aggregates_lock:
+        daily_aggregates_cache[cache_key] = aggregates
+        while len(daily_aggregates_cache) > DAILY_AGGREGATE_CACHE_SIZE:
+            daily_aggregates_cache.popitem(last=False)
+    return aggregates
+
+def Related_attribute_value_calculation(compare_data_list, top_similar_dates, aggregates=None, windows=None):
+    if aggregates is None:
+        aggregates = DailyAggregates(compare_data_list)
 
+    results = []
+    for day, similarity in top_similar_dates:
         # 添加到结果中
-        results.append({
-            "date": date,
-            "similarity": similarity,
-            "min_temp": min_temp,
-            "max_temp": max_temp,
-            "daytime_avg_temp": daytime_avg_temp,
-            "nighttime_avg_temp": nighttime_avg_temp_one + nighttime_avg_temp_two,
-            "peak_mode_duration": peak_mode_duration['Day_RunTime'],
-            "night_mode_duration": peak_mode_duration['Night_RunTime'],
-            "air_supply_temp": air_supply_temp,
-            "water_inlet_temp": water_inlet_temp,
-            "cooling_capacity_kwh": cooling_capacity_kwh,
-            "energy_consumption_kwh": energy_consumption_kwh,
-            "cooling_price" :cooling_price
-        })
+        results.append({"date": day, "similarity": similarity, **aggregates.report(day, windows)})
 
     return results
 
-def Integrated_time_dictionary(data_list):
+def pump_frequency(matrix):
     """
-    将数据按日期分组
-    :param data: 包含时间戳和值的字典
-    :return: 按日期分组的数据字典
+    空调泵频率：两台泵都运行时取 FreFB1、FreFB2 的平均值，只有一台运行时取该泵的频率，都不运行时为 0。
+    某时刻缺少运行状态视为不运行；运行的泵缺少频率时该时刻没有 pump_freq。
     """
-    grouped = defaultdict(lambda: defaultdict(lambda: defaultdict(dict)))
-    for key, values in data_list.items():
-        for entry in values:
-            date = entry['t'][:10]
-            date_time = entry['t']  # 提取日期部分
-            grouped[date][date_time][key] = entry['v']
+    run1, has_run1 = matrix.column('Pump_run1')
+    run2, has_run2 = matrix.column('Pump_run2')
+    freq1, has_freq1 = matrix.column('FreFB1')
+    freq2, has_freq2 = matrix.column('FreFB2')
+    on1 = has_run1 & (run1 == 1)
+    on2 = has_run2 & (run2 == 1)
+    values = np.where(on1 & on2, (freq1 + freq2) / 2, np.where(on1, freq1, np.where(on2, freq2, 0.0)))
+    valid = ~(on1 & ~has_freq1) & ~(on2 & ~has_freq2)
+    return values, valid
+
+
+# 派生列：列名 -> 由 TagMatrix 计算 (值, 是否有值) 的函数，按顺序追加到矩阵中
+DERIVED_COLUMNS = {"pump_freq": pump_frequency}
 
-    for key, values in grouped.items():
-        for time,properties_values in values.items():
-            if properties_values['Pump_run1'] ==1 and properties_values['Pump_run2'] ==1:
-                properties_values['pump_freq'] = (properties_values['FreFB1'] + properties_values['FreFB2'])/2
-            elif properties_values['Pump_run1'] ==1:
-                properties_values['pump_freq'] = (properties_values['FreFB1'])
-            elif properties_values['Pump_run2'] ==1:
-                properties_values['pump_freq'] = (properties_values['FreFB2'])
-            else:
-                properties_values['pump_freq'] = 0
 
-    return grouped
+def operating_conditions_matrix(data_list, derived=DERIVED_COLUMNS):
+    """将 {标签: TagSeries} 对齐为 TagMatrix，并追加派生列"""
+    matrix = TagMatrix.from_series(data_list)
+    for tag, compute in derived.items():
+        values, valid = compute(matrix)
+        matrix = matrix.with_column(tag, values, valid)
+    return matrix
+
+
+def operating_conditions_by_day(matrix, dates=None):
+    """
+    按日期输出工况数据：{日期: {时间: {标签: 值}}}。
+    dates 为 None 时输出全部日期，否则只序列化指定的日期（没有数据的日期为空字典）。
+    """
+    day_rows = matrix.day_rows()
+    if dates is None:
+        dates = day_rows
+    return {day: matrix.to_records(*day_rows[day]) if day in day_rows else {} for day in dates}
 
 def predict_remaining_cooling(compare_data_list, today_data_dict, current_time):
     """
@@ -614,34 +993,25 @@ def predict_remaining_cooling(compare_data_list, today_data_dict, current_time):
     返回:
         list: 今日剩余时间的冷量曲线预测值。
     """
-    today_data = sorted(today_data_dict["cooling_capacity"], key=lambda x: x["t"])
-    similar_day_data = sorted(compare_data_list["cooling_capacity"], key=lambda x: x["t"])
-    predicted_today_data = []
-    difference = 0
-
-    for today_point,similar_point in zip(today_data,similar_day_data):
-        today_time = datetime.strptime(today_point["t"].split(" ")[1], "%H:%M:%S")
-        if today_time <= current_time:
-            predicted_today_data.append({"t": today_point["t"], "v": today_point["v"]})
-
-        difference += similar_point["v"] - today_point["v"]
-
-    difference = round(difference/len(today_data),2)
-
-    for i,similar_point in enumerate(similar_day_data):
-        similar_time = similar_point["t"].split(" ")[1]
-        formatted_current_time = str(current_time.strftime("%Y-%m-%d %H:%M:%S")).split(" ")[1]
-        # 当前时间之前的数据保持不变
-        if similar_time <= formatted_current_time:
-            continue
-
-        current_similar_value = similar_point["v"]
-        if difference > 0:
-            predicted_value = current_similar_value - difference
-        else:
-            predicted_value = current_similar_value + difference
-
-        predicted_today_data.append({"t": similar_point["t"], "v": predicted_value})
+    today_data = today_data_dict["cooling_capacity"]
+    similar_day_data = compare_data_list["cooling_capacity"]
+    current_seconds = current_time.hour * 3600 + current_time.minute * 60 + current_time.second
+    length = min(len(today_data), len(similar_day_data))
+
+    # 今日已过去时间的数据保持不变（按当天的时分秒比较）
+    passed = today_data.times % 86400 <= current_seconds
+    predicted_today_data = [{"t": t, "v": v} for t, v in zip(format_epoch_seconds(today_data.times[passed]), today_data.values[passed].tolist())]
+
+    difference = (similar_day_data.values[:length] - today_data.values[:length]).sum()
+    difference = round(float(difference) / len(today_data), 2)
+
+    # 当前时间之后按相似日曲线减去平均差值
+    remaining = similar_day_data.times % 86400 > current_seconds
+    if difference > 0:
+        predicted_values = similar_day_data.values[remaining] - difference
+    else:
+        predicted_values = similar_day_data.values[remaining] + difference
+    predicted_today_data.extend({"t": t, "v": v} for t, v in zip(format_epoch_seconds(similar_day_data.times[remaining]), predicted_values.tolist()))
 
     return predicted_today_data
 
@@ -656,8 +1026,10 @@ def Similar_day_calculation():
         url = request_data['url']  # 获取 URL
         data_compare = request_data['data_compare']  # 获取 data_compare
         data = request_data['data']  # 获取 data
-        compare_data_list = fetch_history_data(url, data_compare)
-        today_data_dict = fetch_history_data(url, data)
+        compare_data_list, today_data_dict = fetch_in_parallel(fetch_history_data, url, data_compare, data)
+        windows = parse_report_windows(request_data.get('windows'), compare_data_list)  # 可选的额外统计时段
+        run_modes = request_data.get('run_modes', RUN_MODE_CONDITIONS)  # 可选的运行模式条件
+        compile_mode_conditions(run_modes, compare_data_list)
         compare_dates = compare_data_list['time_list']
         holidays_compare = query_work_rest_status(compare_dates)
         today_date = today_data_dict['time_list']
@@ -667,7 +1039,8 @@ def Similar_day_calculation():
         return jsonify({"status": "error", "message": str(e)}), 400
     # 查找相似日
     top_similar_dates = calculate_similar_dates(today_data_dict, compare_data_list, today_date[0],next(iter(holidays_today.values())), holidays_compare)
-    variables = Related_attribute_value_calculation(compare_data_list, top_similar_dates)
+    aggregates = daily_aggregates(compare_data_list, json.dumps([url, data_compare], sort_keys=True), run_modes)
+    variables = Related_attribute_value_calculation(compare_data_list, top_similar_dates, aggregates, windows)
 
     similar_dates = [date[0] for date in top_similar_dates]
 
@@ -684,15 +1057,11 @@ def Similar_daily_operating_conditions_curve():
         data_compare = request_data['data_compare']  # 获取 data_compare
         data = request_data['data']  # 获取 data
         similar_dates = request_data['similar_dates']  # 获取 similar_dates
-        compare_data_list = fetch_history_data2(url, data_compare)
-        today_data_dict = fetch_history_data2(url, data)
-
-        compare_data = Integrated_time_dictionary(compare_data_list)
-        today_data = Integrated_time_dictionary(today_data_dict)
+        compare_data_list, today_data_dict = fetch_in_parallel(fetch_history_data2, url, data_compare, data)
 
-        res_values = today_data
-        for time in similar_dates:
-            res_values[time] = compare_data[time]
+        # 列式对齐后只序列化当天和请求的相似日
+        res_values = operating_conditions_by_day(operating_conditions_matrix(today_data_dict))
+        res_values.update(operating_conditions_by_day(operating_conditions_matrix(compare_data_list), similar_dates))
 
     except Exception as e:
         print(e)
@@ -710,8 +1079,7 @@ def Load_forecasting():
         url = request_data['url']  # 获取 URL
         data_compare = request_data['similar_data']  # 获取 data_compare
         data = request_data['data']  # 获取 data
-        compare_data_list = fetch_history_data3(url, data_compare)
-        today_data_dict = fetch_history_data3(url, data)
+        compare_data_list, today_data_dict = fetch_in_parallel(fetch_history_data3, url, data_compare, data)
 
         res_values = predict_remaining_cooling(compare_data_list, today_data_dict,now)
     except Exception as e:
@@ -0,0 +1,47 @@
+import sys
+import time
+import subprocess
+import tracemalloc
+import numpy as np
+from project4 import Similar_day_calculation as similar_day
+
+# 基准测试：长时间范围整段获取 与 分块并行获取 的耗时和客户端峰值内存
+# 接口桩在子进程中运行，耗时随查询天数增加（DELAY_PER_DAY），模拟大范围查询变慢直至超时
+PORT = 18210
+DELAY = 0.05  # 每次请求的固定延迟（秒）
+DELAY_PER_DAY = 0.1  # 每查询一天增加的延迟（秒）
+TAGS = ",".join(f"JiFang1/Tag{i}" for i in range(14))
+RANGES = (("31 天", "2024-07-01 00:00:00", "2024-07-31 23:59:59"), ("365 天", "2023-08-01 00:00:00", "2024-07-31 23:59:59"))
+
+
+def measure(fetch, url, data):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fetch(url, data)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 2 ** 20
+
+
+if __name__ == "__main__":
+    stub = subprocess.Popen([sys.executable, "-m", "project4.stub_historian", str(PORT), str(DELAY), "0", str(DELAY_PER_DAY)], stdout=subprocess.DEVNULL)
+    time.sleep(1)
+    url = f"http://127.0.0.1:{PORT}/history"
+    similar_day.historian.retries = 0  # 只比较单次获取
+    try:
+        print(f"接口桩延迟 {DELAY * 1000:.0f} ms + {DELAY_PER_DAY * 1000:.0f} ms/天，14 个标签，600 s 间隔，"
+              f"单次请求时间预算 {similar_day.HISTORIAN_TIMEOUT} s，分块 {similar_day.FETCH_CHUNK_DAYS} 天 × {similar_day.FETCH_CHUNK_WORKERS} 并行")
+        print(f"{'范围':<8} {'方式':<10} {'耗时(s)':>8} {'峰值内存(MB)':>13} {'样本数':>8}")
+        for label, start, end in RANGES:
+            data = {"tag": TAGS, "start": start, "end": end, "second": "600"}
+            whole, whole_time, whole_peak = measure(similar_day.fetch_chunk, url, data)
+            chunked, chunk_time, chunk_peak = measure(similar_day.fetch_tag_series, url, data)
+            for name, result, elapsed, peak in (("整段获取", whole, whole_time, whole_peak), ("分块获取", chunked, chunk_time, chunk_peak)):
+                samples = "失败" if result is None else sum(len(series) for _, series in result)
+                print(f"{label:<8} {name:<10} {elapsed:>8.2f} {peak:>13.1f} {samples:>8}")
+            if whole is not None and chunked is not None:
+                same = all(np.array_equal(a.times, b.times) and np.array_equal(a.values, b.values) for (_, a), (_, b) in zip(whole, chunked))
+                print(f"{label:<8} 分块拼接结果与整段获取一致：{same}")
+    finally:
+        stub.terminate()
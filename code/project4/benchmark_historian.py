@@ -0,0 +1,55 @@
+import time
+import requests
+import numpy as np
+from project4 import Similar_day_calculation as similar_day
+from project4.stub_historian import start_stub
+
+# 基准测试：通过本地接口桩测量一次报表请求获取历史数据的耗时
+# 原有方式：两次 requests.post 串行、每次新建连接；现在：共用长连接池，对比数据和当天数据并行获取
+# 数据量取小（小时间隔），使耗时主要反映接口延迟和建立连接，而不是桩生成 JSON 的 CPU 时间
+DELAY = 0.05  # 接口桩模拟的处理延迟（秒）
+REPEAT = 20
+TAGS = ",".join(f"JiFang1/Tag{i}" for i in range(14))
+DATA_COMPARE = {"tag": TAGS, "start": "2024-07-30 00:00:00", "end": "2024-08-05 23:59:59", "second": "3600"}
+DATA = {"tag": TAGS, "start": "2024-08-31 00:00:00", "end": "2024-08-31 23:59:59", "second": "3600"}
+
+
+def legacy_fetch(url):
+    for data in (DATA_COMPARE, DATA):
+        requests.post(url, data=data, timeout=10).json()
+
+
+def pooled_sequential(url):
+    for data in (DATA_COMPARE, DATA):
+        similar_day.fetch_data(url, data)
+
+
+def pooled_parallel(url):
+    similar_day.fetch_in_parallel(similar_day.fetch_data, url, DATA_COMPARE, DATA)
+
+
+def latency(func, url):
+    func(url)  # 预热（建立长连接）
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func(url)
+        timings.append(time.perf_counter() - start)
+    return np.percentile(timings, 50) * 1000, np.percentile(timings, 99) * 1000
+
+
+if __name__ == "__main__":
+    server, url = start_stub(delay=DELAY)
+    print(f"接口桩延迟 {DELAY * 1000:.0f} ms，14 个标签，对比数据 7 天 + 当天数据 1 天（3600 s 间隔）")
+    print(f"{'方式':<24} {'p50(ms)':>10} {'p99(ms)':>10}")
+    for label, func in (("串行 + 新建连接（原有）", legacy_fetch), ("串行 + 长连接池", pooled_sequential), ("并行 + 长连接池", pooled_parallel)):
+        p50, p99 = latency(func, url)
+        print(f"{label:<24} {p50:>10.1f} {p99:>10.1f}")
+    server.shutdown()
+
+    # 重试：接口桩 30% 的请求返回 503
+    server, url = start_stub(fail_rate=0.3)
+    similar_day.historian.backoff = 0.01
+    results = [similar_day.fetch_data(url, DATA) for _ in range(50)]
+    print(f"30% 失败率下 50 次请求成功 {sum(result is not None for result in results)} 次（最多重试 {similar_day.HISTORIAN_RETRIES} 次）")
+    server.shutdown()
@@ -0,0 +1,94 @@
+import time
+import tracemalloc
+import numpy as np
+from flask import json
+from collections import defaultdict
+from project4 import Similar_day_calculation as similar_day
+from project4.stub_historian import start_stub
+
+# 基准测试：/Operating_conditions_curve 的数据整理（原有三层嵌套字典 与 列式 TagMatrix）的耗时、峰值内存和响应大小
+# 数据来自本地接口桩：23 个标签、60 s 间隔，对比数据 31 天，请求其中 5 个相似日
+REPEAT = 5
+TAGS = ",".join(f"JiFang1/Curve{i}" for i in range(23))
+DATA_COMPARE = {"tag": TAGS, "start": "2024-07-01 00:00:00", "end": "2024-07-31 23:59:59", "second": "60"}
+DATA = {"tag": TAGS, "start": "2024-08-01 00:00:00", "end": "2024-08-01 23:59:59", "second": "60"}
+SIMILAR_DATES = ["2024-07-03", "2024-07-09", "2024-07-15", "2024-07-22", "2024-07-30"]
+
+
+def legacy_integrated_time_dictionary(data_list):
+    """原有实现：日期 -> 时间 -> 标签 -> 值 的三层嵌套字典，逐行判断计算 pump_freq"""
+    grouped = defaultdict(lambda: defaultdict(lambda: defaultdict(dict)))
+    for key, series in data_list.items():
+        for date_time, value in zip(similar_day.format_epoch_seconds(series.times), series.values.tolist()):
+            grouped[date_time[:10]][date_time][key] = value
+
+    for key, values in grouped.items():
+        for moment, properties_values in values.items():
+            if properties_values['Pump_run1'] == 1 and properties_values['Pump_run2'] == 1:
+                properties_values['pump_freq'] = (properties_values['FreFB1'] + properties_values['FreFB2']) / 2
+            elif properties_values['Pump_run1'] == 1:
+                properties_values['pump_freq'] = (properties_values['FreFB1'])
+            elif properties_values['Pump_run2'] == 1:
+                properties_values['pump_freq'] = (properties_values['FreFB2'])
+            else:
+                properties_values['pump_freq'] = 0
+    return grouped
+
+
+def legacy_curve(compare_data_list, today_data_dict):
+    compare_data = legacy_integrated_time_dictionary(compare_data_list)
+    res_values = legacy_integrated_time_dictionary(today_data_dict)
+    for day in SIMILAR_DATES:
+        res_values[day] = compare_data[day]
+    return res_values
+
+
+def columnar_curve(compare_data_list, today_data_dict):
+    res_values = similar_day.operating_conditions_by_day(similar_day.operating_conditions_matrix(today_data_dict))
+    res_values.update(similar_day.operating_conditions_by_day(similar_day.operating_conditions_matrix(compare_data_list), SIMILAR_DATES))
+    return res_values
+
+
+def measure(build, compare_data_list, today_data_dict):
+    """返回 (p50 毫秒, 峰值内存 MB, 响应字节数, 响应)：包括整理数据和序列化为 JSON"""
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        body = json.dumps(build(compare_data_list, today_data_dict))
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    build(compare_data_list, today_data_dict)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return np.percentile(timings, 50) * 1000, peak / 2 ** 20, len(body), json.loads(body)
+
+
+if __name__ == "__main__":
+    server, url = start_stub()
+    compare_data_list, today_data_dict = similar_day.fetch_in_parallel(similar_day.fetch_history_data2, url, DATA_COMPARE, DATA)
+    # 接口桩的运行状态不是 0/1，这里改为 0/1 使 pump_freq 的各个分支都被用到
+    for key in ("Pump_run1", "Pump_run2"):
+        series = compare_data_list[key]
+        compare_data_list[key] = similar_day.TagSeries(series.times, (series.values > 20).astype(np.int64), series.status)
+        series = today_data_dict[key]
+        today_data_dict[key] = similar_day.TagSeries(series.times, (series.values > 20).astype(np.int64), series.status)
+
+    print(f"23 个标签，60 s 间隔，对比数据 31 天（{len(compare_data_list['out_temp'])} 个时刻），当天 1 天，请求 {len(SIMILAR_DATES)} 个相似日；重复 {REPEAT} 次取中位数")
+    print(f"{'方式':<20} {'耗时(ms)':>10} {'峰值内存(MB)':>13} {'响应(字节)':>12}")
+    results = []
+    for label, build in (("三层嵌套字典（原有）", legacy_curve), ("列式 TagMatrix", columnar_curve)):
+        elapsed, peak, size, body = measure(build, compare_data_list, today_data_dict)
+        results.append(body)
+        print(f"{label:<20} {elapsed:>10.1f} {peak:>13.1f} {size:>12}")
+    print(f"两种方式的响应内容一致：{results[0] == results[1]}")
+
+    # 完整接口耗时（包括从接口桩获取数据）
+    client = similar_day.app.test_client()
+    request_body = {"url": url, "data_compare": DATA_COMPARE, "data": DATA, "similar_dates": SIMILAR_DATES}
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        response = client.post("/Operating_conditions_curve", json=request_body)
+        timings.append(time.perf_counter() - start)
+    print(f"/Operating_conditions_curve 完整请求 p50 {np.percentile(timings, 50) * 1000:.1f} ms，响应 {len(response.get_data())} 字节")
+    server.shutdown()
@@ -0,0 +1,64 @@
+import time
+import numpy as np
+from datetime import datetime, timedelta
+from project4 import Similar_day_calculation as similar_day
+
+# 基准测试：相似日评分，逐日逐整点查找（原有方式） 与 向量化评分 的耗时
+STEP = 600  # 采样间隔（秒）
+START = datetime(2015, 1, 1)
+LEGACY_MAX_DAYS = 31  # 原有方式在一年窗口上需要数十秒，只测到一个月
+
+
+def make_entries(start, days):
+    rng = np.random.default_rng(days)
+    times = [(start + timedelta(seconds=i * STEP)).strftime("%Y-%m-%d %H:%M:%S") for i in range(days * 86400 // STEP)]
+    return [{"t": t, "v": float(v), "s": 1} for t, v in zip(times, rng.uniform(10, 35, len(times)))]
+
+
+def legacy_similar_dates(today_entries, compare_entries, today_date, is_holiday_today, holiday_map):
+    """原有方式：按日期分组后逐日计算，每个整点都在当天全部记录上 strptime + min 查找最近记录"""
+    def nearest(entries, target):
+        return min(entries, key=lambda x: abs(datetime.strptime(x['t'], '%Y-%m-%d %H:%M:%S') - target))['v']
+
+    grouped = {}
+    for entry in compare_entries:
+        grouped.setdefault(entry['t'][:10], []).append(entry)
+    today = datetime.strptime(today_date, "%Y-%m-%d")
+    today_temps = [nearest(today_entries, today + timedelta(hours=i)) for i in range(24)]
+    similarities = []
+    for date, entries in grouped.items():
+        day = datetime.strptime(date, "%Y-%m-%d")
+        compare_temps = [nearest(entries, day + timedelta(hours=i)) for i in range(24)]
+        variance = sum((a - b) ** 2 for a, b in zip(today_temps, compare_temps)) / 24
+        similarity = 100.0 - variance * 0.1 - abs(today.timetuple().tm_yday - day.timetuple().tm_yday) * 0.1
+        similarity -= 20 if holiday_map.get(date, False) != is_holiday_today else 0
+        similarities.append((date, similarity))
+    similarities.sort(key=lambda x: x[1], reverse=True)
+    return similarities[:5]
+
+
+def timeit(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    print(f"{'对比天数':>8} {'样本数':>8} {'逐日查找(s)':>12} {'向量化(s)':>10} {'向量化+进程池(s)':>16}")
+    for days in (31, 365, 3650):
+        compare_entries = make_entries(START, days)
+        today_date = (START + timedelta(days=days)).strftime("%Y-%m-%d")
+        today_entries = make_entries(START + timedelta(days=days), 1)
+        today_series = similar_day.TagSeries.from_records(today_entries)
+        compare_series = similar_day.TagSeries.from_records(compare_entries)
+        args = ({"out_temp": today_series}, {"out_temp": compare_series}, today_date, False, {})
+
+        legacy_time = float("nan")
+        if days <= LEGACY_MAX_DAYS:
+            legacy_time = timeit(legacy_similar_dates, today_entries, compare_entries, today_date, False, {})
+        similar_day.SIMILARITY_WORKERS = 0
+        vector_time = timeit(similar_day.calculate_similar_dates, *args)
+        similar_day.SIMILARITY_WORKERS, similar_day.SIMILARITY_PARALLEL_MIN_DAYS = 4, 1
+        similar_day.calculate_similar_dates(*args)  # 预热进程池
+        pool_time = timeit(similar_day.calculate_similar_dates, *args)
+        print(f"{days:>8} {len(compare_entries):>8} {legacy_time:>12.3f} {vector_time:>10.4f} {pool_time:>16.4f}")
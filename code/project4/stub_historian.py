@@ -0,0 +1,92 @@
+"""本地历史数据接口桩，用于在没有真实历史库时调试和测量获取耗时。
+
+- 请求：POST 表单参数 `tag`（逗号分隔）、`start`、`end`、`second`，与真实接口相同。
+- 返回：[{"tagName": 标签, "values": [{"t", "v", "s"}, ...]}, ...]，数值按标签名确定性生成。
+- `delay`：每次请求的模拟处理延迟（秒）；`delay_per_day`：按查询天数增加的延迟（秒/天），模拟大范围查询变慢；
+  `fail_rate`：返回 503 的概率，用于验证重试。
+
+用法：python stub_historian.py [端口] [延迟秒数] [失败率] [每天延迟秒数]
+"""
+
+import sys
+import json
+import time
+import zlib
+import random
+import threading
+import numpy as np
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_time(text):
+    """解析时间（允许月、日不补零，如 2024-09-1 00:00:00）"""
+    date, clock = text.split(" ")
+    year, month, day = (int(part) for part in date.split("-"))
+    return int(np.datetime64(f"{year:04d}-{month:02d}-{day:02d}T{clock}", "s").astype(np.int64))
+
+
+def tag_values(tag, start, end, second):
+    """按标签名生成确定性的时间序列"""
+    times = np.arange(parse_time(start), parse_time(end) + 1, max(int(second), 1), dtype=np.int64)
+    seed = zlib.crc32(tag.encode())
+    hours = (times % 86400) / 3600
+    values = np.round(20 + 10 * np.sin((hours + seed % 24) / 24 * 2 * np.pi), 2)
+    status = ((times // int(second) + seed) % 3 != 0).astype(int)
+    text = np.datetime_as_string(times.astype("datetime64[s]"))
+    return [{"t": t.replace("T", " "), "v": v, "s": s} for t, v, s in zip(text.tolist(), values.tolist(), status.tolist())]
+
+
+def make_handler(delay=0.0, fail_rate=0.0, delay_per_day=0.0):
+    class HistorianHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # 支持长连接
+        disable_nagle_algorithm = True  # 响应头和响应体分两次写出，避免长连接上的 Nagle 与延迟确认叠加等待
+
+        def do_POST(self):
+            form = parse_qs(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode())
+            if random.random() < fail_rate:
+                time.sleep(delay)
+                self.reply(503, {"message": "stub failure"})
+                return
+            try:
+                start, end, second = form["start"][0], form["end"][0], form.get("second", ["600"])[0]
+                time.sleep(delay + delay_per_day * (parse_time(end) - parse_time(start)) / 86400)
+                tags = [tag for tag in form["tag"][0].split(",") if tag]
+                result = [{"tagName": tag, "values": tag_values(tag, start, end, second)} for tag in tags]
+            except (KeyError, ValueError) as e:
+                self.reply(400, {"message": str(e)})
+                return
+            self.reply(200, result)
+
+        def reply(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return HistorianHandler
+
+
+def start_stub(port=0, delay=0.0, fail_rate=0.0, delay_per_day=0.0):
+    """在后台线程中启动接口桩，返回 (server, url)；port 为 0 时使用随机端口"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(delay, fail_rate, delay_per_day))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/history"
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 1821
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    fail_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    delay_per_day = float(sys.argv[4]) if len(sys.argv) > 4 else 0.0
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(delay, fail_rate, delay_per_day))
+    print(f"历史数据接口桩：http://127.0.0.1:{port}/history（延迟 {delay}s + {delay_per_day}s/天，失败率 {fail_rate}）")
+    server.serve_forever()